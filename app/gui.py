@@ -1,27 +1,43 @@
 import os
+import queue
 import threading
-import time
 import tkinter as tk
 from tkinter import scrolledtext
 from tkinter import font as tkfont
 
-from link.tcp_peer import TcpPeer
+from link.transport import make_peer
+from crc.crc_core import bits_str
+from crc.models import resolve_model
+from link.arq import ArqReceiver, ArqSender
+from link.coalesce import Coalescer
+from link.metrics import serve_stats, start_json_dump
 from link.proto import (
-    build_data_frame_from_input,
-    build_data_frame,
-    build_ack_frame,
-    parse_frame,
-    TYPE_DATA, TYPE_ACK, TYPE_NACK
+    payload_from_input,
+    parse_received,
+    peek_header,
+    ack_cum,
+    TYPE_DATA, TYPE_ACK, TYPE_NACK, TYPE_SKIP
 )
 
-# explicación matemática si está disponible
-try:
-    from crc.crc_core import explain_crc_long_division as explain_crc
-except Exception:
-    try:
-        from crc.crc_core import explain_crc_math as explain_crc
-    except Exception:
-        def explain_crc(data, poly_bits): return ""
+# explicación matemática paginada, generada en su propio hilo
+from crc.explain import ExplainWorker
+
+# la GUI solo toca Tk desde su hilo: los demás hilos encolan en App._ui y
+# _poll_ui aplica hasta UI_BATCH eventos cada UI_TICK_MS
+UI_TICK_MS = 50
+UI_BATCH = 1000
+# paneles de texto como buffer circular: se recortan las líneas más viejas
+MAX_LINES = 2000
+MAX_SENT = 1000
+# bits de cabecera/payload mostrados por trama
+MAX_BITS_SHOWN = 1024
+
+def _bits_preview(buf) -> str:
+    # solo se convierten a texto los bytes que se muestran
+    n = MAX_BITS_SHOWN // 8
+    if len(buf) <= n:
+        return bits_str(buf)
+    return f"{bits_str(buf[:n])}... ({8 * len(buf)} bits)"
 
 def load_env(path=".env"):
     env = {}
@@ -44,16 +60,25 @@ class App:
         self.peer_host = self.env.get("PEER_HOST", "127.0.0.1")
         self.peer_port = int(self.env.get("PEER_PORT", "5000"))
         self.poly_bits = self.env.get("POLY_BITS", "11011")
+        self.transport = self.env.get("TRANSPORT", "tcp")
+
+        self.arq_window = int(self.env.get("ARQ_WINDOW", "8"))
+        self.arq_mode = self.env.get("ARQ_MODE", "sr")
+        self.proto_ver = int(self.env.get("PROTO_VER", "1"))
+        # agrupación y compresión de mensajes (solo con PROTO_VER=2)
+        self.coalesce_ms = float(self.env.get("COALESCE_MS", "0"))
+        self.compress = self.env.get("COMPRESS", "no")
+
+        # métricas: /metrics en localhost y/o volcado JSON periódico
+        if self.env.get("STATS_PORT"):
+            serve_stats(int(self.env["STATS_PORT"]))
+        if self.env.get("STATS_JSON"):
+            start_json_dump(self.env["STATS_JSON"], float(self.env.get("STATS_INTERVAL", "10")))
 
         # Estado de protocolo
-        self.next_seq = 0
-        self.timeout = 2.0
         self.max_retries = 3
         self.inject_fail = False
         self.status = tk.StringVar(value="modo: NORMAL • listo")
-        self._ack_wait = {}   # seq -> {"event": Event, "result": True/False/None}
-        self._ack_lock = threading.Lock()
-        self._delivered = set()  # SEQs ya entregados
 
         master.title("crc wifi gui")
 
@@ -95,7 +120,11 @@ class App:
         self.txt_crc = scrolledtext.ScrolledText(right, height=7, bg="#66bb6a")
         self.txt_crc.pack(fill=tk.BOTH, expand=True, padx=6, pady=4)
 
-        tk.Label(right, text="operación CRC (división binaria):", bg="#2b579a", fg="white").pack(anchor="w", padx=6, pady=(6,0))
+        proc_bar = tk.Frame(right, bg="#2b579a")
+        proc_bar.pack(fill=tk.X, padx=6, pady=(6,0))
+        tk.Label(proc_bar, text="operación CRC (división binaria):", bg="#2b579a", fg="white").pack(side=tk.LEFT)
+        self.more_btn = tk.Button(proc_bar, text="más pasos", command=self.on_more_steps, state="disabled")
+        self.more_btn.pack(side=tk.RIGHT)
         self.txt_proc = scrolledtext.ScrolledText(right, height=16, bg="#66bb6a")
         try:
             self.txt_proc.configure(font=tkfont.Font(family="Consolas", size=10))
@@ -103,9 +132,37 @@ class App:
             pass
         self.txt_proc.pack(fill=tk.BOTH, expand=True, padx=6, pady=4)
 
-        self.peer = TcpPeer(host=self.host, port=self.port, on_data=self.on_rx)
+        # la explicación se pagina en un hilo; los resultados vuelven por _ui
+        self.explainer = ExplainWorker()
+        self._ui = queue.Queue()
+        self._explain_key = None
+        self._explain_page = 0
+        master.after(UI_TICK_MS, self._poll_ui)
+
+        # envío en un hilo propio: ArqSender.send puede esperar hueco en la ventana
+        self._send_q = queue.Queue()
+        threading.Thread(target=self._send_loop, daemon=True).start()
+
+        # ARQ de ventana deslizante: on_send ya no espera el ACK
+        self.arq_tx = ArqSender(self._send_frame, self.poly_bits, window=self.arq_window,
+                                mode=self.arq_mode, max_tries=self.max_retries,
+                                on_acked=self.on_acked, on_failed=self.on_failed, ver=self.proto_ver)
+        self.arq_rx = ArqReceiver(self._send_frame, self.poly_bits, deliver=self.on_deliver,
+                                  window=self.arq_window, mode=self.arq_mode, ver=self.proto_ver)
+        self.coalescer = None
+        if self.proto_ver >= 2 and (self.coalesce_ms or self.compress != "no"):
+            self.coalescer = Coalescer(lambda payload, flags: self.arq_tx.send(payload, flags=flags),
+                                       delay=self.coalesce_ms / 1000, compress=self.compress)
+
+        # el peer arranca al final: on_rx usa todo lo anterior
+        self.peer = make_peer(self.transport, host=self.host, port=self.port, on_data=self.on_rx,
+                              crc_bytes=resolve_model(self.poly_bits).nbytes,
+                              on_send_error=self.on_send_error)
         self.peer.start()
 
+    def _send_frame(self, frame: bytes):
+        self.peer.send(self.peer_host, self.peer_port, frame, timeout=2.0)
+
     def set_fail(self):
         self.inject_fail = True
         self.status.set("modo: FALLAR • listo")
@@ -114,129 +171,173 @@ class App:
         self.inject_fail = False
         self.status.set("modo: NORMAL • listo")
 
-    # --- envío con retry/ACK ---
+    # --- envío por ventana ARQ ---
+    @staticmethod
+    def _flip_payload_bit(frame: bytes) -> bytes:
+        arr = bytearray(frame)
+        # flip 1 bit del primer byte de payload (la cabecera mide 5 bytes en v1, más en v2);
+        # ArqSender lo aplica solo a la primera transmisión, el reintento llega bien
+        arr[peek_header(frame)[2]] ^= 0x01
+        return bytes(arr)
+
     def on_send(self):
         text = self.entry.get().strip()
         if not text:
             return
 
-        seq = self.next_seq
-        self.next_seq = (self.next_seq + 1) & 0xFF
-
-        frame, payload = build_data_frame_from_input(text, self.poly_bits, seq)
+        payload = payload_from_input(text)
 
         note = ""
+        transform = None
         if self.inject_fail and len(payload) > 0:
-            arr = bytearray(frame)
-            # flip 1 bit del primer byte de payload (después de cabecera de 5 bytes)
-            arr[5] ^= 0x01
-            frame = bytes(arr)
+            transform = self._flip_payload_bit
             note = "  (simulado FALLO: flip 1 bit)"
 
-        evt = threading.Event()
-        with self._ack_lock:
-            self._ack_wait[seq] = {"event": evt, "result": None}
+        self._send_q.put((text + note, payload, transform))
+        self.entry.delete(0, tk.END)
 
-        ok = False
-        for i in range(self.max_retries):
+    def _send_loop(self):
+        while True:
+            label, payload, transform = self._send_q.get()
             try:
-                self.status.set(f"enviando seq={seq} intento {i+1}/{self.max_retries}{note}")
-                self.peer.send(self.peer_host, self.peer_port, frame, timeout=2.0)
+                if self.coalescer is not None:
+                    if transform is None:
+                        self.coalescer.put(payload)
+                        self._post("sent", label)
+                        continue
+                    # la trama con fallo simulado va sola, detrás de lo pendiente
+                    self.coalescer.flush()
+                seq = self.arq_tx.send(payload, transform=transform)
             except Exception as e:
-                self.status.set(f"error de envío: {e}")
+                # ventana cerrada o cola de agrupación llena; los fallos del
+                # transporte llegan por on_send_error
+                self._post("status", f"error de envío: {e}")
+                continue
+            self._post("sent", label)
+            self._post("status", f"enviado seq={seq} • en vuelo {self.arq_tx.in_flight}/{self.arq_window}"
+                                 f" • en cola {self._send_q.qsize()}")
+
+    def on_acked(self, seq, payload):
+        self._post("status", f"ACK seq={seq} • en vuelo {self.arq_tx.in_flight}/{self.arq_window}")
+
+    def on_failed(self, seq, payload):
+        self._post("status", f"seq={seq} falló después de {self.max_retries} intentos")
+
+    def on_send_error(self, host, port, error):
+        # hilo del peer o del pool: el envío ya había vuelto, el ARQ retransmite
+        self._post("status", f"error de envío a {host}:{port}: {error}")
+
+    # --- cola hacia el hilo de Tk ---
+    def _post(self, kind, *args):
+        self._ui.put((kind, args))
+
+    def _on_explained(self, key, page, text, more):
+        # hilo del ExplainWorker: solo se encola, Tk se toca en _poll_ui
+        self._post("explained", key, page, text, more)
+
+    def _poll_ui(self):
+        # un insert por panel y tick, y solo se explica la última trama del lote
+        texts = {}
+        sent = []
+        status = None
+        explain = None
+        for _ in range(UI_BATCH):
+            try:
+                kind, args = self._ui.get_nowait()
+            except queue.Empty:
                 break
-
-            if evt.wait(self.timeout):
-                with self._ack_lock:
-                    result = self._ack_wait.get(seq, {}).get("result", None)
-                if result is True:
-                    self.status.set(f"ACK seq={seq}")
-                    ok = True
-                    break
-                else:
-                    self.status.set(f"NACK seq={seq} → reintento")
-                    evt.clear()
-                    time.sleep(0.2)
-            else:
-                self.status.set(f"timeout seq={seq} → reintento")
-                time.sleep(0.2)
-
-        with self._ack_lock:
-            self._ack_wait.pop(seq, None)
-
-        if not ok:
-            self.status.set(f"falló después de {self.max_retries} intentos{note}")
-
-        self.sent_list.insert(tk.END, text + note)
-        self.entry.delete(0, tk.END)
+            if kind == "append":
+                texts.setdefault(args[0], []).append(args[1])
+            elif kind == "sent":
+                sent.append(args[0])
+            elif kind == "status":
+                status = args[0]
+            elif kind == "explain":
+                explain = args[0]
+            elif kind == "explained":
+                key, page, text, more = args
+                self._explain_key, self._explain_page = key, page
+                if text:
+                    texts.setdefault(self.txt_proc, []).append(text)
+                self.more_btn.configure(state="normal" if more else "disabled")
+        for widget, parts in texts.items():
+            self._append(widget, "".join(parts))
+        if sent:
+            self.sent_list.insert(tk.END, *sent)
+            extra = self.sent_list.size() - MAX_SENT
+            if extra > 0:
+                self.sent_list.delete(0, extra - 1)
+            self.sent_list.see(tk.END)
+        if status is not None:
+            self.status.set(status)
+        if explain is not None:
+            # primera página enseguida; el resto con "más pasos"
+            self.explainer.request(explain, self.poly_bits, 0, self._on_explained)
+        self.txt_proc.after(1 if self._ui.qsize() else UI_TICK_MS, self._poll_ui)
+
+    def on_more_steps(self):
+        if self._explain_key is None:
+            return
+        self.more_btn.configure(state="disabled")
+        data, poly = self._explain_key
+        self.explainer.request(data, poly, self._explain_page + 1, self._on_explained)
 
     # --- util GUI ---
     def _append(self, widget, s):
         widget.configure(state="normal")
         widget.insert(tk.END, s)
+        lines = int(widget.index("end-1c").split(".")[0])
+        if lines > MAX_LINES:
+            widget.delete("1.0", f"{lines - MAX_LINES + 1}.0")
         widget.see(tk.END)
         widget.configure(state="disabled")
 
     # --- recepción ---
+    def on_deliver(self, seq, payload):
+        try:
+            decoded = payload.decode("utf-8")
+        except Exception:
+            decoded = None
+        if decoded is not None:
+            self._post("append", self.txt_msg, f"MENSAJE DESCIFRADO: {decoded}\n")
+        else:
+            self._post("append", self.txt_msg, f"MENSAJE DESCIFRADO: <bytes no-texto> {payload!r}\n")
+
     def on_rx(self, data: bytes, addr):
+        # hilo del peer: nada de Tk aquí, todo pasa por _post
         try:
-            res = parse_frame(data, self.poly_bits)
-            t = res["type"]
-            seq = res["seq"]
+            res = parse_received(data, self.poly_bits)
+            t = res.type
+            seq = res.seq
 
             if t == TYPE_DATA:
                 # verificar CRC y responder ACK/NACK
-                ok_crc = res["crc_ok"]
-                try:
-                    decoded = res["payload"].decode("utf-8")
-                except Exception:
-                    decoded = None
-
-                if ok_crc:
-                    # duplicado?
-                    if seq not in self._delivered:
-                        if decoded is not None:
-                            self._append(self.txt_msg, f"MENSAJE DESCIFRADO: {decoded}\n")
-                        else:
-                            self._append(self.txt_msg, f"MENSAJE DESCIFRADO: <bytes no-texto> {res['payload']!r}\n")
-                        self._delivered.add(seq)
-                    # responder ACK siempre
-                    ack = build_ack_frame(seq, True, self.poly_bits)
-                    try:
-                        self.peer.send(self.peer_host, self.peer_port, ack, timeout=2.0)
-                    except Exception:
-                        pass
-                else:
-                    nack = build_ack_frame(seq, False, self.poly_bits)
-                    try:
-                        self.peer.send(self.peer_host, self.peer_port, nack, timeout=2.0)
-                    except Exception:
-                        pass
-                    self._append(self.txt_msg, "CRC FALLO. mensaje descartado\n")
+                ok_crc = res.crc_ok
+                # ARQ: entrega en orden, descarta duplicados y responde ACK/NACK
+                self.arq_rx.on_data(seq, res.payload, ok_crc, res.flags)
+                if not ok_crc:
+                    self._post("append", self.txt_msg, "CRC FALLO. mensaje descartado\n")
 
                 # Detalles y operación matemática usando cabecera+payload
                 detalles = (
-                    f"crc recibido: {res['crc_recv_bits']}\n"
-                    f"crc calculado: {res['crc_calc_bits']}\n"
-                    f"bits header: {res['header_bits']}\n"
-                    f"bits payload: {res['payload_bits']}\n"
-                    f"polinomio generador: {res['poly_bits']}\n"
+                    f"crc recibido: {res.crc_recv_bits}\n"
+                    f"crc calculado: {res.crc_calc_bits}\n"
+                    f"bits header: {res.header_bits}\n"
+                    f"bits payload: {_bits_preview(res.payload)}\n"
+                    f"polinomio generador: {res.poly_bits}\n"
                 )
-                self._append(self.txt_crc, detalles)
+                self._post("append", self.txt_crc, detalles)
+                self._post("explain", res.hp_bytes)
 
-                steps = explain_crc(res["hp_bytes"], self.poly_bits)
-                if steps:
-                    self._append(self.txt_proc, steps + "\n")
+            elif t == TYPE_SKIP:
+                # el emisor dio seq por perdido: se sigue con lo de detrás
+                self.arq_rx.on_skip(seq, res.crc_ok)
 
-            elif t in (TYPE_ACK, TYPE_NACK):
-                with self._ack_lock:
-                    w = self._ack_wait.get(seq)
-                    if w:
-                        w["result"] = (t == TYPE_ACK)
-                        w["event"].set()
+            elif t in (TYPE_ACK, TYPE_NACK) and res.crc_ok:
+                self.arq_tx.on_ack(seq, t == TYPE_ACK, ack_cum(res))
 
         except Exception as e:
-            self._append(self.txt_msg, f"error al procesar: {e}\n")
+            self._post("append", self.txt_msg, f"error al procesar: {e}\n")
 
 def main():
     root = tk.Tk()
@@ -0,0 +1,260 @@
+"""
+Generador de carga sin GUI: N emisores concurrentes contra K receptores
+en 127.0.0.1, tramas DATA de link.proto con tamaño aleatorio.
+
+python -m app.loadgen --emisores 8 --receptores 2 --duracion 10 --tam uniforme:16-4096
+python -m app.loadgen --tasa 200 --ber 1e-5 --poly 11011 --json
+
+- Lazo cerrado (--tasa 0): a lo sumo una trama en vuelo por emisor; la
+  siguiente sale cuando llega alguna al receptor (no basta con que
+  TcpPeer.send la encole). Lo que no llega en LOST_AFTER s se da por
+  perdido. Lazo abierto (--tasa R): R tramas/s por emisor con
+  llegadas de Poisson; la latencia se mide desde el instante programado,
+  así que un emisor atrasado no esconde la cola.
+- --ber generaliza "fallar" de la GUI: cada bit de la trama se invierte con
+  esa probabilidad. Con TCP/asyncio la cabecera no se toca (como en
+  link.impair): un LEN dañado desincronizaría el resto de la conexión.
+- El payload lleva emisor, número y hora programada, más un relleno
+  determinista; el receptor cuenta fallos de CRC y también errores que el
+  CRC no detectó (CRC ok pero relleno distinto).
+"""
+import argparse
+import json
+import random
+import struct
+import sys
+import threading
+import time
+from typing import Callable, List
+
+from crc.models import resolve_model
+from link.impair import flip_bits
+from link.metrics import Histogram
+from link.proto import TYPE_DATA, build_data_frame, parse_received, peek_header
+from link.stream import MAX_PAYLOAD
+from link.transport import TRANSPORTS, free_port, make_peer, wait_listening
+
+STAMP = struct.Struct(">HId")  # emisor, número, hora programada (perf_counter)
+MIN_PAYLOAD = STAMP.size
+# lazo cerrado: espera máxima por una trama en vuelo antes de darla por perdida
+LOST_AFTER = 0.5
+# relleno determinista: PATTERN[k:k + n] con k = número % 256
+PATTERN = bytes(range(256)) * (MAX_PAYLOAD // 256 + 2)
+
+
+def size_sampler(spec: str, rng: random.Random) -> Callable[[], int]:
+    """fijo:N, uniforme:A-B o exp:MEDIA (bytes de payload)."""
+    kind, _, arg = spec.partition(":")
+    clip = lambda n: max(MIN_PAYLOAD, min(MAX_PAYLOAD, int(n)))
+    if kind == "fijo":
+        n = clip(arg)
+        return lambda: n
+    if kind == "uniforme":
+        a, b = (clip(x) for x in arg.split("-"))
+        return lambda: rng.randint(a, b)
+    if kind == "exp":
+        mean = float(arg)
+        return lambda: clip(rng.expovariate(1 / mean))
+    raise ValueError(f"distribución de tamaño desconocida: {spec!r}")
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.arrived = threading.Condition(self.lock)
+        self.written_off = 0
+        self.sent = 0
+        self.sent_bytes = 0
+        self.send_errors = 0
+        self.received = 0
+        self.ok = 0
+        self.ok_bytes = 0
+        self.crc_fail = 0
+        self.undetected = 0
+        self.latency = Histogram("latencia")
+
+    def wait_in_flight(self, limit: int, timeout: float = LOST_AFTER):
+        """Espera a que haya menos de limit tramas en vuelo; al vencer, las da por perdidas."""
+        with self.arrived:
+            in_flight = lambda: self.sent - self.received - self.written_off
+            if not self.arrived.wait_for(lambda: in_flight() < limit, timeout):
+                self.written_off += in_flight() - limit + 1
+
+
+class Receiver:
+    def __init__(self, stats: Stats, poly, transport: str, port: int):
+        self.stats = stats
+        self.poly = poly
+        self.port = port
+        self.peer = make_peer(transport, host="127.0.0.1", port=port, on_data=self.on_data,
+                              crc_bytes=resolve_model(poly).nbytes)
+
+    def on_data(self, data, addr):
+        now = time.perf_counter()
+        st = self.stats
+        try:
+            res = parse_received(data, self.poly)
+        except ValueError:
+            with st.lock:
+                st.received += 1
+                st.crc_fail += 1
+                st.arrived.notify_all()
+            return
+        p = res.payload
+        ok = res.crc_ok and res.type == TYPE_DATA and len(p) >= MIN_PAYLOAD
+        if ok:
+            _, n, t_sched = STAMP.unpack_from(p)
+            k = n & 0xFF
+            intact = p[MIN_PAYLOAD:] == PATTERN[k:k + len(p) - MIN_PAYLOAD]
+        with st.lock:
+            st.received += 1
+            st.arrived.notify_all()
+            if not res.crc_ok:
+                st.crc_fail += 1
+            elif ok and intact:
+                st.ok += 1
+                st.ok_bytes += len(p)
+            else:
+                st.undetected += 1
+        if ok and intact:
+            st.latency.observe(now - t_sched)
+
+
+def sender(idx: int, ports: List[int], stats: Stats, poly, sizes, rate: float, ber: float,
+           until: float, peer, seed: int, protect_header: bool = False, window: int = 1):
+    rng = random.Random(seed)
+    port = ports[idx % len(ports)]
+    n = 0
+    nxt = time.perf_counter()
+    while True:
+        if rate > 0:
+            nxt += rng.expovariate(rate)
+            delay = nxt - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            t_sched = nxt
+        else:
+            t_sched = time.perf_counter()
+        if t_sched >= until:
+            return
+        size = sizes()
+        k = n & 0xFF
+        payload = STAMP.pack(idx, n & 0xFFFFFFFF, t_sched) + PATTERN[k:k + size - MIN_PAYLOAD]
+        frame = build_data_frame(payload, poly, n)
+        if ber > 0:
+            start = 8 * peek_header(frame)[2] if protect_header else 0
+            frame = flip_bits(frame, ber, rng, start)
+        try:
+            peer.send("127.0.0.1", port, frame)
+            with stats.lock:
+                stats.sent += 1
+                stats.sent_bytes += len(frame)
+        except OSError:
+            with stats.lock:
+                stats.send_errors += 1
+        if rate <= 0:
+            # los emisores comparten el contador: `window` = una trama por emisor
+            stats.wait_in_flight(window)
+        n += 1
+
+
+def run(senders=4, receivers=1, duration=5.0, size="fijo:256", rate=0.0, ber=0.0,
+        poly="CRC-32", transport="tcp", seed=1, drain=1.0) -> dict:
+    stats = Stats()
+    rxs = [Receiver(stats, poly, transport, free_port()) for _ in range(receivers)]
+    for r in rxs:
+        r.peer.start()
+    if transport == "tcp":
+        # TcpPeer hace el bind en su hilo; los demás, dentro de start()
+        for r in rxs:
+            wait_listening(r.port)
+    # peer solo para enviar (el puerto de escucha no se usa)
+    tx_peer = make_peer(transport, host="127.0.0.1", port=free_port())
+    if transport != "tcp":
+        tx_peer.start()
+    ports = [r.port for r in rxs]
+    rng = random.Random(seed)
+    t0 = time.perf_counter()
+    until = t0 + duration
+    threads = [
+        threading.Thread(target=sender, daemon=True,
+                         args=(i, ports, stats, poly, size_sampler(size, random.Random(rng.random())),
+                               rate, ber, until, tx_peer, rng.random(), transport != "udp", senders))
+        for i in range(senders)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    # deja llegar lo que aún está en colas y buffers: hasta que deja de llegar
+    # nada durante `drain` segundos
+    if hasattr(tx_peer, "flush"):
+        tx_peer.flush(10.0)
+    seen, last = -1, time.monotonic()
+    while stats.received < stats.sent and time.monotonic() - last < drain:
+        if stats.received != seen:
+            seen, last = stats.received, time.monotonic()
+        time.sleep(0.01)
+    for r in rxs:
+        r.peer.stop()
+    if transport != "tcp":
+        tx_peer.stop()
+
+    lat = dict(stats.latency.quantiles((0.5, 0.9, 0.99, 0.999)))
+    return {
+        "config": {"senders": senders, "receivers": receivers, "duration": duration, "size": size,
+                   "rate": rate, "ber": ber, "poly": poly, "transport": transport},
+        "elapsed": elapsed,
+        "sent": stats.sent,
+        "send_errors": stats.send_errors,
+        "received": stats.received,
+        "lost": max(0, stats.sent - stats.received),
+        "ok": stats.ok,
+        "crc_fail": stats.crc_fail,
+        "undetected": stats.undetected,
+        "crc_fail_rate": stats.crc_fail / stats.received if stats.received else 0.0,
+        "frames_per_s": stats.ok / elapsed,
+        "goodput_MBps": stats.ok_bytes / elapsed / 1e6,
+        "offered_MBps": stats.sent_bytes / elapsed / 1e6,
+        "latency_ms": {f"p{q * 100:g}": v * 1e3 for q, v in lat.items()},
+    }
+
+
+def report(r: dict) -> str:
+    c = r["config"]
+    lat = "  ".join(f"{k}={v:.2f}" for k, v in r["latency_ms"].items())
+    return "\n".join([
+        f"{c['senders']} emisores -> {c['receivers']} receptores ({c['transport']}), "
+        f"{c['duration']:g} s, tam {c['size']}, tasa {c['rate'] or 'lazo cerrado'}, "
+        f"ber {c['ber']:g}, poly {c['poly']}",
+        f"enviadas {r['sent']}  recibidas {r['received']}  perdidas {r['lost']}  "
+        f"errores de envío {r['send_errors']}",
+        f"ok {r['ok']}  fallos CRC {r['crc_fail']} ({r['crc_fail_rate']:.2%})  "
+        f"errores no detectados {r['undetected']}",
+        f"{r['frames_per_s']:.0f} tramas/s  goodput {r['goodput_MBps']:.2f} MB/s  "
+        f"(ofrecido {r['offered_MBps']:.2f} MB/s)",
+        f"latencia ms: {lat}",
+    ])
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m app.loadgen", description="carga de prueba sobre el enlace")
+    p.add_argument("--emisores", type=int, default=4)
+    p.add_argument("--receptores", type=int, default=1)
+    p.add_argument("--duracion", type=float, default=5.0, help="segundos")
+    p.add_argument("--tam", default="fijo:256", help="fijo:N, uniforme:A-B o exp:MEDIA")
+    p.add_argument("--tasa", type=float, default=0.0, help="tramas/s por emisor (0 = lazo cerrado)")
+    p.add_argument("--ber", type=float, default=0.0, help="probabilidad de invertir cada bit")
+    p.add_argument("--poly", default="CRC-32", help="cadena de bits o modelo del catálogo")
+    p.add_argument("--transporte", default="tcp", choices=list(TRANSPORTS))
+    p.add_argument("--semilla", type=int, default=1)
+    p.add_argument("--json", action="store_true", help="resultado en JSON")
+    a = p.parse_args(argv)
+    r = run(a.emisores, a.receptores, a.duracion, a.tam, a.tasa, a.ber, a.poly, a.transporte, a.semilla)
+    print(json.dumps(r, indent=2) if a.json else report(r))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
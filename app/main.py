@@ -1,33 +1,140 @@
 ﻿import argparse
-from link.tcp_peer import TcpPeer
-from link.frame import build_frame_from_input, parse_frame
+import os
+import sys
+import time
+from crc.models import resolve_model
+from link.arq import MODES, SELECTIVE_REPEAT, ArqReceiver, ArqSender
+from link.coalesce import Coalescer
+from link.metrics import serve_stats, start_json_dump
+from link.transport import TRANSPORTS, make_peer
+from link.proto import (VER, VERSIONS, V2_FIXED, COMPRESSORS, TYPE_DATA, TYPE_ACK, TYPE_NACK, TYPE_SKIP, ack_cum,
+                        compress_payload, parse_received, payload_from_input)
+from link.stream import HEADER_LEN
+from link.transfer import DATA_HEADER, DEFAULT_SEGMENT, FILE_MODEL, SEGMENT, FileReceiver, send_file
 #hola
-def run(role, host, port, peer_host, peer_port, poly_bits):
+# tras recibir un archivo, tiempo atendiendo retransmisiones del último ACK
+LINGER = 1.0
+# el receptor de archivos se rinde tras tantos segundos sin recibir nada nuevo
+IDLE_TIMEOUT = 30.0
+
+def run(role, host, port, peer_host, peer_port, poly_bits, transport="tcp",
+        window=8, mode=SELECTIVE_REPEAT, send_path=None, recv_path=None, capture_path=None,
+        ver=VER, coalesce_ms=0.0, compress="no", segment=DEFAULT_SEGMENT, idle=IDLE_TIMEOUT):
+    # en modo archivo no se imprime cada trama
+    verbose = not (send_path or recv_path)
+    receiver = FileReceiver(recv_path) if recv_path else None
+    failed = []
+
+    if ver == VER and (coalesce_ms or compress != "no"):
+        raise ValueError("agrupar y comprimir necesitan --proto 2 (FLAGS)")
+
+    def send_frame(frame):
+        peer.send(peer_host, peer_port, frame)
+
+    def deliver(seq, payload):
+        try:
+            print("MENSAJE DESCIFRADO:", payload.decode("utf-8"))
+        except Exception:
+            print("MENSAJE DESCIFRADO: <bytes>", payload)
+
     def on_rx(data, addr):
-        res = parse_frame(data, poly_bits)
-        print("OK" if res["ok"] else "FAIL")
-        if res["ok"]:
-            try:
-                print("MENSAJE DESCIFRADO:", res["payload"].decode("utf-8"))
-            except Exception:
-                print("MENSAJE DESCIFRADO: <bytes>", res["payload"])
-        print("crc recibido:", res["crc_recv_bits"])
-        print("crc calculado:", res["crc_calc_bits"])
-        print("bits enviados:", res["payload_bits"])
-        print("polinomio generador:", res["poly_bits"])
-
-    peer = TcpPeer(host=host, port=port, on_data=on_rx)
+        res = parse_received(data, poly_bits)
+        if res.type in (TYPE_ACK, TYPE_NACK):
+            if res.crc_ok:
+                tx.on_ack(res.seq, res.type == TYPE_ACK, ack_cum(res))
+            return
+        if res.type == TYPE_SKIP:
+            rx.on_skip(res.seq, res.crc_ok)
+            return
+        if res.type != TYPE_DATA:
+            return
+        rx.on_data(res.seq, res.payload, res.crc_ok, res.flags)
+        if not verbose:
+            return
+        print("OK" if res.crc_ok else "FAIL")
+        print("crc recibido:", res.crc_recv_bits)
+        print("crc calculado:", res.crc_calc_bits)
+        print("bits enviados:", res.payload_bits)
+        print("polinomio generador:", res.poly_bits)
+
+    def on_failed(seq, payload):
+        failed.append(seq)
+        if verbose:
+            print(f"seq={seq} sin ACK tras varios intentos: {payload!r}")
+
+    tx = ArqSender(send_frame, poly_bits, window=window, mode=mode, on_failed=on_failed, ver=ver)
+    rx = ArqReceiver(send_frame, poly_bits, deliver=receiver.on_payload if receiver else deliver,
+                     window=window, mode=mode, ver=ver)
+    peer = make_peer(transport, host=host, port=port, on_data=on_rx,
+                     crc_bytes=resolve_model(poly_bits).nbytes, capture=capture_path)
     peer.start()
-    print(f"{role} escuchando en {host}:{port}")
+    print(f"{role} escuchando en {host}:{port} (ARQ {mode}, ventana {window}, proto v{ver})")
+    if send_path:
+        t0 = time.perf_counter()
+        if getattr(peer, "max_frame", None):
+            # UDP: cada trama debe caber en un datagrama
+            header = HEADER_LEN if ver == VER else V2_FIXED + 3  # LEN varint de 3 bytes
+            segment = min(segment, peer.max_frame - header - resolve_model(poly_bits).nbytes - DATA_HEADER)
+        def send_segment(payload):
+            data, flags = compress_payload(payload, 0, compress)
+            return tx.send(data, flags=flags)
+        crc = send_file(send_path, send_segment, segment=segment)
+        tx.wait_idle()
+        tx.close()
+        dt = time.perf_counter() - t0
+        size = os.path.getsize(send_path)
+        estado = f"FALLO ({len(failed)} tramas sin ACK)" if failed else "OK"
+        st = tx.stats
+        print(f"enviado {send_path}: {size} bytes en {dt:.2f} s "
+              f"({size / dt / 1e6:.1f} MB/s) {FILE_MODEL}={crc:08x} {estado}")
+        # costo del ARQ, útil detrás de link.impair
+        print(f"tramas {st['sent']}, retransmisiones {st['retransmits']} "
+              f"({100 * st['retransmits'] / max(1, st['sent']):.1f}%), timeouts {st['timeouts']}, "
+              f"NACK {st['nacks']}")
+        return not failed
+    if receiver:
+        # espera mientras lleguen datos nuevos; sin progreso en idle s, falla
+        last, since = -1, time.monotonic()
+        while True:
+            try:
+                ok = receiver.wait(1.0)
+                break
+            except TimeoutError as e:
+                now = time.monotonic()
+                if rx.stats["delivered"] != last:
+                    last, since = rx.stats["delivered"], now
+                elif now - since >= idle:
+                    print(f"{e} ({idle:.0f} s sin datos)", file=sys.stderr)
+                    receiver.close()
+                    return False
+            except KeyboardInterrupt:
+                receiver.close()
+                return False
+        print(f"recibido {receiver.name} -> {recv_path}: {receiver.size} bytes "
+              f"{receiver.model.name}={receiver.crc:08x} {'OK' if ok else 'FALLO (no coincide)'}")
+        time.sleep(LINGER)
+        return ok
+    stage = None
+    if coalesce_ms or compress != "no":
+        # mensajes cercanos en el tiempo viajan juntos en una trama (link.coalesce)
+        stage = Coalescer(lambda payload, flags: tx.send(payload, flags=flags),
+                          delay=coalesce_ms / 1000, compress=compress)
     try:
         while True:
             s = input("> ")
             if not s:
                 continue
-            frame = build_frame_from_input(s, poly_bits)
-            peer.send(peer_host, peer_port, frame)
-    except KeyboardInterrupt:
+            # solo bloquea si ya hay `window` tramas sin confirmar
+            if stage:
+                stage.put(payload_from_input(s))
+            else:
+                tx.send(payload_from_input(s))
+    except (KeyboardInterrupt, EOFError):
         pass
+    if stage:
+        stage.close()
+    tx.wait_idle(5.0)
+    tx.close()
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser()
@@ -37,5 +144,32 @@ if __name__ == "__main__":
     p.add_argument("--peer_host", default="127.0.0.1")
     p.add_argument("--peer_puerto", type=int, default=5000)
     p.add_argument("--poly", default="0011")
+    p.add_argument("--transporte", default="tcp", choices=list(TRANSPORTS))
+    p.add_argument("--ventana", type=int, default=8, help="tramas en vuelo sin confirmar")
+    p.add_argument("--modo", default=SELECTIVE_REPEAT, choices=MODES, help="sr: Selective Repeat, gbn: Go-Back-N")
+    p.add_argument("--proto", type=int, default=VER, choices=VERSIONS,
+                   help="versión de trama (2: SEQ de 32 bits, LEN varint); igual en ambos extremos")
+    p.add_argument("--agrupar", type=float, default=0.0, metavar="MS",
+                   help="junta en una trama los mensajes de MS milisegundos (requiere --proto 2)")
+    p.add_argument("--comprimir", default="no", choices=COMPRESSORS,
+                   help="comprime el payload si sale más corto (requiere --proto 2)")
+    g = p.add_mutually_exclusive_group()
+    g.add_argument("--enviar-archivo", dest="enviar", metavar="RUTA", help="envía el archivo y termina")
+    g.add_argument("--recibir-archivo", dest="recibir", metavar="RUTA", help="espera un archivo, lo guarda en RUTA y termina")
+    p.add_argument("--segmento", type=int, default=DEFAULT_SEGMENT, metavar="BYTES",
+                   help=f"bytes de archivo por trama (1..{SEGMENT}); con UDP se recorta al datagrama")
+    p.add_argument("--espera", type=float, default=IDLE_TIMEOUT, metavar="S",
+                   help="el receptor de archivos termina con error tras S segundos sin datos nuevos")
+    p.add_argument("--capturar", metavar="RUTA", help="guarda cada trama recibida (ver python -m link.capture)")
+    p.add_argument("--stats-port", type=int, help="publica /metrics (Prometheus) y /stats.json en 127.0.0.1")
+    p.add_argument("--stats-json", metavar="RUTA", help="vuelca las métricas en JSON periódicamente")
+    p.add_argument("--stats-intervalo", type=float, default=10.0, help="segundos entre volcados JSON")
     a = p.parse_args()
-    run(a.rol, a.host, a.puerto, a.peer_host, a.peer_puerto, a.poly)
+    if a.stats_port:
+        serve_stats(a.stats_port)
+    if a.stats_json:
+        start_json_dump(a.stats_json, a.stats_intervalo)
+    ok = run(a.rol, a.host, a.puerto, a.peer_host, a.peer_puerto, a.poly, a.transporte,
+             a.ventana, a.modo, a.enviar, a.recibir, a.capturar, a.proto, a.agrupar, a.comprimir,
+             a.segmento, a.espera)
+    sys.exit(0 if ok is not False else 1)
@@ -0,0 +1,91 @@
+"""
+python -m bench                           todos los grupos, JSON por stdout
+python -m bench crc proto --rapido        solo algunos grupos, tamaños menores
+python -m bench -o base.json              guarda los resultados
+python -m bench --comparar base.json      marca regresiones contra base.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from bench.suites import GROUPS
+
+# una caída mayor que esto respecto a la base cuenta como regresión
+THRESHOLD = 0.10
+
+
+def run(groups, quick=False, min_time=0.2):
+    results = {}
+    for name in groups:
+        t0 = time.perf_counter()
+        results.update(GROUPS[name](quick=quick, min_time=min_time))
+        print(f"# {name}: {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def compare(base, new, threshold=THRESHOLD):
+    """
+    Filas (nombre, base, nuevo, cambio, regresión) para las métricas comunes.
+    cambio > 0 siempre es mejora, sea la métrica MB/s o ms.
+    """
+    rows = []
+    for name, r in new["results"].items():
+        b = base["results"].get(name)
+        if b is None or not b["value"]:
+            continue
+        if r["higher"]:
+            change = r["value"] / b["value"] - 1
+        else:
+            change = b["value"] / r["value"] - 1 if r["value"] else float("inf")
+        rows.append((name, b["value"], r["value"], r["unit"], change, change < -threshold))
+    return rows
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench", description="benchmarks de crc_proyecto")
+    p.add_argument("grupos", nargs="*", help=f"por defecto todos: {', '.join(GROUPS)}")
+    p.add_argument("--rapido", action="store_true", help="sin 16 MB en crc y menos tramas en loopback")
+    p.add_argument("--tiempo-min", type=float, default=0.2, help="segundos mínimos por medida")
+    p.add_argument("-o", "--salida", help="escribe el JSON en este archivo")
+    p.add_argument("--comparar", metavar="BASE", help="JSON previo contra el que comparar")
+    p.add_argument("--umbral", type=float, default=THRESHOLD, help="caída relativa que es regresión (0.10 = 10%%)")
+    a = p.parse_args(argv)
+    unknown = [g for g in a.grupos if g not in GROUPS]
+    if unknown:
+        p.error(f"grupo desconocido: {', '.join(unknown)}")
+
+    data = run(a.grupos or list(GROUPS), a.rapido, a.tiempo_min)
+    text = json.dumps(data, indent=2)
+    if a.salida:
+        with open(a.salida, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    elif not a.comparar:
+        print(text)
+
+    if a.comparar:
+        with open(a.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        rows = compare(base, data, a.umbral)
+        for name, old, new, unit, change, bad in rows:
+            print(f"{name:32s} {old:12.3f} -> {new:12.3f} {unit:9s} {change:+7.1%}"
+                  f"{'  REGRESIÓN' if bad else ''}")
+        bad = [r for r in rows if r[-1]]
+        print(f"{len(bad)} regresiones de {len(rows)} métricas (umbral {a.umbral:.0%})")
+        return 1 if bad else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Grupos de benchmarks. Cada grupo devuelve {nombre: resultado}, con
+resultado = {"value": float, "unit": str, "higher": bool}; higher=True
+significa que más es mejor (MB/s, ops/s) y False que menos es mejor (ms).
+"""
+import os
+import threading
+import time
+import timeit
+from typing import Callable, Dict, List
+
+from crc.crc_core import crc_calc, explain_crc_long_division
+from link.proto import TYPE_DATA, build_data_frame, parse_frame
+from link.stream import MAX_PAYLOAD
+from link.tcp_peer import TcpPeer
+from link.transport import free_port, wait_listening
+
+# (etiqueta, polinomio): LFSR clásico de la GUI y modelos del catálogo
+CRC_POLYS = [
+    ("bits5", "11011"),
+    ("crc8", "CRC-8/SMBUS"),
+    ("crc16", "CRC-16/XMODEM"),
+    ("crc32", "CRC-32"),
+    ("crc64", "CRC-64/XZ"),
+]
+CRC_SIZES = [16, 1 << 10, 64 << 10, 1 << 20, 16 << 20]
+PROTO_SIZES = [16, 1 << 10, MAX_PAYLOAD]
+EXPLAIN_SIZES = [4, 16, 64]
+PROTO_POLY = "CRC-16/XMODEM"
+
+Results = Dict[str, Dict]
+
+
+def result(value: float, unit: str, higher: bool = True) -> Dict:
+    return {"value": value, "unit": unit, "higher": higher}
+
+
+def per_second(fn: Callable[[], object], min_time: float) -> float:
+    """Llamadas por segundo de fn, repitiendo hasta durar al menos min_time."""
+    timer = timeit.Timer(fn)
+    n = 1
+    while True:
+        t = timer.timeit(n)
+        if t >= min_time:
+            return n / t
+        n = max(n * 2, int(n * min_time / max(t, 1e-9) * 1.1))
+
+
+def bench_crc(quick: bool = False, min_time: float = 0.2) -> Results:
+    out = {}
+    sizes = CRC_SIZES[:-1] if quick else CRC_SIZES
+    for label, poly in CRC_POLYS:
+        for size in sizes:
+            data = os.urandom(size)
+            calls = per_second(lambda: crc_calc(data, poly), min_time)
+            out[f"crc/{label}/{size}"] = result(calls * size / 1e6, "MB/s")
+    return out
+
+
+def bench_proto(quick: bool = False, min_time: float = 0.2) -> Results:
+    out = {}
+    for size in PROTO_SIZES:
+        payload = os.urandom(size)
+        frame = build_data_frame(payload, PROTO_POLY, 1)
+        out[f"proto/build/{size}"] = result(
+            per_second(lambda: build_data_frame(payload, PROTO_POLY, 1), min_time), "ops/s")
+        out[f"proto/parse/{size}"] = result(
+            per_second(lambda: parse_frame(frame, PROTO_POLY).crc_ok, min_time), "ops/s")
+    return out
+
+
+def bench_explain(quick: bool = False, min_time: float = 0.2) -> Results:
+    out = {}
+    for size in EXPLAIN_SIZES:
+        data = os.urandom(size)
+        calls = per_second(lambda: explain_crc_long_division(data, "CRC-32"), min_time)
+        out[f"explain/crc32/{size}"] = result(1e3 / calls, "ms", higher=False)
+    return out
+
+
+def _percentile(xs: List[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+def bench_loopback(quick: bool = False, min_time: float = 0.2) -> Results:
+    """
+    Ida y vuelta por TcpPeer en 127.0.0.1: el eco responde cada trama DATA
+    al puerto del emisor (como un ACK). Ambos sentidos usan las conexiones
+    persistentes de link.pool, como la GUI. RTT medido de send() (que solo
+    encola) a on_data(), con la conexión ya abierta tras la primera trama;
+    frames/s con tramas seguidas, que el pool junta en cada sendmsg.
+    """
+    n = 200 if quick else 1000
+    payload = os.urandom(64)
+    port_a, port_b = free_port(), free_port()
+    got = threading.Event()
+    count = [0]
+
+    def echo(data, addr):
+        res = parse_frame(data, PROTO_POLY)
+        if res.type == TYPE_DATA:
+            b.send("127.0.0.1", port_a, bytes(data))
+
+    def on_reply(data, addr):
+        count[0] += 1
+        got.set()
+
+    a = TcpPeer("127.0.0.1", port_a, on_data=on_reply, crc_bytes=2)
+    b = TcpPeer("127.0.0.1", port_b, on_data=echo, crc_bytes=2)
+    a.start()
+    b.start()
+    try:
+        wait_listening(port_a)
+        wait_listening(port_b)
+        frame = build_data_frame(payload, PROTO_POLY, 0)
+        rtts = []
+        for _ in range(n):
+            got.clear()
+            t0 = time.perf_counter()
+            a.send("127.0.0.1", port_b, frame)
+            if not got.wait(2.0):
+                raise TimeoutError("loopback: sin respuesta del eco")
+            rtts.append(time.perf_counter() - t0)
+        count[0] = 0
+        t0 = time.perf_counter()
+        for _ in range(n):
+            a.send("127.0.0.1", port_b, frame)
+        end = time.monotonic() + 10.0
+        while count[0] < n and time.monotonic() < end:
+            time.sleep(0.001)
+        fps = count[0] / (time.perf_counter() - t0)
+    finally:
+        a.stop()
+        b.stop()
+    return {
+        "loopback/tcp/frames_per_s": result(fps, "frames/s"),
+        "loopback/tcp/rtt_p50": result(_percentile(rtts, 50) * 1e3, "ms", higher=False),
+        "loopback/tcp/rtt_p99": result(_percentile(rtts, 99) * 1e3, "ms", higher=False),
+    }
+
+
+GROUPS = {
+    "crc": bench_crc,
+    "proto": bench_proto,
+    "explain": bench_explain,
+    "loopback": bench_loopback,
+}
@@ -0,0 +1,40 @@
+import argparse
+import os
+import sys
+import time
+
+from crc.models import CATALOG, resolve_model, verify_catalog
+from crc.parallel import crc_file
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m crc", description="CRC de archivos en paralelo")
+    p.add_argument("archivos", nargs="*")
+    p.add_argument("--poly", default="CRC-32", help="cadena de bits o modelo del catálogo")
+    p.add_argument("--procesos", type=int, default=None, help="por defecto, todos los núcleos")
+    p.add_argument("--tiempo", action="store_true", help="mostrar tiempo y MB/s")
+    p.add_argument("--listar", action="store_true", help="listar modelos y verificar su check")
+    a = p.parse_args(argv)
+
+    if a.listar:
+        bad = set(verify_catalog())
+        for name, m in CATALOG.items():
+            print(f"{name:20s} width={m.width:2d} poly=0x{m.poly:0{m.nbytes * 2}x} "
+                  f"check=0x{m.check:0{m.nbytes * 2}x} {'FALLA' if name in bad else 'ok'}")
+        return 1 if bad else 0
+
+    model = resolve_model(a.poly)
+    for path in a.archivos:
+        t0 = time.perf_counter()
+        crc = crc_file(path, model, a.procesos)
+        dt = time.perf_counter() - t0
+        line = f"{crc:0{model.nbytes * 2}x}  {path}"
+        if a.tiempo:
+            mb = os.path.getsize(path) / 1e6
+            line += f"  ({dt:.2f} s, {mb / dt if dt else 0:.1f} MB/s)"
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+"""
+Análisis de polinomios CRC para una longitud de datos dada: distancia de
+Hamming (HD), número de errores no detectados por peso y cobertura de
+ráfagas, más una búsqueda exhaustiva en paralelo de los mejores polinomios
+de un ancho.
+
+Un patrón de error pasa sin detectar si la suma (XOR) de los síndromes de
+sus bits es 0. El síndrome de cada bit de la palabra de código (datos + CRC)
+es x^p mod G en los modelos con n ceros añadidos; en el LFSR clásico de
+POLY_BITS (augmented=False) los datos dan x^p mod G y los bits del CRC son
+unitarios, así que el último bit de datos y el bit 0 del CRC se anulan y la
+HD es siempre 2. init, xorout y la reflexión no cambian qué patrones pasan
+(solo reordenan bits dentro de cada byte).
+
+Con G impar el código es invariante por desplazamiento y basta mirar
+patrones con el bit más bajo en la posición 0: pesos 3 y 4 por búsqueda en
+la tabla de síndromes y peso 5 por encuentro a mitad de camino, O(n^2).
+Sin detectar nada hasta MAX_WEIGHT la HD queda como cota (hd_exact=False).
+
+python -m crc.analysis --poly CRC-16/XMODEM --bytes 69
+python -m crc.analysis --buscar 16 --bytes 69 --top 10
+"""
+import argparse
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from crc.engine import check_width
+from crc.models import ModelSpec, resolve_model
+
+MAX_WEIGHT = 5
+BURST_EXTRA = 8  # ráfagas hasta width + BURST_EXTRA bits
+SEARCH_CHUNK = 64
+
+
+@dataclass(frozen=True)
+class PolyAnalysis:
+    width: int
+    poly: int
+    data_bits: int
+    augmented: bool
+    hd: int
+    hd_exact: bool
+    # peso -> patrones no detectados (solo pesos < hd, que son 0, y hd)
+    weights: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def undetected(self) -> int:
+        """Patrones no detectados de peso hd (0 si hd es solo una cota)."""
+        return self.weights.get(self.hd, 0)
+
+    def summary(self) -> str:
+        hd = f"{self.hd}" if self.hd_exact else f">={self.hd}"
+        return (f"poly=0x{self.poly:0{(self.width + 3) // 4}x} width={self.width} "
+                f"datos={self.data_bits} bits HD={hd} no detectados(peso {self.hd})={self.undetected}")
+
+
+def syndromes(poly: int, width: int, data_bits: int, augmented: bool = True) -> List[int]:
+    """
+    Síndrome de cada bit de la palabra de código, desde el final:
+    posiciones 0..width-1 son el CRC y luego los datos.
+    """
+    check_width(width)
+    top = 1 << width
+    g = top | poly
+    n = data_bits + width if augmented else data_bits
+    out = []
+    v = 1
+    for _ in range(n):
+        out.append(v)
+        v <<= 1
+        if v & top:
+            v ^= g
+    if not augmented:
+        out = [1 << i for i in range(width)] + out
+    return out
+
+
+def _weights_cyclic(cols: List[int], max_weight: int) -> Tuple[int, Dict[int, int]]:
+    """G impar, columnas distintas y no nulas: patrones con el bit más bajo en 0."""
+    n = len(cols)
+    pos = {v: p for p, v in enumerate(cols)}
+    get = pos.get
+    weights = {1: 0, 2: 0}
+
+    # peso 3: 1 + x^a + x^b, 0 < a < b; cada patrón cabe en n - b posiciones
+    a3 = 0
+    for a in range(1, n):
+        b = get(1 ^ cols[a], 0)
+        if b > a:
+            a3 += n - b
+    weights[3] = a3
+    if a3 or max_weight < 4:
+        return 3, weights
+
+    # peso 4: 1 + x^a + x^b + x^c, 0 < a < b < c
+    a4 = 0
+    for a in range(1, n - 2):
+        ya = 1 ^ cols[a]
+        for b in range(a + 1, n - 1):
+            c = get(ya ^ cols[b], 0)
+            if c > b:
+                a4 += n - c
+    weights[4] = a4
+    if a4 or max_weight < 5:
+        return 4, weights
+
+    # peso 5: 1 + x^a + x^b = x^c + x^d, 0 < a < b < c < d. Se recorre b hacia
+    # abajo y la tabla guarda, por síndrome, la suma de (n - d) de los pares
+    # (c, d) con c > b: O(n^2) en vez de O(n^4)
+    a5 = 0
+    table: Dict[int, int] = {}
+    tget = table.get
+    for b in range(n - 3, 1, -1):
+        c = b + 1
+        xc = cols[c]
+        for d in range(c + 1, n):
+            v = xc ^ cols[d]
+            table[v] = tget(v, 0) + n - d
+        yb = 1 ^ cols[b]
+        for a in range(1, b):
+            a5 += tget(yb ^ cols[a], 0)
+    weights[5] = a5
+    if a5 or max_weight < 6:
+        return 5, weights
+    return 6, weights
+
+
+def _weights_generic(cols: List[int], max_weight: int) -> Tuple[int, Dict[int, int]]:
+    """Columnas distintas y no nulas, sin invariancia por desplazamiento."""
+    n = len(cols)
+    pos = {v: p for p, v in enumerate(cols)}
+    get = pos.get
+    weights = {1: 0, 2: 0}
+    a3 = 0
+    pairs: Counter = Counter()
+    for i in range(n):
+        ci = cols[i]
+        for j in range(i + 1, n):
+            v = ci ^ cols[j]
+            if get(v, -1) > j:
+                a3 += 1
+            if max_weight >= 4:
+                pairs[v] += 1
+    weights[3] = a3
+    if a3 or max_weight < 4:
+        return 3, weights
+    # cada 4-subconjunto con XOR 0 aparece en sus 3 particiones en pares
+    weights[4] = sum(k * (k - 1) // 2 for k in pairs.values()) // 3
+    if weights[4]:
+        return 4, weights
+    return 5, weights
+
+
+def analyze_poly(poly: int, width: int, data_bits: int, augmented: bool = True,
+                 max_weight: int = MAX_WEIGHT) -> PolyAnalysis:
+    """HD y patrones no detectados de peso HD para data_bits bits de datos."""
+    cols = syndromes(poly, width, data_bits, augmented)
+    weights = {1: cols.count(0)}
+    hd = 1
+    if not weights[1]:
+        hd = 2
+        weights[2] = sum(k * (k - 1) // 2 for k in Counter(cols).values())
+        if not weights[2] and max_weight >= 3:
+            if augmented and poly & 1:
+                hd, weights = _weights_cyclic(cols, max_weight)
+            else:
+                hd, weights = _weights_generic(cols, max_weight)
+    exact = weights.get(hd, 0) > 0
+    return PolyAnalysis(width, poly, data_bits, augmented, hd, exact, weights)
+
+
+def analyze(spec: ModelSpec, data_bits: int, max_weight: int = MAX_WEIGHT) -> PolyAnalysis:
+    """Como analyze_poly, con un modelo del catálogo o una cadena de bits."""
+    m = resolve_model(spec)
+    return analyze_poly(m.poly, m.width, data_bits, m.augmented, max_weight)
+
+
+def _reduce(basis: List[int], v: int) -> int:
+    # reduce v contra una base en forma escalonada (bit alto distinto)
+    for b in basis:
+        v = min(v, v ^ b)
+    return v
+
+
+def burst_coverage(spec: ModelSpec, data_bits: int,
+                   max_len: Optional[int] = None) -> Dict[int, float]:
+    """
+    {longitud L: fracción de ráfagas de L bits (primer y último bit
+    erróneos, interior cualquiera) que pasan sin detectar}, promediada sobre
+    todas las posiciones de la palabra de código. Con síndromes h, una ráfaga
+    de [i, i+L-1] pasa con probabilidad 2^-rango(interior) si h_i ^ h_fin
+    está en el espacio generado por el interior, y 0 si no.
+    """
+    m = resolve_model(spec)
+    cols = syndromes(m.poly, m.width, data_bits, m.augmented)
+    n = len(cols)
+    max_len = min(n, max_len or m.width + BURST_EXTRA)
+    # con G impar y n ceros añadidos todas las posiciones son equivalentes
+    starts = [0] if (m.augmented and m.poly & 1) else range(n)
+    total = [0.0] * (max_len + 1)
+    count = [0] * (max_len + 1)
+    for i in starts:
+        basis: List[int] = []
+        last = min(n - i, max_len)
+        if last >= 1:
+            total[1] += cols[i] == 0
+            count[1] += 1
+        for L in range(2, last + 1):
+            if L > 2:
+                r = _reduce(basis, cols[i + L - 2])
+                if r:
+                    basis.append(r)
+                    basis.sort(reverse=True)
+            if not _reduce(basis, cols[i] ^ cols[i + L - 1]):
+                total[L] += 2.0 ** -len(basis)
+            count[L] += 1
+    return {L: total[L] / count[L] for L in range(1, max_len + 1) if count[L]}
+
+
+def _search_chunk(args) -> List[Tuple[int, int, bool, int]]:
+    polys, width, data_bits, max_weight = args
+    out = []
+    for p in polys:
+        r = analyze_poly(p, width, data_bits, True, max_weight)
+        out.append((p, r.hd, r.hd_exact, r.undetected))
+    return out
+
+
+def search(width: int, data_bits: int, top: int = 10, workers: Optional[int] = None,
+           max_weight: int = MAX_WEIGHT, polys: Optional[Iterable[int]] = None) -> List[PolyAnalysis]:
+    """
+    Los `top` mejores polinomios de `width` bits para data_bits bits de datos:
+    mayor HD y, a igual HD, menos patrones no detectados de peso HD. Por
+    defecto prueba todos los polinomios con término x^0 (2^(width-1)),
+    repartidos en un pool de procesos.
+    """
+    check_width(width)
+    if polys is None:
+        polys = range(1, 1 << width, 2)
+    polys = list(polys)
+    chunks = [(polys[i:i + SEARCH_CHUNK], width, data_bits, max_weight)
+              for i in range(0, len(polys), SEARCH_CHUNK)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = [r for c in chunks for r in _search_chunk(c)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [r for rs in pool.map(_search_chunk, chunks) for r in rs]
+    # cota (hd_exact=False) antes que exacta: no se encontró ningún patrón
+    results.sort(key=lambda r: (-r[1], r[2], r[3], r[0]))
+    return [analyze_poly(p, width, data_bits, True, max_weight) for p, *_ in results[:top]]
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m crc.analysis",
+                                description="HD, errores no detectados y ráfagas de un polinomio CRC")
+    g = p.add_mutually_exclusive_group(required=True)
+    g.add_argument("--poly", help="cadena de bits o modelo del catálogo")
+    g.add_argument("--buscar", type=int, metavar="ANCHO", help="probar todos los polinomios de ese ancho")
+    p.add_argument("--bytes", type=int, default=64, help="longitud de los datos protegidos (cabecera + payload)")
+    p.add_argument("--top", type=int, default=10)
+    p.add_argument("--procesos", type=int, default=None, help="por defecto, todos los núcleos")
+    p.add_argument("--rafagas", type=int, default=None, help="longitud máxima de ráfaga (ancho + 8)")
+    a = p.parse_args(argv)
+    bits = 8 * a.bytes
+
+    if a.buscar:
+        for r in search(a.buscar, bits, a.top, a.procesos):
+            print(r.summary())
+        return 0
+
+    r = analyze(a.poly, bits)
+    print(r.summary())
+    print("pesos:", ", ".join(f"{w}:{c}" for w, c in sorted(r.weights.items())))
+    for L, f in burst_coverage(a.poly, bits, a.rafagas).items():
+        print(f"ráfaga {L:3d} bits: no detectadas {f:.3g}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
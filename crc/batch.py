@@ -0,0 +1,207 @@
+"""
+CRC de muchas tramas a la vez con NumPy: todas las tramas avanzan un byte
+por paso con una búsqueda vectorizada en la tabla del modelo.
+
+NumPy es opcional: el resto del paquete no lo necesita.
+"""
+from typing import Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from crc.engine import _REV8, _shift_in_table, lsb_tables, msb_tables
+from crc.models import CrcModel, ModelSpec, resolve_model
+
+HEADER_LEN = 5  # VER, TYPE, SEQ, LEN(2) de link.proto
+# link.proto v2: VER=2, TYPE, FLAGS, ancho, SEQ(4) y LEN varint de 1..4 bytes
+VER2 = 2
+V2_FIXED = 8
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("crc.batch requiere numpy (pip install numpy)")
+
+
+def pack_frames(frames: Sequence) -> Tuple["np.ndarray", bytes]:
+    """Lista de buffers -> (offsets de N+1 posiciones, datos concatenados)."""
+    _require_numpy()
+    lens = np.fromiter((memoryview(f).nbytes for f in frames), dtype=np.int64, count=len(frames))
+    offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+    np.cumsum(lens, out=offsets[1:])
+    return offsets, b"".join(frames)
+
+
+def _as_packed(frames, offsets):
+    if offsets is None:
+        offsets, data = pack_frames(frames)
+    else:
+        data = frames
+    offsets = np.asarray(offsets, dtype=np.int64)
+    return offsets, np.frombuffer(data, dtype=np.uint8)
+
+
+def _reflect_vec(v: "np.ndarray", width: int) -> "np.ndarray":
+    r = np.zeros_like(v)
+    one = np.uint64(1)
+    for i in range(width):
+        r |= ((v >> np.uint64(i)) & one) << np.uint64(width - 1 - i)
+    return r
+
+
+def _divx_vec(v: "np.ndarray", model: CrcModel) -> "np.ndarray":
+    top = np.uint64(1 << (model.width - 1))
+    poly = np.uint64(model.poly)
+    one = np.uint64(1)
+    for _ in range(model.width):
+        v = np.where(v & one, ((v ^ poly) >> one) | top, v >> one)
+    return v
+
+
+def _final_vec(model: CrcModel, regs: "np.ndarray") -> "np.ndarray":
+    if model._via_direct:
+        if model.refin:
+            regs = _reflect_vec(regs, model.width)
+        if not model.augmented:
+            regs = _divx_vec(regs, model)
+    if model.refout:
+        regs = _reflect_vec(regs, model.width)
+    return regs ^ np.uint64(model.xorout)
+
+
+def _step_fn(model: CrcModel):
+    """Devuelve (registro inicial, paso vectorizado reg, byte -> reg, desescalado)."""
+    w = model.width
+    u8 = np.uint64(8)
+    if not model._via_direct:
+        mask = np.uint64(model.mask)
+        rev = np.array(_REV8, dtype=np.uint64) if model.refin else None
+        if w >= 8:
+            table = np.array(msb_tables(model.poly, w, 1)[0], dtype=np.uint64)
+            sh = np.uint64(w - 8)
+
+            def step(reg, b):
+                if rev is not None:
+                    b = rev[b]
+                return ((reg << u8) & mask) ^ b ^ table[reg >> sh]
+        else:
+            table = np.array(_shift_in_table(model.poly, w), dtype=np.uint64)
+
+            def step(reg, b):
+                if rev is not None:
+                    b = rev[b]
+                return table[(reg << u8) | b]
+        return model.start(), step, 0
+    if model.refin:
+        table = np.array(lsb_tables(model.poly, w, 1)[0], dtype=np.uint64)
+        ff = np.uint64(0xFF)
+
+        def step(reg, b):
+            return (reg >> u8) ^ table[(reg ^ b) & ff]
+        return model.start(), step, 0
+    # directo MSB, escalado a W >= 8 bits como en engine.update_msb()
+    big = max(w, 8)
+    up = big - w
+    table = np.array(msb_tables(model.poly << up, big, 1)[0], dtype=np.uint64)
+    mask = np.uint64((1 << big) - 1)
+    sh = np.uint64(big - 8)
+
+    def step(reg, b):
+        return ((reg << u8) & mask) ^ table[(reg >> sh) ^ b]
+    return model.start() << up, step, up
+
+
+def _crc_regions(model: CrcModel, data: "np.ndarray", starts: "np.ndarray",
+                 lengths: "np.ndarray") -> "np.ndarray":
+    n = len(starts)
+    reg0, step, up = _step_fn(model)
+    # orden por longitud descendente: en el paso j las tramas activas son un prefijo
+    order = np.argsort(-lengths, kind="stable")
+    s_starts = starts[order]
+    s_lens = lengths[order]
+    regs = np.full(n, reg0, dtype=np.uint64)
+    maxlen = int(s_lens[0]) if n else 0
+    counts = np.searchsorted(-s_lens, -np.arange(maxlen), side="left")
+    for j in range(maxlen):
+        c = counts[j]
+        b = data[s_starts[:c] + j].astype(np.uint64)
+        regs[:c] = step(regs[:c], b)
+    if up:
+        regs >>= np.uint64(up)
+    out = np.empty(n, dtype=np.uint64)
+    out[order] = _final_vec(model, regs)
+    return out
+
+
+def crc_calc_batch(frames, poly_bits: ModelSpec, offsets: Optional[Sequence[int]] = None) -> "np.ndarray":
+    """
+    CRC de cada trama. frames es una lista de buffers o, si se da offsets
+    (N+1 posiciones), un único buffer con las tramas concatenadas.
+    Devuelve un array uint64 con crc_calc(trama, poly_bits) de cada una.
+    """
+    _require_numpy()
+    model = resolve_model(poly_bits)
+    offsets, data = _as_packed(frames, offsets)
+    return _crc_regions(model, data, offsets[:-1], np.diff(offsets))
+
+
+def verify_batch(frames, poly_bits: ModelSpec, offsets: Optional[Sequence[int]] = None) -> "np.ndarray":
+    """
+    Máscara booleana: True si la trama de link.proto tiene LEN coherente y
+    su CRC final coincide con el calculado sobre cabecera + payload.
+    """
+    _require_numpy()
+    offsets, data = _as_packed(frames, offsets)
+    return verify_regions(data, offsets[:-1], np.diff(offsets), poly_bits)
+
+
+def _varint_len(data: "np.ndarray", starts: "np.ndarray", ends: "np.ndarray"):
+    """(LEN, largo de cabecera) de tramas v2; largo -1 si el varint no cierra antes de ends."""
+    ln = np.zeros(len(starts), dtype=np.int64)
+    hlen = np.full(len(starts), -1, dtype=np.int64)
+    open_ = np.ones(len(starts), dtype=bool)
+    for k in range(4):
+        pos = starts + V2_FIXED + k
+        open_ &= pos < ends
+        b = data[np.where(open_, pos, 0)].astype(np.int64)
+        ln |= np.where(open_, (b & 0x7F) << (7 * k), 0)
+        done = open_ & (b < 0x80)
+        hlen[done] = V2_FIXED + k + 1
+        open_ &= ~done
+    return ln, hlen
+
+
+def verify_regions(data, starts, lengths, poly_bits: ModelSpec) -> "np.ndarray":
+    """
+    Como verify_batch, con las tramas en data[starts[i]:starts[i] + lengths[i]]
+    (no hace falta que sean contiguas, p. ej. un mmap de link.capture).
+    """
+    _require_numpy()
+    model = resolve_model(poly_bits)
+    nb = model.nbytes
+    if not isinstance(data, np.ndarray):
+        data = np.frombuffer(data, dtype=np.uint8)
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    valid = lengths >= HEADER_LEN + nb
+    body = np.where(valid, lengths - nb, 0)
+    calc = _crc_regions(model, data, starts, body)
+
+    vs = starts[valid]
+    vend = vs + lengths[valid]
+    recv = np.zeros(len(vs), dtype=np.uint64)
+    for k in range(nb):
+        recv = (recv << np.uint64(8)) | data[vend - nb + k].astype(np.uint64)
+    recv &= np.uint64(model.mask)
+    ln = (data[vs + 3].astype(np.int64) << 8) | data[vs + 4]
+    hlen = np.full(len(vs), HEADER_LEN, dtype=np.int64)
+    v2 = data[vs] == VER2
+    if v2.any():
+        ln[v2], hlen[v2] = _varint_len(data, vs[v2], vend[v2] - nb)
+        # la trama declara el ancho del CRC: otro ancho no puede ser válida
+        hlen[v2 & (data[vs + 3] != model.width)] = -1
+    ok = np.zeros(len(starts), dtype=bool)
+    ok[valid] = (recv == calc[valid]) & (hlen >= 0) & (ln == lengths[valid] - hlen - nb)
+    return ok
@@ -1,4 +1,7 @@
-from typing import List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from crc.engine import check_width, mulmod, xpow
+from crc.models import ModelSpec, resolve_model, with_init
 
 def bits_from_bytes(data: bytes) -> List[int]:
     bits: List[int] = []
@@ -7,6 +10,11 @@ def bits_from_bytes(data: bytes) -> List[int]:
             bits.append((b >> i) & 1)
     return bits
 
+def bits_str(data) -> str:
+    """'0101...' de data (MSB primero) con una sola conversión entera."""
+    n = len(data)
+    return format(int.from_bytes(data, "big"), f"0{8 * n}b") if n else ""
+
 def bytes_from_bits(bits: List[int]) -> bytes:
     out = bytearray()
     for i in range(0, len(bits), 8):
@@ -28,10 +36,25 @@ def parse_bitstring(s: str) -> bytes:
     bits = [(1 if c == "1" else 0) for c in s2]
     return bytes_from_bits(bits)
 
-def crc_calc(data: bytes, poly_bits: str, init: int = 0) -> int:
+def crc_calc(data: bytes, poly_bits: ModelSpec, init: int = 0, slices=None) -> int:
+    """
+    CRC sobre el motor de tablas. poly_bits es la cadena de bits clásica
+    (LFSR sin aumentar, ancho = longitud) o un modelo/nombre del catálogo.
+    slices: 1, 4 u 8 bytes por paso; None elige según ancho y tamaño.
+    """
+    model = resolve_model(poly_bits)
+    if init:
+        model = with_init(model, init)
+    return model.calc(data, slices)
+
+def crc_combine(crc_a: int, crc_b: int, len_b: int, poly_bits: ModelSpec) -> int:
+    """crc_calc(a + b) a partir de crc_calc(a), crc_calc(b) y len(b)."""
+    return resolve_model(poly_bits).combine(crc_a, crc_b, len_b)
+
+def crc_calc_bitwise(data: bytes, poly_bits: str, init: int = 0) -> int:
+    """Versión bit a bit original; sirve de referencia para el motor de tablas."""
     n = len(poly_bits)
-    if n < 1 or n > 8:
-        raise ValueError("POLY_BITS debe tener entre 1 y 8 bits")
+    check_width(n)
     mask = (1 << n) - 1
     poly = int(poly_bits, 2) & mask
     reg = init & mask
@@ -42,114 +65,252 @@ def crc_calc(data: bytes, poly_bits: str, init: int = 0) -> int:
             reg ^= poly
     return reg & mask
 
-def pack_lowbits(msg: bytes, poly_bits: str) -> Tuple[bytes, int]:
-    n = len(poly_bits)
-    crc = crc_calc(msg, poly_bits)
-    last = crc & ((1 << n) - 1)
-    return msg + bytes([last]), crc
+def pack_lowbits(msg: bytes, poly_bits: ModelSpec) -> Tuple[bytes, int]:
+    model = resolve_model(poly_bits)
+    crc = model.calc(msg)
+    return msg + model.to_bytes(crc), crc
 
-def unpack_and_verify(frame: bytes, poly_bits: str):
-    n = len(poly_bits)
-    if not frame:
-        raise ValueError("frame vacío")
-    crc_recv = frame[-1] & ((1 << n) - 1)
-    payload = frame[:-1]
-    calc = crc_calc(payload, poly_bits)
-    ok = (calc == crc_recv)
-    return {
-        "ok": ok,
-        "payload": payload,
-        "crc_recv": crc_recv,
-        "crc_calc": calc,
-        "n": n,
-        "poly_bits": poly_bits,
-        "payload_bits": "".join(str(b) for b in bits_from_bytes(payload)),
-        "crc_recv_bits": format(crc_recv, f"0{n}b"),
-        "crc_calc_bits": format(calc, f"0{n}b"),
-    }
-
-def explain_crc_steps(data: bytes, poly_bits: str) -> str:
-    """Retorna un texto con el proceso LFSR paso a paso, consistente con crc_calc()."""
+class DictAccess:
+    """
+    Acceso estilo dict (r["campo"], get, keys, to_dict) sobre los atributos
+    de _FIELDS, para quien usaba el resultado como dict. Los memoryview se
+    devuelven como bytes, igual que antes.
+    """
+    __slots__ = ()
+    _FIELDS: Tuple[str, ...] = ()
+
+    def __getitem__(self, key: str):
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        v = getattr(self, key)
+        return bytes(v) if isinstance(v, memoryview) else v
+
+    def get(self, key: str, default=None):
+        return self[key] if key in self._FIELDS else default
+
+    def __contains__(self, key) -> bool:
+        return key in self._FIELDS
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._FIELDS
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: self[k] for k in self._FIELDS}
+
+class CrcCheck(DictAccess):
+    """
+    Resultado de unpack_and_verify. payload es un memoryview sobre la trama
+    (sin copia); las cadenas de bits se generan en el primer acceso.
+    """
+    __slots__ = ("payload", "poly_bits", "n", "crc_recv", "crc_calc", "ok", "_payload_bits")
+    _FIELDS = ("ok", "payload", "crc_recv", "crc_calc", "n", "poly_bits",
+               "payload_bits", "crc_recv_bits", "crc_calc_bits")
+
+    def __init__(self, frame, poly_bits: ModelSpec):
+        model = resolve_model(poly_bits)
+        nb = model.nbytes
+        mv = memoryview(frame).cast("B")
+        if len(mv) < nb:
+            raise ValueError("frame vacío" if not len(mv) else "frame más corto que el CRC")
+        self.payload = mv[:len(mv) - nb]
+        self.poly_bits = poly_bits
+        self.n = model.width
+        self.crc_recv = int.from_bytes(mv[len(mv) - nb:], "big") & model.mask
+        self.crc_calc = model.calc(self.payload)
+        self.ok = self.crc_calc == self.crc_recv
+        self._payload_bits = None
+
+    @property
+    def payload_bits(self) -> str:
+        if self._payload_bits is None:
+            self._payload_bits = bits_str(self.payload)
+        return self._payload_bits
+
+    @property
+    def crc_recv_bits(self) -> str:
+        return format(self.crc_recv, f"0{self.n}b")
+
+    @property
+    def crc_calc_bits(self) -> str:
+        return format(self.crc_calc, f"0{self.n}b")
+
+def unpack_and_verify(frame: bytes, poly_bits: ModelSpec) -> CrcCheck:
+    return CrcCheck(frame, poly_bits)
+
+# bits de la trama que se muestran en la cabecera cuando hay summarize_after
+EXPLAIN_BITS_SHOWN = 1024
+
+def _explain_poly_bits(poly_bits: ModelSpec) -> str:
+    # los explicadores muestran el LFSR/la división con los bits del polinomio
+    if isinstance(poly_bits, str) and is_bitstring(poly_bits):
+        s = poly_bits.replace(" ", "")
+        check_width(len(s))
+        return s
+    return resolve_model(poly_bits).poly_bits
+
+def _bits_shown(bits: str, summarize: bool) -> str:
+    # al resumir, la cabecera tampoco puede ser una línea de 8·L caracteres
+    if not summarize or len(bits) <= 2 * EXPLAIN_BITS_SHOWN:
+        return bits
+    return (f"{bits[:EXPLAIN_BITS_SHOWN]}...{bits[-EXPLAIN_BITS_SHOWN // 4:]} "
+            f"({len(bits)} bits)")
+
+def _division_remainder(data, divisor_bits: str) -> int:
+    """
+    Resto de (data · x^n) / divisor, como la división larga, sin recorrerla:
+    CRC del LFSR de grado deg(divisor) y luego · x^n con el motor.
+    """
+    n = len(divisor_bits)
+    d = divisor_bits.lstrip("0")
+    m = len(d) - 1  # grado del divisor
+    if m <= 0:
+        return 0
+    poly = int(d[1:], 2)
+    r = resolve_model(d[1:]).calc(data)
+    return mulmod(r, xpow(n, poly, m), poly, m)
+
+def _dividend_bit(data, k: int) -> str:
+    """Bit k de data seguido de ceros (el dividendo de la división larga)."""
+    return "1" if k < 8 * len(data) and data[k >> 3] >> (7 - (k & 7)) & 1 else "0"
+
+def _dividend_shown(data, n: int, summarize: bool) -> str:
+    # como _bits_shown(bits_str(data) + "0" * n) sin armar los 8·L bits al resumir
+    total = 8 * len(data) + n
+    if not summarize or total <= 2 * EXPLAIN_BITS_SHOWN:
+        return _bits_shown(bits_str(data) + "0" * n, summarize)
+    tail = EXPLAIN_BITS_SHOWN // 4
+    head = bits_str(data[:EXPLAIN_BITS_SHOWN // 8])
+    end = (bits_str(data[-(tail // 8 + 1):]) + "0" * n)[-tail:]
+    return f"{head}...{end} ({total} bits)"
+
+def _finish_division(window: List[str], i: int, data, divisor_bits: str) -> str:
+    n = len(divisor_bits)
+    if divisor_bits[0] == "1":
+        return format(_division_remainder(data, divisor_bits), f"0{n}b")
+    # con un 0 delante la "resta" no anula el bit guía: se sigue el mismo
+    # recorrido que la división completa, sin generar texto
+    L = 8 * len(data) + n
+    while True:
+        if window[0] == "1":
+            window = ["0" if w == d else "1" for w, d in zip(window, divisor_bits)]
+        if i >= L - n:
+            return "".join(window)
+        i += 1
+        window = window[1:] + [_dividend_bit(data, i + n - 1)]
+
+def iter_crc_steps(data: bytes, poly_bits: ModelSpec,
+                   summarize_after: Optional[int] = None) -> Iterator[str]:
+    """
+    Pasos del LFSR uno a uno (cabecera, un paso por bit, resto final).
+    Con summarize_after=N, tras N pasos se omiten los demás y el resto se
+    calcula directamente, y de los bits de entrada se muestran el principio
+    y el final. "\n".join() da el texto de explain_crc_steps().
+    """
+    poly_bits = _explain_poly_bits(poly_bits)
     n = len(poly_bits)
-    if n < 1 or n > 8:
-        raise ValueError("POLY_BITS debe tener entre 1 y 8 bits")
     mask = (1 << n) - 1
     poly = int(poly_bits, 2) & mask
     reg = 0
+    nbits = 8 * len(data)
 
-    def _bits(d: bytes):
-        for b in d:
-            for i in range(7, -1, -1):
-                yield (b >> i) & 1
-
-    bits_in = "".join(str(b) for b in _bits(data))
-    lines = []
-    lines.append(f"polinomio: {poly_bits}  (n={n})")
-    lines.append(f"bits de entrada: {bits_in}")
-    lines.append(f"reg inicial: {format(reg, f'0{n}b')}\n")
+    yield (f"polinomio: {poly_bits}  (n={n})\n"
+           f"bits de entrada: {_bits_shown(bits_str(data), summarize_after is not None)}\n"
+           f"reg inicial: {format(reg, f'0{n}b')}\n")
 
     step = 0
-    for bit in _bits(data):
-        msb = (reg >> (n - 1)) & 1
-        shifted = ((reg << 1) & mask) | (bit & 1)
-        if msb:
-            reg = shifted ^ poly
-            action = f"XOR poly ({poly_bits})"
-        else:
-            reg = shifted
-            action = "sin XOR"
-        step += 1
-        lines.append(
-            f"paso {step:02d}: in={bit} msb={msb}  shift={format(shifted, f'0{n}b')}  -> {action}  reg={format(reg, f'0{n}b')}"
-        )
-
-    lines.append(f"\nresto final (CRC): {format(reg, f'0{n}b')}")
-    return "\n".join(lines)
+    for b in data:
+        for i in range(7, -1, -1):
+            if summarize_after is not None and step >= summarize_after:
+                yield f"... {nbits - step} pasos más omitidos"
+                reg = resolve_model(poly_bits).calc(data)
+                yield f"\nresto final (CRC): {format(reg, f'0{n}b')}"
+                return
+            bit = (b >> i) & 1
+            msb = (reg >> (n - 1)) & 1
+            shifted = ((reg << 1) & mask) | bit
+            if msb:
+                reg = shifted ^ poly
+                action = f"XOR poly ({poly_bits})"
+            else:
+                reg = shifted
+                action = "sin XOR"
+            step += 1
+            yield f"paso {step:02d}: in={bit} msb={msb}  shift={format(shifted, f'0{n}b')}  -> {action}  reg={format(reg, f'0{n}b')}"
 
+    yield f"\nresto final (CRC): {format(reg, f'0{n}b')}"
 
-def explain_crc_long_division(data: bytes, poly_bits: str) -> str:
+def iter_crc_long_division(data: bytes, poly_bits: ModelSpec,
+                           summarize_after: Optional[int] = None) -> Iterator[str]:
     """
-    División binaria en GF(2) con presentación de resta apilada.
-    Muestra el generador, la trama (datos + n ceros) y las restas alineadas.
+    División larga paso a paso: cabecera, una resta apilada por paso y el
+    residuo. Cada resta se genera solo cuando se pide, así que leer las
+    primeras no cuesta lo que la salida completa (que crece ~L² por la
+    sangría). Con summarize_after=N, tras N restas el residuo se calcula
+    directamente y la trama de la cabecera se recorta (principio y final).
+    "\n".join() da el texto de explain_crc_long_division().
     """
-    n = len(poly_bits)
-    if n < 1 or n > 8:
-        raise ValueError("POLY_BITS debe tener entre 1 y 8 bits")
-    divisor_bits = poly_bits
-    divisor = int(divisor_bits, 2)
-
-    # bits de la trama con n ceros añadidos
-    def _bits(d: bytes):
-        for b in d:
-            for i in range(7, -1, -1):
-                yield (b >> i) & 1
-    dividend_bits = "".join(str(b) for b in _bits(data)) + "0"*n
-
-    # trabajo como lista de '0'/'1'
-    work = list(dividend_bits)
-    L = len(work)
-
-    lines = []
-    lines.append(f"generador: {divisor_bits}")
-    lines.append(f"trama:     {dividend_bits}\n")
+    divisor_bits = _explain_poly_bits(poly_bits)
+    n = len(divisor_bits)
+    # dividendo: bits de la trama con n ceros añadidos
+    L = 8 * len(data) + n
+
+    yield f"generador: {divisor_bits}\ntrama:     {_dividend_shown(data, n, summarize_after is not None)}\n"
 
+    # solo se guardan los n bits bajo el generador (work[i:i+n]): la resta no
+    # toca lo de delante y lo de detrás sigue siendo el dividendo, así que la
+    # memoria no crece con la trama mientras el generador espera en una LRU
+    window = [_dividend_bit(data, k) for k in range(n)]
+    steps = 0
     i = 0
-    while i <= L - n:
-        if work[i] == "1":
+    while True:
+        if window[0] == "1":
+            if summarize_after is not None and steps >= summarize_after:
+                yield f"... restas siguientes omitidas (resumen tras {steps})\n"
+                yield f"residuo:   {_finish_division(window, i, data, divisor_bits)}"
+                return
             # segmento actual y "resta" (XOR) del generador alineado
-            segment = "".join(work[i:i+n])
+            segment = "".join(window)
             # resultado de la resta bit a bit
             res_bits = "".join("0" if segment[j] == divisor_bits[j] else "1" for j in range(n))
-            # aplicar la resta al trabajo
-            for j in range(n):
-                work[i+j] = "0" if work[i+j] == divisor_bits[j] else "1"
+            window = list(res_bits)
             indent = " " * i
-            lines.append(f"{indent}{segment}")
-            lines.append(f"{indent}{divisor_bits}")
-            lines.append(f"{indent}{'-'*n}")
-            lines.append(f"{indent}{res_bits}\n")
+            steps += 1
+            yield f"{indent}{segment}\n{indent}{divisor_bits}\n{indent}{'-'*n}\n{indent}{res_bits}\n"
+        if i >= L - n:
+            break
         i += 1
+        window = window[1:] + [_dividend_bit(data, i + n - 1)]
 
-    resto = "".join(work[-n:])
-    lines.append(f"residuo:   {resto}")
-    return "\n".join(lines)
+    yield f"residuo:   {''.join(window)}"
+
+def limit_steps(steps: Iterable[str], max_steps: Optional[int] = None,
+                max_bytes: Optional[int] = None) -> Iterator[str]:
+    """Corta un iterador de pasos por número de pasos o de caracteres."""
+    total = 0
+    for k, s in enumerate(steps):
+        if max_steps is not None and k >= max_steps:
+            yield "... (salida truncada)"
+            return
+        if max_bytes is not None and total + len(s) > max_bytes:
+            yield s[:max(0, max_bytes - total)] + "... (salida truncada)"
+            return
+        total += len(s) + 1
+        yield s
+
+def explain_crc_steps(data: bytes, poly_bits: ModelSpec, max_steps: Optional[int] = None,
+                      max_bytes: Optional[int] = None) -> str:
+    """
+    Retorna un texto con el proceso LFSR paso a paso, consistente con crc_calc()
+    para POLY_BITS clásico. Con un modelo del catálogo solo se usa su polinomio
+    (sin init, reflexión ni xorout). max_steps/max_bytes acotan la salida.
+    """
+    return "\n".join(limit_steps(iter_crc_steps(data, poly_bits), max_steps, max_bytes))
+
+def explain_crc_long_division(data: bytes, poly_bits: ModelSpec, max_steps: Optional[int] = None,
+                              max_bytes: Optional[int] = None) -> str:
+    """
+    División binaria en GF(2) con presentación de resta apilada.
+    Muestra el generador, la trama (datos + n ceros) y las restas alineadas.
+    max_steps/max_bytes acotan la salida (ver iter_crc_long_division).
+    """
+    return "\n".join(limit_steps(iter_crc_long_division(data, poly_bits), max_steps, max_bytes))
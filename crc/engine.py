@@ -0,0 +1,310 @@
+"""
+Motor CRC por tablas: byte a byte (slicing-by-1) o slicing-by-4/8.
+
+Todas las funciones trabajan sobre el registro de n bits en el dominio
+"directo" (MSB primero): un paso de byte es  reg = (reg·x^8 + b·x^n) mod G,
+con G = x^n + poly.  El modo de crc_calc() (desplazar el bit de dato dentro
+del registro, sin aumentar el mensaje) se obtiene de ahí con un cambio de
+registro inicial y una corrección final por x^-n (ver update_shift_in()).
+"""
+import sys
+from array import array
+from functools import lru_cache
+from typing import Tuple
+
+MAX_WIDTH = 64
+SLICES = (1, 4, 8)
+
+# por debajo de este tamaño no compensa convertir a palabras
+AUTO_SLICE_MIN = 64
+# las palabras se convierten por bloques para no copiar buffers enteros
+WORD_BLOCK = 1 << 16
+
+_WORD_TYPE = {}
+for _tc in ("I", "L", "Q"):
+    _WORD_TYPE.setdefault(array(_tc).itemsize, _tc)
+
+
+def check_width(width: int):
+    if width < 1 or width > MAX_WIDTH:
+        raise ValueError(f"el ancho del CRC debe estar entre 1 y {MAX_WIDTH} bits")
+
+
+def mulxmod(v: int, k: int, poly: int, width: int) -> int:
+    """v·x^k mod G, bit a bit (v < 2^width)."""
+    top = 1 << (width - 1)
+    mask = (1 << width) - 1
+    for _ in range(k):
+        if v & top:
+            v = ((v << 1) & mask) ^ poly
+        else:
+            v = (v << 1) & mask
+    return v
+
+
+def divx(v: int, k: int, poly: int, width: int) -> int:
+    """v·x^-k mod G. Requiere poly impar (x invertible módulo G)."""
+    top = 1 << (width - 1)
+    for _ in range(k):
+        if v & 1:
+            v = ((v ^ poly) >> 1) | top
+        else:
+            v >>= 1
+    return v
+
+
+def mulmod(a: int, b: int, poly: int, width: int) -> int:
+    """a·b mod G en GF(2)[x] (a, b < 2^width)."""
+    top = 1 << (width - 1)
+    mask = (1 << width) - 1
+    r = 0
+    for i in range(width - 1, -1, -1):
+        r = ((r << 1) & mask) ^ (poly if r & top else 0)
+        if (b >> i) & 1:
+            r ^= a
+    return r
+
+
+def xpow(k: int, poly: int, width: int) -> int:
+    """x^k mod G por cuadrados sucesivos."""
+    r = 1
+    base = mulxmod(1, 1, poly, width)
+    while k:
+        if k & 1:
+            r = mulmod(r, base, poly, width)
+        base = mulmod(base, base, poly, width)
+        k >>= 1
+    return r
+
+
+def reflect(v: int, width: int) -> int:
+    """Invierte el orden de los width bits bajos de v."""
+    r = 0
+    for _ in range(width):
+        r = (r << 1) | (v & 1)
+        v >>= 1
+    return r
+
+
+_REV8 = tuple(reflect(b, 8) for b in range(256))
+REV8_TRANS = bytes(_REV8)
+
+
+def _byte_xn(t: int, poly: int, width: int) -> int:
+    # t·x^width mod G para un byte t, alimentando sus bits en modo directo
+    top = 1 << (width - 1)
+    mask = (1 << width) - 1
+    reg = 0
+    for i in range(7, -1, -1):
+        fb = ((reg & top) != 0) ^ ((t >> i) & 1)
+        reg = (reg << 1) & mask
+        if fb:
+            reg ^= poly
+    return reg
+
+
+@lru_cache(maxsize=32)
+def msb_tables(poly: int, width: int, slices: int = 1) -> Tuple[Tuple[int, ...], ...]:
+    """
+    Tablas S_0..S_{k-1} con S_i[t] = t·x^(width+8i) mod G.
+    Se calculan una vez por (poly, width, slices) y quedan en caché LRU.
+    """
+    s0 = tuple(_byte_xn(t, poly, width) for t in range(256))
+    tables = [s0]
+    for _ in range(1, slices):
+        prev = tables[-1]
+        tables.append(tuple(mulxmod(v, 8, poly, width) for v in prev))
+    return tuple(tables)
+
+
+@lru_cache(maxsize=32)
+def lsb_tables(poly: int, width: int, slices: int = 1) -> Tuple[Tuple[int, ...], ...]:
+    """
+    Tablas para el algoritmo reflejado (bits de cada byte LSB primero):
+    R_i[u] = reflect(S_i[reflect8(u)]). Sirven para cualquier ancho 1..64.
+    """
+    return tuple(tuple(reflect(t[_REV8[u]], width) for u in range(256))
+                 for t in msb_tables(poly, width, slices))
+
+
+def _scaled(poly: int, width: int, slices: int) -> Tuple[int, int]:
+    # Un CRC directo de n < 8k bits se calcula igual con G·x^(8k-n):
+    # el registro queda alineado a la izquierda en W = 8k bits.
+    w = max(width, 8 * slices)
+    return poly << (w - width), w
+
+
+def _words(mv: memoryview, size: int, big: bool) -> array:
+    a = array(_WORD_TYPE[size])
+    a.frombytes(mv)
+    if big == (sys.byteorder == "little"):
+        a.byteswap()
+    return a
+
+
+def _run1(reg: int, data, table, width: int) -> int:
+    mask = (1 << width) - 1
+    sh = width - 8
+    if sh == 0:
+        for b in data:
+            reg = table[reg ^ b]
+        return reg
+    for b in data:
+        reg = ((reg << 8) & mask) ^ table[(reg >> sh) ^ b]
+    return reg
+
+
+def _run4(reg: int, words, tables, width: int) -> int:
+    s0, s1, s2, s3 = tables
+    mask = (1 << width) - 1
+    sh = width - 32
+    for w in words:
+        v = (reg >> sh) ^ w
+        reg = (((reg << 32) & mask) ^ s3[v >> 24] ^ s2[(v >> 16) & 255]
+               ^ s1[(v >> 8) & 255] ^ s0[v & 255])
+    return reg
+
+
+def _run8(reg: int, words, tables, width: int) -> int:
+    s0, s1, s2, s3, s4, s5, s6, s7 = tables
+    mask = (1 << width) - 1
+    sh = width - 64
+    for w in words:
+        v = (reg >> sh) ^ w
+        reg = (((reg << 64) & mask) ^ s7[v >> 56] ^ s6[(v >> 48) & 255]
+               ^ s5[(v >> 40) & 255] ^ s4[(v >> 32) & 255] ^ s3[(v >> 24) & 255]
+               ^ s2[(v >> 16) & 255] ^ s1[(v >> 8) & 255] ^ s0[v & 255])
+    return reg
+
+
+def _run1r(reg: int, data, table) -> int:
+    for b in data:
+        reg = (reg >> 8) ^ table[(reg ^ b) & 255]
+    return reg
+
+
+def _run4r(reg: int, words, tables) -> int:
+    r0, r1, r2, r3 = tables
+    for w in words:
+        v = reg ^ w
+        reg = ((v >> 32) ^ r3[v & 255] ^ r2[(v >> 8) & 255]
+               ^ r1[(v >> 16) & 255] ^ r0[(v >> 24) & 255])
+    return reg
+
+
+def _run8r(reg: int, words, tables) -> int:
+    r0, r1, r2, r3, r4, r5, r6, r7 = tables
+    for w in words:
+        v = reg ^ w
+        reg = ((v >> 64) ^ r7[v & 255] ^ r6[(v >> 8) & 255]
+               ^ r5[(v >> 16) & 255] ^ r4[(v >> 24) & 255] ^ r3[(v >> 32) & 255]
+               ^ r2[(v >> 40) & 255] ^ r1[(v >> 48) & 255] ^ r0[(v >> 56) & 255])
+    return reg
+
+
+def pick_slices(nbytes: int, width: int, slices=None) -> int:
+    """
+    slices=None elige: en CPython los registros de hasta 16 bits van más
+    rápido byte a byte (enteros pequeños, una búsqueda por byte); los anchos
+    mayores ganan procesando palabras de 4 bytes.
+    """
+    if slices is None:
+        return 4 if width > 16 and nbytes >= AUTO_SLICE_MIN else 1
+    if slices not in SLICES:
+        raise ValueError(f"slices debe ser uno de {SLICES}")
+    return slices
+
+
+def update_msb(reg: int, data, poly: int, width: int, slices=None) -> int:
+    """
+    Avanza el registro directo (MSB primero) sobre data, que puede ser
+    cualquier objeto con protocolo buffer. slices=None elige automáticamente.
+    """
+    mv = memoryview(data).cast("B")
+    k = pick_slices(len(mv), width, slices)
+    spoly, w = _scaled(poly, width, k)
+    up = w - width
+    reg <<= up
+    nfull = len(mv) - len(mv) % k if k > 1 else 0
+    if nfull:
+        run = _run4 if k == 4 else _run8
+        tables = msb_tables(spoly, w, k)
+        for i in range(0, nfull, WORD_BLOCK):
+            words = _words(mv[i:min(i + WORD_BLOCK, nfull)], k, big=True)
+            reg = run(reg, words, tables, w)
+        mv = mv[nfull:]
+    if len(mv):
+        if k > 1:
+            # cola: seguir byte a byte con el mismo registro escalado
+            spoly, w1 = _scaled(poly, width, 1)
+            reg >>= w - w1
+            w, up = w1, w1 - width
+        reg = _run1(reg, mv, msb_tables(spoly, w, 1)[0], w)
+    return reg >> up
+
+
+def update_lsb(reg: int, data, poly: int, width: int, slices=None) -> int:
+    """
+    Igual que update_msb() pero con entrada reflejada: reg es el registro
+    reflejado (como en CRC-32) y poly el polinomio en su orden normal.
+    """
+    mv = memoryview(data).cast("B")
+    k = pick_slices(len(mv), width, slices)
+    nfull = len(mv) - len(mv) % k if k > 1 else 0
+    if nfull:
+        run = _run4r if k == 4 else _run8r
+        tables = lsb_tables(poly, width, k)
+        for i in range(0, nfull, WORD_BLOCK):
+            words = _words(mv[i:min(i + WORD_BLOCK, nfull)], k, big=False)
+            reg = run(reg, words, tables)
+        mv = mv[nfull:]
+    if len(mv):
+        reg = _run1r(reg, mv, lsb_tables(poly, width, 1)[0])
+    return reg
+
+
+@lru_cache(maxsize=32)
+def _shift_in_table(poly: int, width: int) -> Tuple[int, ...]:
+    # para n < 8 un solo índice (reg, byte) -> reg siguiente: 2^(n+8) entradas
+    t = msb_tables(poly, width, 1)[0]
+    mask = (1 << width) - 1
+    up = 8 - width
+    return tuple(t[(r << up) ^ (b >> width)] ^ (b & mask)
+                 for r in range(1 << width) for b in range(256))
+
+
+def _run_shift_in(reg: int, data, poly: int, width: int) -> int:
+    # paso de byte sin aumentar: reg = (reg·x^8 + b) mod G
+    if width >= 8:
+        table = msb_tables(poly, width, 1)[0]
+        mask = (1 << width) - 1
+        sh = width - 8
+        for b in data:
+            reg = ((reg << 8) & mask) ^ b ^ table[reg >> sh]
+        return reg
+    table = _shift_in_table(poly, width)
+    for b in data:
+        reg = table[(reg << 8) | b]
+    return reg
+
+
+def shift_in_to_direct(reg: int, poly: int, width: int) -> int:
+    """Registro de desplazamiento (sin aumentar) -> registro directo equivalente."""
+    return mulxmod(reg, width, poly, width)
+
+
+def direct_to_shift_in(reg: int, poly: int, width: int) -> int:
+    return divx(reg, width, poly, width)
+
+
+def update_shift_in(reg: int, data, poly: int, width: int, slices=None) -> int:
+    """
+    Semántica LFSR de crc_core: cada bit de dato entra por la derecha del
+    registro y, si salía un 1 por la izquierda, se hace XOR con poly.
+    Equivale a (reg·x^L + M) mod G, es decir, al registro directo por x^-n.
+    Con poly par x no es invertible y se usa la tabla byte a byte propia.
+    """
+    if not poly & 1:
+        return _run_shift_in(reg, memoryview(data).cast("B"), poly, width)
+    d = update_msb(shift_in_to_direct(reg, poly, width), data, poly, width, slices)
+    return direct_to_shift_in(d, poly, width)
@@ -0,0 +1,134 @@
+"""
+Explicaciones del CRC paginadas y fuera del hilo de la GUI.
+
+ExplainWorker genera las páginas en un hilo propio a partir de los
+generadores de crc_core (nada se calcula más allá de la página pedida) y
+guarda los paginadores en una LRU por (datos, polinomio): pedir más páginas
+o volver a mostrar la misma trama no repite el trabajo. La LRU se limita
+por entradas y por bytes (datos de la clave más páginas ya generadas).
+"""
+import queue
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from crc.crc_core import iter_crc_long_division, iter_crc_steps
+from crc.models import ModelSpec
+
+PAGE_STEPS = 32
+PAGE_BYTES = 64 << 10
+SUMMARIZE_AFTER = 512
+CACHE_SIZE = 32
+CACHE_BYTES = 16 << 20
+
+STYLES = {
+    "division": iter_crc_long_division,
+    "lfsr": iter_crc_steps,
+}
+
+Key = Tuple[bytes, ModelSpec]
+
+
+class Pager:
+    """Agrupa los pasos de un generador en páginas de texto, bajo demanda."""
+
+    def __init__(self, steps: Iterator[str], page_steps: int = PAGE_STEPS,
+                 page_bytes: int = PAGE_BYTES):
+        self._steps = steps
+        self.page_steps = page_steps
+        self.page_bytes = page_bytes
+        self.pages: List[str] = []
+        self.nbytes = 0  # caracteres en pages
+        self.done = False
+
+    def page(self, k: int) -> Optional[str]:
+        """Página k (desde 0) o None si la explicación tiene menos páginas."""
+        while len(self.pages) <= k and not self.done:
+            self._next()
+        return self.pages[k] if k < len(self.pages) else None
+
+    def has_more(self, k: int) -> bool:
+        if k + 1 < len(self.pages):
+            return True
+        if self.done:
+            return False
+        return self.page(k + 1) is not None
+
+    def _next(self):
+        out, size = [], 0
+        for s in self._steps:
+            out.append(s)
+            size += len(s) + 1
+            if len(out) >= self.page_steps or size >= self.page_bytes:
+                break
+        else:
+            self.done = True
+        if out:
+            self.pages.append("\n".join(out) + "\n")
+            self.nbytes += len(self.pages[-1])
+
+
+class ExplainWorker:
+    """
+    request(data, poly, page, callback) encola el trabajo y vuelve enseguida;
+    callback(key, page, text, has_more) se llama desde el hilo del worker
+    (la GUI debe pasarlo a su propio hilo, p. ej. con una cola y after()).
+    """
+
+    def __init__(self, style: str = "division", page_steps: int = PAGE_STEPS,
+                 page_bytes: int = PAGE_BYTES, summarize_after: Optional[int] = SUMMARIZE_AFTER,
+                 cache_size: int = CACHE_SIZE, cache_bytes: int = CACHE_BYTES):
+        self.explain = STYLES[style]
+        self.page_steps = page_steps
+        self.page_bytes = page_bytes
+        self.summarize_after = summarize_after
+        self.cache_size = cache_size
+        self.cache_bytes = cache_bytes
+        self._cache: "OrderedDict[Key, Pager]" = OrderedDict()
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, data: bytes, poly_bits: ModelSpec, page: int,
+                callback: Callable[[Key, int, Optional[str], bool], None]):
+        self._jobs.put(((bytes(data), poly_bits), page, callback))
+
+    def pager(self, key: Key) -> Pager:
+        p = self._cache.get(key)
+        if p is not None:
+            self._cache.move_to_end(key)
+            return p
+        p = Pager(self.explain(key[0], key[1], self.summarize_after),
+                  self.page_steps, self.page_bytes)
+        self._cache[key] = p
+        self._trim()
+        return p
+
+    def _trim(self):
+        # la entrada más reciente se queda aunque sola pase de cache_bytes
+        size = sum(len(k[0]) + p.nbytes for k, p in self._cache.items())
+        while len(self._cache) > 1 and (len(self._cache) > self.cache_size
+                                        or size > self.cache_bytes):
+            k, p = self._cache.popitem(last=False)
+            size -= len(k[0]) + p.nbytes
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            key, page, callback = job
+            try:
+                p = self.pager(key)
+                text = p.page(page)
+                more = p.has_more(page)
+                self._trim()  # las páginas nuevas también cuentan
+            except Exception as e:
+                text, more = f"error al explicar: {e}\n", False
+            try:
+                callback(key, page, text, more)
+            except Exception:
+                pass
+
+    def close(self):
+        self._jobs.put(None)
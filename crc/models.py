@@ -0,0 +1,194 @@
+"""
+Modelos CRC parametrizados (width, poly, init, refin, refout, xorout) y un
+catálogo de modelos estándar con sus valores de comprobación sobre "123456789".
+"""
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Dict, List, Optional, Union
+
+from crc.engine import (
+    REV8_TRANS,
+    WORD_BLOCK,
+    check_width,
+    direct_to_shift_in,
+    mulmod,
+    reflect,
+    shift_in_to_direct,
+    update_lsb,
+    update_msb,
+    update_shift_in,
+    xpow,
+)
+
+CHECK_INPUT = b"123456789"
+
+# tamaños de CRC que admite la trama
+CRC_SIZES = (1, 2, 4, 8)
+
+
+@dataclass(frozen=True)
+class CrcModel:
+    """
+    Modelo tipo Rocksoft. augmented=False reproduce el LFSR original de
+    crc_core (el bit de dato entra en el registro, sin añadir n ceros).
+    """
+    name: str
+    width: int
+    poly: int
+    init: int = 0
+    refin: bool = False
+    refout: bool = False
+    xorout: int = 0
+    check: Optional[int] = None
+    augmented: bool = True
+
+    def __post_init__(self):
+        check_width(self.width)
+        mask = (1 << self.width) - 1
+        for f in ("poly", "init", "xorout"):
+            if getattr(self, f) & ~mask:
+                raise ValueError(f"{f} no cabe en {self.width} bits")
+
+    @property
+    def mask(self) -> int:
+        return (1 << self.width) - 1
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes que ocupa el CRC en la trama (1, 2, 4 u 8)."""
+        need = (self.width + 7) // 8
+        return next(s for s in CRC_SIZES if s >= need)
+
+    @property
+    def poly_bits(self) -> str:
+        return format(self.poly, f"0{self.width}b")
+
+    @property
+    def _via_direct(self) -> bool:
+        # sin aumentar y poly par: x no es invertible, se usa el LFSR propio
+        return self.augmented or bool(self.poly & 1)
+
+    # --- registro interno: directo, o reflejado si refin ---
+    def start(self) -> int:
+        reg = self.init
+        if not self.augmented and self._via_direct:
+            reg = shift_in_to_direct(reg, self.poly, self.width)
+        if self.refin and self._via_direct:
+            reg = reflect(reg, self.width)
+        return reg
+
+    def feed(self, reg: int, data, slices=None) -> int:
+        if not self._via_direct:
+            if self.refin:
+                mv = memoryview(data).cast("B")
+                for i in range(0, len(mv), WORD_BLOCK):
+                    chunk = bytes(mv[i:i + WORD_BLOCK]).translate(REV8_TRANS)
+                    reg = update_shift_in(reg, chunk, self.poly, self.width, slices)
+                return reg
+            return update_shift_in(reg, data, self.poly, self.width, slices)
+        if self.refin:
+            return update_lsb(reg, data, self.poly, self.width, slices)
+        return update_msb(reg, data, self.poly, self.width, slices)
+
+    def final(self, reg: int) -> int:
+        if self._via_direct:
+            if self.refin:
+                reg = reflect(reg, self.width)
+            if not self.augmented:
+                reg = direct_to_shift_in(reg, self.poly, self.width)
+        if self.refout:
+            reg = reflect(reg, self.width)
+        return reg ^ self.xorout
+
+    def calc(self, data, slices=None) -> int:
+        return self.final(self.feed(self.start(), data, slices))
+
+    def combine(self, crc_a: int, crc_b: int, len_b: int) -> int:
+        """
+        CRC de A+B a partir de crc(A), crc(B) y len(B) en bytes.
+        Antes de refout/xorout el registro cumple
+        r(A+B) = (r(A) ^ init)·x^(8·len_b) ^ r(B)  (mod G).
+        """
+        ra = self._unfinal(crc_a)
+        rb = self._unfinal(crc_b)
+        shift = xpow(8 * len_b, self.poly, self.width)
+        r = mulmod(ra ^ self.init, shift, self.poly, self.width) ^ rb
+        if self.refout:
+            r = reflect(r, self.width)
+        return r ^ self.xorout
+
+    def _unfinal(self, crc: int) -> int:
+        r = (crc ^ self.xorout) & self.mask
+        return reflect(r, self.width) if self.refout else r
+
+    def to_bytes(self, crc: int) -> bytes:
+        return crc.to_bytes(self.nbytes, "big")
+
+    def verify(self) -> bool:
+        """Compara calc(b"123456789") con el valor check del modelo."""
+        return self.check is None or self.calc(CHECK_INPUT) == self.check
+
+
+CATALOG: Dict[str, CrcModel] = {}
+_ALIASES: Dict[str, str] = {}
+
+
+def register(model: CrcModel, *aliases: str) -> CrcModel:
+    CATALOG[model.name] = model
+    for a in (model.name,) + aliases:
+        _ALIASES[a.upper()] = model.name
+    return model
+
+
+register(CrcModel("CRC-8/SMBUS", 8, 0x07, check=0xF4), "CRC-8")
+register(CrcModel("CRC-16/CCITT-FALSE", 16, 0x1021, init=0xFFFF, check=0x29B1),
+         "CRC-16/IBM-3740", "CRC-16/AUTOSAR")
+register(CrcModel("CRC-16/KERMIT", 16, 0x1021, refin=True, refout=True, check=0x2189),
+         "CRC-16/CCITT", "CRC-CCITT")
+register(CrcModel("CRC-16/XMODEM", 16, 0x1021, check=0x31C3))
+register(CrcModel("CRC-32", 32, 0x04C11DB7, init=0xFFFFFFFF, refin=True, refout=True,
+                  xorout=0xFFFFFFFF, check=0xCBF43926), "CRC-32/ISO-HDLC")
+register(CrcModel("CRC-32C", 32, 0x1EDC6F41, init=0xFFFFFFFF, refin=True, refout=True,
+                  xorout=0xFFFFFFFF, check=0xE3069283), "CRC-32/ISCSI")
+register(CrcModel("CRC-64/XZ", 64, 0x42F0E1EBA9EA3693, init=(1 << 64) - 1,
+                  refin=True, refout=True, xorout=(1 << 64) - 1,
+                  check=0x995DC9BBDF1939FA), "CRC-64/GO-ECMA")
+register(CrcModel("CRC-64/ECMA-182", 64, 0x42F0E1EBA9EA3693, check=0x6C40DF5F0B497347),
+         "CRC-64")
+
+
+def model_from_poly_bits(poly_bits: str, init: int = 0) -> CrcModel:
+    """Modelo del LFSR original: el ancho n es la longitud de la cadena."""
+    n = len(poly_bits)
+    check_width(n)
+    mask = (1 << n) - 1
+    return CrcModel(poly_bits, n, int(poly_bits, 2) & mask, init=init & mask, augmented=False)
+
+
+ModelSpec = Union[str, CrcModel]
+
+
+@lru_cache(maxsize=64)
+def resolve_model(spec: ModelSpec) -> CrcModel:
+    """
+    Acepta un CrcModel, una cadena de bits (POLY_BITS clásico) o el nombre
+    de un modelo del catálogo (sin distinguir mayúsculas).
+    """
+    if isinstance(spec, CrcModel):
+        return spec
+    s = spec.strip()
+    if s and set(s) <= {"0", "1"}:
+        return model_from_poly_bits(s)
+    try:
+        return CATALOG[_ALIASES[s.upper()]]
+    except KeyError:
+        raise ValueError(f"modelo CRC desconocido: {spec!r}") from None
+
+
+def with_init(model: CrcModel, init: int) -> CrcModel:
+    return replace(model, init=init & model.mask)
+
+
+def verify_catalog() -> List[str]:
+    """Nombres de los modelos del catálogo que no dan su valor check."""
+    return [name for name, m in CATALOG.items() if not m.verify()]
@@ -0,0 +1,67 @@
+"""
+CRC incremental al estilo hashlib: update() acepta cualquier objeto con
+protocolo buffer (bytes, bytearray, memoryview, mmap) sin concatenar.
+"""
+from typing import BinaryIO
+
+from crc.models import ModelSpec, resolve_model
+
+FILE_BUFSIZE = 1 << 20
+
+
+class Crc:
+    __slots__ = ("model", "_reg")
+
+    def __init__(self, model: ModelSpec, data=None):
+        self.model = resolve_model(model)
+        self._reg = self.model.start()
+        if data is not None:
+            self.update(data)
+
+    @property
+    def name(self) -> str:
+        return self.model.name
+
+    @property
+    def digest_size(self) -> int:
+        return self.model.nbytes
+
+    @property
+    def crc(self) -> int:
+        """Valor final del CRC (con refout y xorout aplicados)."""
+        return self.model.final(self._reg)
+
+    def update(self, data) -> None:
+        self._reg = self.model.feed(self._reg, data)
+
+    def copy(self) -> "Crc":
+        c = Crc.__new__(Crc)
+        c.model = self.model
+        c._reg = self._reg
+        return c
+
+    def digest(self) -> bytes:
+        return self.model.to_bytes(self.crc)
+
+    def hexdigest(self) -> str:
+        return self.digest().hex()
+
+    def __repr__(self):
+        return f"<Crc {self.name} {self.hexdigest()}>"
+
+
+def new(model: ModelSpec, data=None) -> Crc:
+    return Crc(model, data)
+
+
+def file_crc(f: BinaryIO, model: ModelSpec, bufsize: int = FILE_BUFSIZE) -> Crc:
+    """Lee f con readinto() sobre un único buffer: memoria constante."""
+    c = Crc(model)
+    buf = bytearray(bufsize)
+    view = memoryview(buf)
+    while True:
+        n = f.readinto(buf)
+        if not n:
+            break
+        c.update(view[:n])
+    return c
@@ -0,0 +1,409 @@
+"""
+ARQ de ventana deslizante (Go-Back-N o Selective Repeat) sobre las tramas
+TYPE_DATA/TYPE_ACK/TYPE_NACK/TYPE_SKIP de link.proto, sin dependencias de Tk.
+
+- ArqSender: hasta `window` tramas en vuelo, temporizador por trama, ACK
+  selectivo y acumulado, retransmisión inmediata con NACK y RTO adaptativo.
+- ArqReceiver: entrega en orden, descarta duplicados y responde ACK/NACK.
+  Lo recibido fuera de orden ocupa un anillo fijo de `window` huecos con un
+  mapa de bits: la memoria no crece con el tráfico ni con el espacio de SEQ.
+
+ver=2 usa tramas link.proto v2 y SEQ de 32 bits (sin vueltas del SEQ en
+sesiones largas ni límite de 128 tramas en vuelo con SR).
+
+El transporte se inyecta con send_frame(bytes); las tramas recibidas se
+pasan con ArqSender.on_ack() y ArqReceiver.on_data()/on_skip().
+
+Cuando una trama agota max_tries, el emisor avisa con on_failed y en su
+hueco manda una trama SKIP (con sus propios reintentos). El receptor la
+trata como una DATA sin mensajes: avanza expected y entrega lo que tenía
+guardado detrás. Un SKIP muy lejos de la ventana (el otro extremo se
+reinició) resincroniza expected.
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from crc.models import ModelSpec
+from link import metrics
+from link.proto import (SEQ_BITS_BY_VER, VER, build_ack_frame, build_data_frame, build_skip_frame,
+                        unpack_payload)
+
+GO_BACK_N = "gbn"
+SELECTIVE_REPEAT = "sr"
+MODES = (SELECTIVE_REPEAT, GO_BACK_N)
+SEQ_BITS = 8
+
+
+def check_window(window: int, mode: str, seq_bits: int = SEQ_BITS):
+    if mode not in MODES:
+        raise ValueError(f"modo ARQ desconocido: {mode!r}")
+    # SR necesita ventana <= mitad del espacio de SEQ; GBN, menor que el espacio
+    limit = 1 << (seq_bits - 1) if mode == SELECTIVE_REPEAT else (1 << seq_bits) - 1
+    if not 1 <= window <= limit:
+        raise ValueError(f"ventana {window} fuera de rango para {mode} (1..{limit})")
+
+
+class RtoEstimator:
+    """RTO adaptativo según RFC 6298: SRTT/RTTVAR, Karn y backoff exponencial."""
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+
+    def __init__(self, initial=1.0, min_rto=0.2, max_rto=60.0, granularity=0.001):
+        self.srtt = None
+        self.rttvar = None
+        self.rto = initial
+        self._rto = initial  # RTO sin backoff
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.granularity = granularity
+
+    def sample(self, rtt: float):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        rto = self.srtt + max(self.granularity, self.K * self.rttvar)
+        self.rto = self._rto = min(self.max_rto, max(self.min_rto, rto))
+
+    def backoff(self):
+        self.rto = min(self.max_rto, self.rto * 2)
+
+    def reset_backoff(self):
+        # un ACK que avanza la ventana prueba que el camino vuelve a funcionar
+        self.rto = self._rto
+
+
+class _Slot:
+    __slots__ = ("seq", "payload", "frame", "sent_at", "deadline", "tries", "done", "skip")
+
+    def __init__(self, seq, payload, frame):
+        self.seq = seq
+        self.payload = payload
+        self.frame = frame
+        self.sent_at = 0.0
+        self.deadline = 0.0
+        self.tries = 0
+        self.done = False
+        self.skip = False  # frame es ya el SKIP de seq
+
+
+class ArqSender:
+    def __init__(self, send_frame: Callable[[bytes], None], poly_bits: ModelSpec,
+                 window: int = 8, mode: str = SELECTIVE_REPEAT, max_tries: int = 8,
+                 rto: Optional[RtoEstimator] = None,
+                 on_acked: Optional[Callable[[int, bytes], None]] = None,
+                 on_failed: Optional[Callable[[int, bytes], None]] = None,
+                 seq_bits: Optional[int] = None, clock=time.monotonic, ver: int = VER):
+        seq_bits = seq_bits or SEQ_BITS_BY_VER[ver]
+        check_window(window, mode, seq_bits)
+        self.send_frame = send_frame
+        self.poly_bits = poly_bits
+        self.ver = ver
+        self.window = window
+        self.mode = mode
+        self.max_tries = max_tries
+        self.rto = rto or RtoEstimator()
+        self.on_acked = on_acked
+        self.on_failed = on_failed
+        self.clock = clock
+        self._mask = (1 << seq_bits) - 1
+        self._cv = threading.Condition()
+        self._slots: Dict[int, _Slot] = {}
+        self.base = 0       # SEQ más antiguo sin confirmar
+        self.next_seq = 0   # próximo SEQ a usar
+        self._closed = False
+        self.stats = {"sent": 0, "retransmits": 0, "timeouts": 0, "nacks": 0,
+                      "acked": 0, "failed": 0, "skips": 0}
+        self._timer = threading.Thread(target=self._run_timer, daemon=True)
+        self._timer.start()
+
+    def _dist(self, a: int, b: int) -> int:
+        return (b - a) & self._mask
+
+    @property
+    def in_flight(self) -> int:
+        return self._dist(self.base, self.next_seq)
+
+    def _outstanding(self, seq: int) -> bool:
+        return self._dist(self.base, seq) < self.in_flight
+
+    # --- envío ---
+    def send(self, payload: bytes, transform: Optional[Callable[[bytes], bytes]] = None,
+             timeout: Optional[float] = None, flags: int = 0) -> int:
+        """
+        Encola payload y lo transmite en cuanto hay hueco en la ventana.
+        transform(trama) -> trama se aplica solo a la primera transmisión
+        (p. ej. para simular un error que el ARQ recupera). flags (v2) marca
+        el payload como comprimido o agrupado (link.proto.pack_payload).
+        Devuelve el SEQ asignado;
+        TimeoutError si la ventana sigue llena tras timeout segundos.
+        """
+        with self._cv:
+            if not self._cv.wait_for(lambda: self._closed or self.in_flight < self.window, timeout):
+                raise TimeoutError("ventana ARQ llena")
+            if self._closed:
+                raise RuntimeError("ArqSender cerrado")
+            seq = self.next_seq
+            self.next_seq = (seq + 1) & self._mask
+            frame = build_data_frame(payload, self.poly_bits, seq, self.ver, flags)
+            # los reintentos salen de la ranura, sin transform
+            slot = _Slot(seq, payload, frame)
+            if transform:
+                frame = transform(frame)
+            self._slots[seq] = slot
+            self._arm(slot, self.clock())
+            self._cv.notify_all()
+        self._transmit([frame])
+        return seq
+
+    def _arm(self, slot: _Slot, now: float):
+        slot.tries += 1
+        slot.sent_at = now
+        slot.deadline = now + self.rto.rto
+
+    def _transmit(self, frames: List[bytes]):
+        for f in frames:
+            self.stats["sent"] += 1
+            try:
+                self.send_frame(f)
+            except Exception:
+                pass  # lo recupera el temporizador
+
+    def _resend(self, slots, now, failed) -> List[bytes]:
+        frames = []
+        skipped = False
+        for slot in slots:
+            if slot.done:
+                continue
+            if skipped:
+                # GBN: las de detrás se reenviaban por la perdida, no por ellas
+                slot.tries = 1
+            if slot.tries >= self.max_tries:
+                if slot.skip:
+                    # ni el SKIP llega: el otro extremo no responde
+                    slot.done = True
+                    continue
+                # sin esto el receptor se queda esperando seq para siempre
+                self.stats["failed"] += 1
+                failed.append((slot.seq, slot.payload))
+                slot.skip = True
+                slot.tries = 0
+                slot.frame = build_skip_frame(slot.seq, self.poly_bits, self.ver)
+                self.stats["skips"] += 1
+                skipped = self.mode == GO_BACK_N
+                self._arm(slot, now)
+                frames.append(slot.frame)
+                continue
+            self._arm(slot, now)
+            self.stats["retransmits"] += 1
+            metrics.RETRANSMITS.inc()
+            frames.append(slot.frame)
+        return frames
+
+    def _from(self, seq: int) -> List[_Slot]:
+        # ranuras desde seq hasta next_seq, en orden de SEQ
+        return [self._slots[(seq + i) & self._mask]
+                for i in range(self._dist(seq, self.next_seq))
+                if (seq + i) & self._mask in self._slots]
+
+    def _advance(self):
+        while self.base != self.next_seq:
+            slot = self._slots.get(self.base)
+            if slot is not None and not slot.done:
+                break
+            self._slots.pop(self.base, None)
+            self.base = (self.base + 1) & self._mask
+
+    # --- ACK/NACK ---
+    def on_ack(self, seq: int, ok: bool, cum: Optional[int] = None):
+        """ACK/NACK recibido. cum: ACK acumulado (todo hasta cum inclusive)."""
+        acked: List[Tuple[int, bytes]] = []
+        failed: List[Tuple[int, bytes]] = []
+        frames: List[bytes] = []
+        with self._cv:
+            now = self.clock()
+            seq &= self._mask
+            if self.mode == GO_BACK_N and ok and cum is None:
+                cum = seq  # en GBN todo ACK es acumulado
+            if cum is not None and self._outstanding(cum & self._mask):
+                for s in self._from(self.base)[:self._dist(self.base, cum & self._mask) + 1]:
+                    self._ack_slot(s, now, acked)
+            if self._outstanding(seq) and seq in self._slots:
+                if ok:
+                    self._ack_slot(self._slots[seq], now, acked)
+                else:
+                    self.stats["nacks"] += 1
+                    metrics.NACKS_RECEIVED.inc()
+                    todo = self._from(seq) if self.mode == GO_BACK_N else [self._slots[seq]]
+                    frames = self._resend(todo, now, failed)
+            base = self.base
+            self._advance()
+            if self.base != base:
+                self.rto.reset_backoff()
+            self._cv.notify_all()
+        self._transmit(frames)
+        self._notify(acked, failed)
+
+    def _ack_slot(self, slot: _Slot, now: float, acked):
+        if slot.done:
+            return
+        slot.done = True
+        if slot.skip:
+            return  # ya se notificó con on_failed
+        if slot.tries == 1:  # Karn: sin muestras de tramas retransmitidas
+            self.rto.sample(now - slot.sent_at)
+            metrics.ACK_RTT.observe(now - slot.sent_at)
+        self.stats["acked"] += 1
+        acked.append((slot.seq, slot.payload))
+
+    def _notify(self, acked, failed):
+        for seq, payload in acked:
+            if self.on_acked:
+                self.on_acked(seq, payload)
+        for seq, payload in failed:
+            if self.on_failed:
+                self.on_failed(seq, payload)
+
+    # --- temporizadores ---
+    def _run_timer(self):
+        while True:
+            failed: List[Tuple[int, bytes]] = []
+            with self._cv:
+                if self._closed:
+                    return
+                now = self.clock()
+                live = [s for s in self._slots.values() if not s.done]
+                due = [s for s in live if s.deadline <= now]
+                if not due:
+                    nxt = min((s.deadline for s in live), default=None)
+                    self._cv.wait(None if nxt is None else nxt - now)
+                    continue
+                self.stats["timeouts"] += len(due)
+                metrics.TIMEOUTS.inc(len(due))
+                self.rto.backoff()
+                if self.mode == GO_BACK_N:
+                    due = self._from(self.base)
+                frames = self._resend(due, now, failed)
+                self._advance()
+                self._cv.notify_all()
+            self._transmit(frames)
+            self._notify([], failed)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que no quede nada en vuelo (confirmado o fallido)."""
+        with self._cv:
+            return self._cv.wait_for(lambda: self.in_flight == 0, timeout)
+
+    def close(self):
+        with self._cv:
+            self._closed = True
+            self._cv.notify_all()
+
+
+class ArqReceiver:
+    """
+    Lado receptor. deliver(seq, payload) se llama en orden y bajo el lock
+    del receptor, así que debe ser rápido. Las tramas comprimidas o con
+    varios mensajes (FLAGS de v2) se desempaquetan: deliver se llama una vez
+    por mensaje, todas con el mismo seq.
+    """
+
+    def __init__(self, send_frame: Callable[[bytes], None], poly_bits: ModelSpec,
+                 deliver: Optional[Callable[[int, bytes], None]] = None,
+                 window: int = 8, mode: str = SELECTIVE_REPEAT, seq_bits: Optional[int] = None,
+                 ver: int = VER):
+        seq_bits = seq_bits or SEQ_BITS_BY_VER[ver]
+        check_window(window, mode, seq_bits)
+        self.send_frame = send_frame
+        self.poly_bits = poly_bits
+        self.deliver = deliver
+        self.window = window
+        self.mode = mode
+        self.ver = ver
+        self._mask = (1 << seq_bits) - 1
+        self.expected = 0
+        # anillo de recepción: el hueco (_head + d) % rwin guarda expected + d y
+        # el bit d de _have indica si ya llegó
+        self._rwin = window if mode == SELECTIVE_REPEAT else 1
+        self._ring: List[Optional[List[bytes]]] = [None] * self._rwin
+        self._head = 0
+        self._have = 0
+        self._lock = threading.Lock()
+        self.stats = {"received": 0, "delivered": 0, "duplicates": 0,
+                      "out_of_order": 0, "crc_fail": 0, "unpack_fail": 0,
+                      "skipped": 0, "resyncs": 0}
+
+    def on_data(self, seq: int, payload, crc_ok: bool, flags: int = 0) -> List[Tuple[int, bytes]]:
+        """Procesa una trama DATA parseada; devuelve lo entregado en orden."""
+        return self._receive(seq, payload, crc_ok, flags, False)
+
+    def on_skip(self, seq: int, crc_ok: bool) -> List[Tuple[int, bytes]]:
+        """Procesa una trama SKIP: seq no llegará, se sigue con lo de detrás."""
+        return self._receive(seq, b"", crc_ok, 0, True)
+
+    def _receive(self, seq, payload, crc_ok, flags, skip) -> List[Tuple[int, bytes]]:
+        out: List[Tuple[int, bytes]] = []
+        with self._lock:
+            self.stats["received"] += 1
+            seq &= self._mask
+            if not crc_ok:
+                self.stats["crc_fail"] += 1
+                metrics.NACKS_SENT.inc()
+                ack = build_ack_frame(seq, False, self.poly_bits, ver=self.ver)
+            else:
+                d = (seq - self.expected) & self._mask
+                rwin = self._rwin
+                ack_seq = seq
+                if d < rwin:
+                    if d:
+                        self.stats["out_of_order"] += 1
+                    if not self._have >> d & 1:
+                        if skip:
+                            self.stats["skipped"] += 1
+                            msgs = []
+                        else:
+                            try:
+                                msgs = unpack_payload(payload, flags)
+                            except ValueError:
+                                # CRC bien pero no se puede desempaquetar: reenviarla no
+                                # cambiaría nada, se confirma y se descarta
+                                self.stats["unpack_fail"] += 1
+                                msgs = []
+                        self._ring[(self._head + d) % rwin] = msgs
+                        self._have |= 1 << d
+                    while self._have & 1:
+                        msgs = self._ring[self._head]
+                        self._ring[self._head] = None
+                        self._head = (self._head + 1) % rwin
+                        self._have >>= 1
+                        for p in msgs:
+                            out.append((self.expected, p))
+                            if self.deliver:
+                                self.deliver(self.expected, p)
+                        self.expected = (self.expected + 1) & self._mask
+                elif (self.expected - seq) & self._mask <= self.window:
+                    self.stats["duplicates"] += 1
+                    metrics.DUPLICATES.inc()
+                elif skip:
+                    # lejos de la ventana: el emisor se reinició, se empieza tras seq
+                    self.stats["resyncs"] += 1
+                    self._ring = [None] * rwin
+                    self._head = 0
+                    self._have = 0
+                    self.expected = (seq + 1) & self._mask
+                else:
+                    ack_seq = (self.expected - 1) & self._mask
+                cum = (self.expected - 1) & self._mask
+                if self.mode == GO_BACK_N:
+                    ack_seq = cum
+                self.stats["delivered"] += len(out)
+                ack = build_ack_frame(ack_seq, True, self.poly_bits, cum=cum, ver=self.ver)
+        try:
+            self.send_frame(ack)
+        except Exception:
+            pass
+        return out
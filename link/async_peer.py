@@ -0,0 +1,260 @@
+"""
+Peer TCP sobre asyncio: un solo bucle de eventos atiende todas las
+conexiones (sin un hilo por conexión) usando FrameDecoder como buffer de
+BufferedProtocol.
+
+- on_data(data, addr): mismo contrato que TcpPeer; se llama en el bucle
+  con un memoryview válido solo durante la llamada.
+- on_data_async(data, addr): corrutina; recibe bytes. Cada conexión tiene
+  su cola y deja de leer del socket mientras tiene QUEUE_FRAMES pendientes.
+
+capture= guarda las tramas recibidas como en TcpPeer (link.capture) y
+on_send_error(host, port, error) avisa de los envíos fallidos.
+
+send_async() reutiliza una conexión por (host, puerto), como link.pool en
+TcpPeer: si la escritura falla reconecta y reintenta una vez. raw=True
+conserva una conexión por trama (el receptor raw lee hasta el cierre).
+
+start()/send()/stop() son la fachada síncrona (un hilo para el bucle) que
+usan app.main y app.gui; serve()/send_async()/aclose() son la API asyncio.
+"""
+import asyncio
+import threading
+
+from link.capture import open_capture
+from link.metrics import (BYTES_RECEIVED, BYTES_SENT, FRAMES_RECEIVED, FRAMES_SENT, RECONNECTS,
+                          SEND_DROPPED)
+from link.stream import FrameDecoder, FrameError
+
+# tramas pendientes por conexión antes de pausar la lectura (on_data_async)
+QUEUE_FRAMES = 64
+MAX_CONNECTIONS = 10000
+
+
+class _PeerProtocol(asyncio.BufferedProtocol):
+    def __init__(self, peer: "AsyncTcpPeer"):
+        self.peer = peer
+        self.transport = None
+        self.addr = None
+        self.dec = None if peer.raw else FrameDecoder(peer.crc_bytes)
+        self.chunks = []
+        self.queue = None
+        self.task = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.addr = transport.get_extra_info("peername")
+        if len(self.peer._conns) >= self.peer.max_connections:
+            transport.abort()
+            return
+        self.peer._conns.add(self)
+        if self.peer.on_data_async is not None:
+            self.queue = asyncio.Queue()
+            self.task = asyncio.ensure_future(self._consume())
+
+    def connection_lost(self, exc):
+        self.peer._conns.discard(self)
+        if self.chunks:
+            self._deliver(b"".join(self.chunks))
+            self.chunks = []
+        if self.queue is not None:
+            self.queue.put_nowait(None)
+
+    # --- BufferedProtocol ---
+    def get_buffer(self, sizehint):
+        return self.dec.get_buffer()
+
+    def buffer_updated(self, nbytes):
+        self.dec.commit(nbytes)
+        try:
+            for frame in self.dec.frames():
+                self._deliver(frame)
+        except FrameError:
+            self.transport.abort()
+
+    def eof_received(self):
+        return False
+
+    def _deliver(self, frame):
+        FRAMES_RECEIVED.inc()
+        BYTES_RECEIVED.inc(len(frame))
+        if self.peer.capture is not None:
+            self.peer.capture.write(frame, self.addr)
+        if self.queue is not None:
+            self.queue.put_nowait(bytes(frame))
+            if self.queue.qsize() >= QUEUE_FRAMES and not self.transport.is_closing():
+                self.transport.pause_reading()
+        elif self.peer.on_data:
+            try:
+                self.peer.on_data(frame, self.addr)
+            except Exception:
+                pass
+
+    async def _consume(self):
+        while True:
+            data = await self.queue.get()
+            if data is None:
+                return
+            if self.queue.qsize() < QUEUE_FRAMES // 2 and not self.transport.is_closing():
+                self.transport.resume_reading()
+            try:
+                await self.peer.on_data_async(data, self.addr)
+            except Exception:
+                pass
+
+
+class _RawProtocol(_PeerProtocol):
+    """Modo raw: un bloque por conexión, entregado al cerrarse."""
+    _buf = None
+
+    def get_buffer(self, sizehint):
+        if self._buf is None:
+            self._buf = bytearray(1 << 16)
+        return self._buf
+
+    def buffer_updated(self, nbytes):
+        self.chunks.append(bytes(self._buf[:nbytes]))
+
+
+class AsyncTcpPeer:
+    def __init__(self, host="0.0.0.0", port=5000, on_data=None, on_data_async=None,
+                 crc_bytes=1, raw=False, max_connections=MAX_CONNECTIONS, capture=None,
+                 on_send_error=None):
+        self.host = host
+        self.port = int(port)
+        self.on_data = on_data
+        self.on_data_async = on_data_async
+        self.crc_bytes = crc_bytes
+        self.raw = raw
+        self.max_connections = max_connections
+        self.on_send_error = on_send_error
+        self.last_error = None
+        self.capture = open_capture(capture)
+        self._own_capture = self.capture is not capture
+        self.loop = None
+        self._server = None
+        self._conns = set()
+        # conexiones salientes por (host, puerto) y su lock (una escritura a la vez)
+        self._writers = {}
+        self._wlocks = {}
+        # envíos lanzados desde el bucle: referencia hasta que terminan
+        self._tasks = set()
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def connections(self) -> int:
+        return len(self._conns)
+
+    # --- API asyncio ---
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        proto = _RawProtocol if self.raw else _PeerProtocol
+        self._server = await self.loop.create_server(
+            lambda: proto(self), self.host, self.port, reuse_address=True, backlog=1024)
+        return self._server
+
+    async def send_async(self, host, port, data: bytes, timeout=2.0):
+        """data es una trama o una lista de buffers que forman una trama."""
+        bufs = [data] if isinstance(data, (bytes, bytearray, memoryview)) else list(data)
+        try:
+            if self.raw:
+                await self._send_raw(host, port, bufs, timeout)
+            else:
+                await self._send_pooled(host, int(port), bufs, timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            self.last_error = e
+            if self.on_send_error:
+                self.on_send_error(host, int(port), e)
+            raise
+        FRAMES_SENT.inc()
+        BYTES_SENT.inc(sum(memoryview(b).nbytes for b in bufs))
+
+    async def _send_pooled(self, host, port, bufs, timeout):
+        key = (host, port)
+        lock = self._wlocks.get(key)
+        if lock is None:
+            lock = self._wlocks[key] = asyncio.Lock()
+        async with lock:
+            for attempt in range(2):
+                w = self._writers.get(key)
+                try:
+                    if w is None or w.is_closing():
+                        if attempt or w is not None:
+                            RECONNECTS.inc()
+                        _, w = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+                        self._writers[key] = w
+                    w.writelines(bufs)
+                    await asyncio.wait_for(w.drain(), timeout)
+                    return
+                except (OSError, asyncio.TimeoutError):
+                    self._writers.pop(key, None)
+                    if w is not None:
+                        w.close()
+                    if attempt:
+                        raise
+
+    async def _send_raw(self, host, port, bufs, timeout):
+        _, w = await asyncio.wait_for(asyncio.open_connection(host, int(port)), timeout)
+        try:
+            w.writelines(bufs)
+            await asyncio.wait_for(w.drain(), timeout)
+        finally:
+            w.close()
+            try:
+                await w.wait_closed()
+            except OSError:
+                pass
+
+    async def aclose(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for c in list(self._conns):
+            c.transport.abort()
+        for w in self._writers.values():
+            w.close()
+        self._writers.clear()
+
+    # --- fachada síncrona ---
+    def start(self):
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self.serve())
+            finally:
+                self._ready.set()
+            loop.run_forever()
+            loop.run_until_complete(self.aclose())
+            loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self._thread
+
+    def send(self, host, port, data: bytes, timeout=2.0):
+        coro = self.send_async(host, port, data, timeout)
+        if threading.current_thread() is self._thread:
+            # llamado desde on_data (dentro del bucle): no se puede esperar aquí
+            task = self.loop.create_task(coro)
+            self._tasks.add(task)
+            task.add_done_callback(self._task_done)
+            return None
+        fut = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return fut.result(timeout + 1.0)
+
+    def _task_done(self, task):
+        self._tasks.discard(task)
+        # send_async ya guardó el error y avisó con on_send_error; aquí solo
+        # se recoge para que asyncio no lo dé por no atendido
+        if not task.cancelled() and task.exception() is not None:
+            SEND_DROPPED.inc()
+
+    def stop(self):
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._own_capture:
+            self.capture.close()
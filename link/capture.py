@@ -0,0 +1,398 @@
+"""
+Captura de tramas recibidas en un log binario de solo-añadir, con un índice
+aparte para ir a la trama N en O(1).
+
+captura.cap: MAGIC y luego, por trama, REC (hora, longitud, IP, puerto)
+seguido de la trama tal cual llegó.
+captura.cap.idx: una entrada IDX (offset del registro, longitud) por trama.
+
+TcpPeer(capture="captura.cap") guarda todo lo que recibe. Para revisarlo:
+
+python -m link.capture verificar captura.cap --poly CRC-16/XMODEM --crc falla --listar
+python -m link.capture reenviar captura.cap 127.0.0.1 5000 --velocidad 10
+
+Con NumPy la verificación va por crc.batch.verify_regions sobre el mmap del
+log (sin copias ni un objeto por trama); sin NumPy, trama a trama con
+link.proto.parse_frame.
+"""
+import argparse
+import atexit
+import ipaddress
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from link.proto import TYPE_ACK, TYPE_DATA, TYPE_NACK, TYPE_SKIP, VER2, parse_frame
+
+MAGIC = b"CRCCAP1\n"
+REC = struct.Struct("<dI16sH")  # hora (epoch), longitud, IPv6 (IPv4 mapeada), puerto
+IDX = struct.Struct("<QI")      # offset del registro, longitud de la trama
+FLUSH_EVERY = 256
+
+TYPE_NAMES = {TYPE_DATA: "DATA", TYPE_ACK: "ACK", TYPE_NACK: "NACK", TYPE_SKIP: "SKIP"}
+
+
+def index_path(path: str) -> str:
+    return path + ".idx"
+
+
+def _pack_addr(addr) -> Tuple[bytes, int]:
+    try:
+        host, port = addr[0], int(addr[1])
+        ip = ipaddress.ip_address(host)
+    except (TypeError, ValueError, IndexError):
+        return bytes(16), 0
+    if ip.version == 4:
+        ip = ipaddress.IPv6Address(b"\0" * 10 + b"\xff\xff" + ip.packed)
+    return ip.packed, port
+
+
+def _unpack_addr(raw: bytes, port: int) -> Tuple[str, int]:
+    ip = ipaddress.IPv6Address(raw)
+    return str(ip.ipv4_mapped or ip), port
+
+
+class CaptureWriter:
+    """
+    Añade tramas al log y su entrada al índice; seguro entre hilos. Las
+    escrituras van con buffer y se vuelcan cada FLUSH_EVERY tramas y al
+    cerrar (también al salir del intérprete): si el proceso muere, el lector
+    ignora entradas del índice que apunten más allá del final del log.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._log = open(path, "ab")
+        self._idx = open(index_path(path), "ab")
+        if self._log.tell() == 0:
+            self._log.write(MAGIC)
+        self._offset = self._log.tell()
+        self._pending = 0
+        self.count = 0
+        atexit.register(self.close)
+
+    def write(self, frame, addr=None, ts: Optional[float] = None):
+        n = memoryview(frame).nbytes
+        ip, port = _pack_addr(addr)
+        rec = REC.pack(time.time() if ts is None else ts, n, ip, port)
+        with self._lock:
+            if self._log.closed:
+                return
+            self._log.write(rec)
+            self._log.write(frame)
+            self._idx.write(IDX.pack(self._offset, n))
+            self._offset += REC.size + n
+            self.count += 1
+            self._pending += 1
+            if self._pending >= FLUSH_EVERY:
+                self._flush()
+
+    def _flush(self):
+        # primero el log: una entrada del índice nunca apunta a datos sin escribir
+        self._log.flush()
+        self._idx.flush()
+        self._pending = 0
+
+    def flush(self):
+        with self._lock:
+            if not self._log.closed:
+                self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._log.closed:
+                return
+            self._flush()
+            self._log.close()
+            self._idx.close()
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_capture(capture) -> Optional[CaptureWriter]:
+    """Acepta None, una ruta o un CaptureWriter ya abierto (parámetro capture= de los peers)."""
+    if capture is None or isinstance(capture, CaptureWriter):
+        return capture
+    return CaptureWriter(capture)
+
+
+@dataclass(frozen=True)
+class Record:
+    index: int
+    ts: float
+    host: str
+    port: int
+    frame: memoryview  # vista sobre el mmap: válida mientras el lector siga abierto
+
+
+def scan_index(log) -> bytearray:
+    """Reconstruye el índice recorriendo el log (si falta o está dañado)."""
+    out = bytearray()
+    off = len(MAGIC)
+    size = len(log)
+    while off + REC.size <= size:
+        n = REC.unpack_from(log, off)[1]
+        if off + REC.size + n > size:
+            break
+        out += IDX.pack(off, n)
+        off += REC.size + n
+    return out
+
+
+def rebuild_index(path: str) -> int:
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        idx = scan_index(m)
+    with open(index_path(path), "wb") as f:
+        f.write(idx)
+    return len(idx) // IDX.size
+
+
+class CaptureReader:
+    """
+    mmap del log y del índice. reader[n] y la iteración no copian la trama;
+    index_array() da el índice completo para procesar en bloque.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")
+        size = os.fstat(self._f.fileno()).st_size
+        if size < len(MAGIC):
+            raise ValueError(f"{path}: captura vacía o truncada")
+        self._log = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._log[:len(MAGIC)] != MAGIC:
+            self._log.close()
+            self._f.close()
+            raise ValueError(f"{path}: no es una captura de link.capture")
+        self._idx = self._load_index()
+        self.count = len(self._idx) // IDX.size
+        # el escritor vuelca el log antes que el índice, pero por si acaso
+        while self.count and sum(self._entry(self.count - 1)) + REC.size > size:
+            self.count -= 1
+
+    def _load_index(self):
+        self._idx_map = None
+        try:
+            with open(index_path(self.path), "rb") as f:
+                if os.fstat(f.fileno()).st_size >= IDX.size:
+                    self._idx_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            pass
+        if self._idx_map is None:
+            return memoryview(scan_index(self._log))
+        # una entrada a medias al final se ignora
+        m = self._idx_map
+        return memoryview(m)[:len(m) - len(m) % IDX.size]
+
+    def _entry(self, n: int) -> Tuple[int, int]:
+        return IDX.unpack_from(self._idx, n * IDX.size)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, n: int) -> Record:
+        if n < 0:
+            n += self.count
+        if not 0 <= n < self.count:
+            raise IndexError(n)
+        off, length = self._entry(n)
+        ts, _, ip, port = REC.unpack_from(self._log, off)
+        host, port = _unpack_addr(ip, port)
+        start = off + REC.size
+        return Record(n, ts, host, port, memoryview(self._log)[start:start + length])
+
+    def __iter__(self) -> Iterator[Record]:
+        for n in range(self.count):
+            yield self[n]
+
+    def frame(self, n: int) -> memoryview:
+        off, length = self._entry(n)
+        start = off + REC.size
+        return memoryview(self._log)[start:start + length]
+
+    def index_array(self) -> "np.ndarray":
+        """Índice como array estructurado (off, len), sin copiar."""
+        dt = np.dtype([("off", "<u8"), ("len", "<u4")])
+        return np.frombuffer(self._idx, dtype=dt, count=self.count)
+
+    def close(self):
+        # las vistas entregadas (Record.frame) deben haberse liberado antes
+        self._idx.release()
+        if self._idx_map is not None:
+            self._idx_map.close()
+        self._log.close()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _seq(fr) -> int:
+    if len(fr) >= 8 and fr[0] == VER2:
+        return int.from_bytes(fr[4:8], "big")
+    return fr[2] if len(fr) >= 3 else -1
+
+
+def check(reader: CaptureReader, poly_bits, fast: bool = True) -> Tuple[List[int], List[int], List[bool]]:
+    """
+    (tipo, seq, crc_ok) de cada trama de la captura (v1 o v2); tipo y seq son
+    -1 si la trama es demasiado corta. fast=True usa crc.batch si NumPy está.
+    """
+    if fast and np is not None and reader.count:
+        from crc.batch import verify_regions
+        ix = reader.index_array()
+        starts = ix["off"].astype(np.int64) + REC.size
+        lengths = ix["len"].astype(np.int64)
+        data = np.frombuffer(reader._log, dtype=np.uint8)
+        ok = verify_regions(data, starts, lengths, poly_bits)
+        short = lengths < 3
+        safe = np.where(short, 0, starts)
+        types = np.where(short, -1, data[safe + 1])
+        seqs = np.where(short, -1, data[safe + 2]).astype(np.int64)
+        v2 = ~short & (data[safe] == VER2)
+        if v2.any():
+            # SEQ de 32 bits en los bytes 4..7
+            w = np.where(lengths[v2] >= 8, safe[v2], -1)
+            seq32 = np.zeros(len(w), dtype=np.int64)
+            for k in range(4):
+                seq32 = (seq32 << 8) | data[np.where(w < 0, 0, w + 4 + k)]
+            seqs[v2] = np.where(w < 0, -1, seq32)
+        del data, ix
+        return types.tolist(), seqs.tolist(), ok.tolist()
+    types, seqs, oks = [], [], []
+    for n in range(reader.count):
+        fr = reader.frame(n)
+        types.append(fr[1] if len(fr) >= 3 else -1)
+        seqs.append(_seq(fr))
+        try:
+            oks.append(parse_frame(fr, poly_bits).crc_ok)
+        except ValueError:
+            oks.append(False)
+        fr.release()
+    return types, seqs, oks
+
+
+def select(types: Sequence[int], seqs: Sequence[int], oks: Sequence[bool], seq: Optional[int] = None,
+           type: Optional[int] = None, crc: Optional[bool] = None) -> List[int]:
+    """Índices de las tramas que cumplen los filtros (None = sin filtro)."""
+    return [n for n in range(len(oks))
+            if (seq is None or seqs[n] == seq)
+            and (type is None or types[n] == type)
+            and (crc is None or oks[n] == crc)]
+
+
+def replay(reader: CaptureReader, indices: Sequence[int], send: Callable[[bytes], None],
+           speed: float = 1.0):
+    """
+    Reenvía las tramas con send(). speed=1 respeta los tiempos originales,
+    speed=10 va diez veces más rápido y speed=0 envía sin pausas.
+    """
+    t0 = time.perf_counter()
+    first = None
+    for n in indices:
+        rec = reader[n]
+        if speed > 0:
+            first = rec.ts if first is None else first
+            delay = (rec.ts - first) / speed - (time.perf_counter() - t0)
+            if delay > 0:
+                time.sleep(delay)
+        data = bytes(rec.frame)
+        rec.frame.release()
+        send(data)
+
+
+def _type_arg(s: str) -> int:
+    names = {v: k for k, v in TYPE_NAMES.items()}
+    try:
+        return names[s.upper()] if s.upper() in names else int(s)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"tipo desconocido: {s!r} (DATA, ACK, NACK o número)")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m link.capture", description="capturas de tramas")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    def filters(q):
+        q.add_argument("captura")
+        q.add_argument("--poly", default="0011", help="cadena de bits o modelo del catálogo")
+        q.add_argument("--seq", type=int)
+        q.add_argument("--tipo", type=_type_arg, help="DATA, ACK, NACK o número")
+        q.add_argument("--crc", choices=["ok", "falla"])
+        q.add_argument("--lento", action="store_true", help="trama a trama con parse_frame, sin NumPy")
+
+    v = sub.add_parser("verificar", help="recalcula el CRC de toda la captura")
+    filters(v)
+    v.add_argument("--listar", action="store_true", help="una línea por trama seleccionada")
+    r = sub.add_parser("reenviar", help="reinyecta las tramas en un peer")
+    filters(r)
+    r.add_argument("host")
+    r.add_argument("puerto", type=int)
+    r.add_argument("--velocidad", type=float, default=1.0, help="1 = ritmo original, 0 = sin pausas")
+    r.add_argument("--transporte", default="tcp", choices=["tcp", "asyncio", "udp"])
+    i = sub.add_parser("indexar", help="reconstruye el índice .idx")
+    i.add_argument("captura")
+    a = p.parse_args(argv)
+
+    if a.cmd == "indexar":
+        print(f"{rebuild_index(a.captura)} tramas indexadas")
+        return 0
+
+    with CaptureReader(a.captura) as rd:
+        t0 = time.perf_counter()
+        types, seqs, oks = check(rd, a.poly, fast=not a.lento)
+        dt = time.perf_counter() - t0
+        crc = None if a.crc is None else a.crc == "ok"
+        sel = select(types, seqs, oks, a.seq, a.tipo, crc)
+        if a.cmd == "verificar":
+            mb = sum(rd.index_array()["len"].tolist()) if np is not None else \
+                sum(len(rd.frame(n)) for n in range(rd.count))
+            bad = oks.count(False)
+            print(f"{rd.count} tramas, {bad} con CRC incorrecto, {len(sel)} seleccionadas "
+                  f"({dt:.3f} s, {mb / 1e6 / dt if dt else 0:.1f} MB/s)")
+            if a.listar:
+                for n in sel:
+                    rec = rd[n]
+                    print(f"{n:8d} {rec.ts:.6f} {rec.host}:{rec.port} "
+                          f"{TYPE_NAMES.get(types[n], types[n])} seq={seqs[n]} "
+                          f"len={len(rec.frame)} {'OK' if oks[n] else 'FALLA'}")
+                    rec.frame.release()
+            return 0
+        # import diferido: los peers importan este módulo
+        from link.transport import make_peer
+        # puerto 0: solo se envía; AsyncTcpPeer necesita su bucle en marcha
+        peer = make_peer(a.transporte, host="127.0.0.1", port=0)
+        if a.transporte == "asyncio":
+            peer.start()
+        try:
+            replay(rd, sel, lambda fr: peer.send(a.host, a.puerto, fr), a.velocidad)
+            # TcpPeer.send solo encola: sin esto la cola se perdería al salir
+            if hasattr(peer, "flush"):
+                peer.flush()
+        finally:
+            peer.stop()
+        print(f"{len(sel)} tramas reenviadas a {a.host}:{a.puerto}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Etapa opcional entre payload_from_input y el ARQ: junta los mensajes que
+llegan dentro de una ventana de tiempo o de tamaño en una sola trama v2
+(FLAG_BATCH, registros [LEN varint][datos]) y comprime el payload con zlib
+o LZMA cuando sale más corto (FLAG_ZLIB/FLAG_LZMA).
+
+Con mensajes cortos de texto son menos tramas, menos CRC calculados, menos
+ACK y menos bytes. ArqReceiver desempaqueta solo: deliver() sigue
+recibiendo un mensaje por llamada.
+
+    stage = Coalescer(tx.send, delay=0.005, compress="auto")
+    stage.put(b"hola")     # vuelve enseguida
+    stage.close()          # envía lo pendiente
+
+send(payload, flags) se llama siempre desde un solo hilo a la vez y en el
+orden de put(). Si send bloquea (ventana ARQ llena) los mensajes siguen
+juntándose; put() espera cuando hay QUEUE_MSGS pendientes.
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+from link.proto import pack_payload
+
+# espera máxima desde el primer mensaje pendiente
+DELAY = 0.005
+# payload agrupado objetivo: con UDP cabe en un datagrama sin fragmentar
+MAX_BYTES = 1400
+QUEUE_MSGS = 4096
+
+
+class Coalescer:
+    def __init__(self, send: Callable[[bytes, int], object], delay: float = DELAY,
+                 max_bytes: int = MAX_BYTES, compress: str = "auto", queue_msgs: int = QUEUE_MSGS):
+        pack_payload([b""], compress)  # valida el método antes de arrancar
+        self.send = send
+        self.delay = delay
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.queue_msgs = queue_msgs
+        self.last_error: Optional[Exception] = None
+        self._q: deque = deque()
+        self._size = 0
+        self._first = 0.0  # llegada del mensaje pendiente más antiguo
+        self._closed = False
+        self._cv = threading.Condition()
+        self._send_lock = threading.Lock()
+        self.stats = {"messages": 0, "frames": 0, "bytes_in": 0, "bytes_out": 0}
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, msg: bytes, timeout: Optional[float] = None):
+        with self._cv:
+            if not self._cv.wait_for(lambda: len(self._q) < self.queue_msgs or self._closed, timeout):
+                raise TimeoutError("cola de agrupación llena")
+            if self._closed:
+                raise RuntimeError("Coalescer cerrado")
+            if not self._q:
+                self._first = time.monotonic()
+            self._q.append(bytes(msg))
+            self._size += len(msg)
+            self._cv.notify_all()
+
+    def _take(self) -> List[bytes]:
+        # bajo _cv: mensajes hasta max_bytes (al menos uno)
+        batch = [self._q.popleft()]
+        size = len(batch[0])
+        while self._q and size + len(self._q[0]) <= self.max_bytes:
+            m = self._q.popleft()
+            batch.append(m)
+            size += len(m)
+        self._size -= size
+        self._cv.notify_all()
+        return batch
+
+    def _send_batch(self, batch: List[bytes]):
+        payload, flags = pack_payload(batch, self.compress)
+        self.stats["messages"] += len(batch)
+        self.stats["frames"] += 1
+        self.stats["bytes_in"] += sum(len(m) for m in batch)
+        self.stats["bytes_out"] += len(payload)
+        try:
+            self.send(payload, flags)
+        except Exception as e:
+            self.last_error = e
+
+    def _ready(self) -> bool:
+        return self._closed or self._size >= self.max_bytes or (
+            self._q and time.monotonic() - self._first >= self.delay)
+
+    def _run(self):
+        while True:
+            with self._cv:
+                while not self._ready():
+                    wait = None if not self._q else self._first + self.delay - time.monotonic()
+                    self._cv.wait(wait)
+                if not self._q:
+                    return
+            with self._send_lock:
+                with self._cv:
+                    if not self._q:
+                        continue  # flush() se adelantó
+                    batch = self._take()
+                self._send_batch(batch)
+
+    def flush(self):
+        """Envía ya todo lo pendiente, en el hilo del llamador."""
+        with self._send_lock:
+            while True:
+                with self._cv:
+                    if not self._q:
+                        return
+                    batch = self._take()
+                self._send_batch(batch)
+
+    def close(self, timeout: float = 5.0):
+        with self._cv:
+            self._closed = True
+            self._cv.notify_all()
+        self._thread.join(timeout)
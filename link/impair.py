@@ -0,0 +1,377 @@
+"""
+Proxy de canal con defectos entre dos peers en localhost, para medir el ARQ
+con pérdidas reales en vez del bit único del botón "fallar" de la GUI.
+
+    python -m link.impair --ruta 6000=127.0.0.1:5000 --ruta 6001=127.0.0.1:5001 --poly CRC-32 --perfil rafagas
+    python -m app.main --puerto 5000 --peer_puerto 6001 --poly CRC-32 ... --recibir-archivo x.bin
+    python -m app.main --puerto 5001 --peer_puerto 6000 --poly CRC-32 ... --enviar-archivo x.bin
+
+Cada --ruta ESCUCHA=HOST:PUERTO es un sentido: las tramas link.proto que
+llegan a ESCUCHA salen hacia HOST:PUERTO después de pasar por un Channel:
+
+- BER independiente por bit (--ber) o ráfagas Gilbert-Elliott (--ge P R
+  BER_MALO): dos estados por bit, bueno -> malo con probabilidad P y
+  vuelta con R; en el estado malo los bits fallan con BER_MALO.
+- pérdida (--perdida), duplicado (--duplicado), reordenamiento
+  (--reorden: la trama se retiene --reorden-retardo s y la adelantan las
+  siguientes) y latencia con jitter gaussiano (--retardo, --jitter).
+
+--poly tiene que ser el mismo que usan los peers: en v1 la cabecera no dice
+cuántos bytes de CRC lleva la trama y con otro tamaño el proxy cortaría
+mal el flujo TCP. Con TCP/asyncio los errores de bit no tocan la cabecera:
+un LEN dañado desincronizaría el flujo en lugar de probar el CRC. Con UDP se daña la
+trama entera. --registro guarda una línea JSON por trama con lo que se le
+hizo y al terminar se imprime el resumen por sentido (--json en JSON).
+"""
+import argparse
+import heapq
+import itertools
+import json
+import math
+import random
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Tuple
+
+from crc.models import resolve_model
+from link.proto import peek_header
+from link.transport import TRANSPORTS, make_peer
+
+# perfiles de partida; las opciones sueltas los sobrescriben
+PROFILES = {
+    "limpio": {},
+    "ruidoso": dict(ber=1e-5, loss=0.01, delay=0.005, jitter=0.002),
+    "rafagas": dict(ge_p=1e-5, ge_r=0.01, ge_ber=0.05, loss=0.005, delay=0.005, jitter=0.002),
+    "wifi": dict(ber=1e-6, loss=0.02, dup=0.002, reorder=0.01, delay=0.003, jitter=0.003),
+    "satelite": dict(ber=1e-7, loss=0.005, delay=0.3, jitter=0.01),
+}
+
+
+def _geometric(q: float, rng: random.Random) -> float:
+    """Ensayos fallidos antes del primer éxito (probabilidad q por ensayo)."""
+    if q <= 0:
+        return math.inf
+    if q >= 1:
+        return 0
+    return int(math.log(1.0 - rng.random()) / math.log1p(-q))
+
+
+def _flip_range(out: bytearray, lo: int, hi: int, ber: float, rng: random.Random) -> int:
+    """Invierte cada bit de [lo, hi) con probabilidad ber; devuelve cuántos."""
+    n = 0
+    pos = lo - 1
+    while True:
+        pos += 1 + _geometric(ber, rng)
+        if pos >= hi:
+            return n
+        out[pos >> 3] ^= 0x80 >> (pos & 7)
+        n += 1
+
+
+def flip_bits(frame: bytes, ber: float, rng: random.Random, start: int = 0) -> bytes:
+    """
+    Invierte cada bit desde el bit start con probabilidad ber (saltos
+    geométricos entre errores). Sobre TCP/asyncio se pasa
+    start = 8 * peek_header(frame)[2], como hace Channel, para que la
+    cabecera (y su LEN) llegue intacta; con UDP, start=0.
+    """
+    if ber <= 0:
+        return frame
+    out = bytearray(frame)
+    return bytes(out) if _flip_range(out, start, 8 * len(out), ber, rng) else frame
+
+
+class GilbertElliott:
+    """
+    Errores en ráfaga: estado bueno/malo por bit con permanencias
+    geométricas, así que cada estado se sortea de una vez y no bit a bit.
+    """
+
+    def __init__(self, p: float, r: float, ber_bad: float, ber_good: float = 0.0,
+                 rng: Optional[random.Random] = None):
+        self.p = p
+        self.r = r
+        self.ber_bad = ber_bad
+        self.ber_good = ber_good
+        self.rng = rng or random.Random()
+        self.bad = False
+        self.bursts = 0
+        self._left = self._sojourn()
+
+    def _sojourn(self) -> float:
+        return 1 + _geometric(self.r if self.bad else self.p, self.rng)
+
+    def corrupt(self, out: bytearray, start: int = 0) -> int:
+        """Pasa los bits de out por el canal (solo se dañan desde el bit start)."""
+        pos, nbits, flips = 0, 8 * len(out), 0
+        while pos < nbits:
+            seg = int(min(self._left, nbits - pos))
+            ber = self.ber_bad if self.bad else self.ber_good
+            lo = max(pos, start)
+            if ber > 0 and lo < pos + seg:
+                flips += _flip_range(out, lo, pos + seg, ber, self.rng)
+            pos += seg
+            self._left -= seg
+            if self._left <= 0:
+                self.bad = not self.bad
+                self.bursts += self.bad
+                self._left = self._sojourn()
+        return flips
+
+
+@dataclass
+class Impairment:
+    ber: float = 0.0
+    loss: float = 0.0
+    dup: float = 0.0
+    reorder: float = 0.0
+    reorder_delay: float = 0.02
+    delay: float = 0.0
+    jitter: float = 0.0
+    # Gilbert-Elliott; ge_p=0 lo desactiva (queda solo ber)
+    ge_p: float = 0.0
+    ge_r: float = 0.1
+    ge_ber: float = 0.0
+
+    @classmethod
+    def from_profile(cls, name: str = "limpio", **overrides) -> "Impairment":
+        if name not in PROFILES:
+            raise ValueError(f"perfil desconocido: {name!r} (opciones: {', '.join(PROFILES)})")
+        cfg = dict(PROFILES[name])
+        cfg.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**cfg)
+
+
+class Channel:
+    """Un sentido del proxy: decide qué le pasa a cada trama y lo cuenta."""
+
+    def __init__(self, imp: Impairment, rng: random.Random, protect_header: bool = False):
+        self.imp = imp
+        self.rng = rng
+        self.protect_header = protect_header
+        self.ge = GilbertElliott(imp.ge_p, imp.ge_r, imp.ge_ber, imp.ber, rng) if imp.ge_p > 0 else None
+        self.stats = {"frames": 0, "bytes": 0, "dropped": 0, "duplicated": 0, "corrupted": 0,
+                      "bit_flips": 0, "reordered": 0, "delay_sum": 0.0}
+
+    def _corrupt(self, frame: bytes) -> Tuple[bytes, int]:
+        start = 0
+        if self.protect_header:
+            try:
+                start = 8 * peek_header(frame)[2]
+            except ValueError:
+                pass
+        out = bytearray(frame)
+        if self.ge is not None:
+            flips = self.ge.corrupt(out, start)
+        elif self.imp.ber > 0:
+            flips = _flip_range(out, start, 8 * len(out), self.imp.ber, self.rng)
+        else:
+            flips = 0
+        return (bytes(out), flips) if flips else (frame, 0)
+
+    def _delay(self) -> float:
+        imp = self.imp
+        d = imp.delay + (self.rng.gauss(0.0, imp.jitter) if imp.jitter else 0.0)
+        return max(0.0, d)
+
+    def apply(self, frame: bytes) -> Tuple[List[Tuple[float, bytes]], dict]:
+        """(lista de (retardo, trama) a enviar, evento para el registro)."""
+        imp, rng, st = self.imp, self.rng, self.stats
+        st["frames"] += 1
+        st["bytes"] += len(frame)
+        ev = {"len": len(frame)}
+        if rng.random() < imp.loss:
+            st["dropped"] += 1
+            ev["accion"] = "perdida"
+            return [], ev
+        copies = 2 if rng.random() < imp.dup else 1
+        out = []
+        for _ in range(copies):
+            f, flips = self._corrupt(frame)
+            d = self._delay()
+            if rng.random() < imp.reorder:
+                d += imp.reorder_delay
+                st["reordered"] += 1
+                ev["reordenada"] = True
+            if flips:
+                st["corrupted"] += 1
+                st["bit_flips"] += flips
+                ev["bits"] = ev.get("bits", 0) + flips
+            st["delay_sum"] += d
+            out.append((d, f))
+        if copies > 1:
+            st["duplicated"] += 1
+            ev["duplicada"] = True
+        ev["accion"] = "dañada" if "bits" in ev else "ok"
+        ev["retardo_ms"] = round(1000 * out[0][0], 3)
+        return out, ev
+
+
+class ImpairProxy:
+    """
+    Rutas ESCUCHA -> destino, cada una con su Channel. Las tramas se
+    reenvían desde un hilo planificador en el instante que toca.
+    """
+
+    def __init__(self, routes: List[Tuple[int, str, int]], imp: Impairment, poly_bits,
+                 transport: str = "tcp", host: str = "127.0.0.1", seed: Optional[int] = None,
+                 log_path: Optional[str] = None):
+        self.transport = transport
+        self.imp = imp
+        rng = random.Random(seed)
+        stream = transport != "udp"
+        crc_bytes = resolve_model(poly_bits).nbytes
+        self.routes = []
+        for listen, dst_host, dst_port in routes:
+            ch = Channel(imp, random.Random(rng.random()), protect_header=stream)
+            name = f"{listen}->{dst_host}:{dst_port}"
+            peer = make_peer(transport, host=host, port=listen, crc_bytes=crc_bytes,
+                             on_data=self._receiver(len(self.routes)))
+            self.routes.append((name, ch, peer, dst_host, dst_port))
+        self._log = open(log_path, "w", encoding="utf-8") if log_path else None
+        self._log_lock = threading.Lock()
+        self._heap: List = []
+        self._count = itertools.count()
+        self._cv = threading.Condition()
+        self._stop = False
+        self._t0 = time.monotonic()
+        self.send_errors = 0
+
+    def _receiver(self, i: int):
+        def on_data(data, addr):
+            name, ch, _, _, _ = self.routes[i]
+            frame = bytes(data)
+            with self._cv:
+                out, ev = ch.apply(frame)
+                now = time.monotonic()
+                for d, f in out:
+                    heapq.heappush(self._heap, (now + d, next(self._count), i, f))
+                self._cv.notify()
+            if self._log is not None:
+                self._record(name, frame, now, ev)
+        return on_data
+
+    def _record(self, name: str, frame: bytes, now: float, ev: dict):
+        try:
+            ftype, seq, _ = peek_header(frame)
+        except ValueError:
+            ftype = seq = None
+        ev = {"t": round(now - self._t0, 6), "ruta": name, "tipo": ftype, "seq": seq, **ev}
+        with self._log_lock:
+            self._log.write(json.dumps(ev, ensure_ascii=False) + "\n")
+
+    def _run(self):
+        while True:
+            with self._cv:
+                while not self._stop and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    self._cv.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                if self._stop:
+                    return
+                _, _, i, frame = heapq.heappop(self._heap)
+            _, _, peer, dst_host, dst_port = self.routes[i]
+            try:
+                peer.send(dst_host, dst_port, frame)
+            except Exception:
+                # destino caído o cola llena: para el ARQ es una pérdida más
+                self.send_errors += 1
+
+    def start(self):
+        for _, _, peer, _, _ in self.routes:
+            peer.start()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        with self._cv:
+            self._stop = True
+            self._cv.notify_all()
+        for _, _, peer, _, _ in self.routes:
+            peer.stop()
+        if self._log is not None:
+            with self._log_lock:
+                self._log.close()
+
+    def summary(self) -> dict:
+        out = {"transporte": self.transport, "defectos": asdict(self.imp),
+               "errores_envio": self.send_errors, "rutas": {}}
+        for name, ch, _, _, _ in self.routes:
+            st = dict(ch.stats)
+            fwd = st["frames"] - st["dropped"] + st["duplicated"]
+            st["delay_mean_ms"] = round(1000 * st.pop("delay_sum") / fwd, 3) if fwd else 0.0
+            if ch.ge is not None:
+                st["bursts"] = ch.ge.bursts
+            out["rutas"][name] = st
+        return out
+
+
+def report(summary: dict):
+    print(f"transporte {summary['transporte']}; errores de envío {summary['errores_envio']}")
+    cols = ("frames", "dropped", "duplicated", "reordered", "corrupted", "bit_flips", "delay_mean_ms")
+    print(f"{'ruta':<24}" + "".join(f"{c:>14}" for c in cols))
+    for name, st in summary["rutas"].items():
+        print(f"{name:<24}" + "".join(f"{st[c]:>14}" for c in cols))
+
+
+def _route(spec: str) -> Tuple[int, str, int]:
+    try:
+        listen, dst = spec.split("=", 1)
+        host, port = dst.rsplit(":", 1)
+        return int(listen), host, int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ruta inválida {spec!r} (ESCUCHA=HOST:PUERTO)") from None
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m link.impair",
+                                description="Proxy con pérdidas, errores y retardo entre dos peers.")
+    p.add_argument("--ruta", type=_route, action="append", required=True, metavar="ESCUCHA=HOST:PUERTO",
+                   help="un sentido del enlace; repetir para el otro")
+    p.add_argument("--perfil", default="limpio", choices=list(PROFILES))
+    p.add_argument("--ber", type=float, help="probabilidad de error por bit")
+    p.add_argument("--ge", type=float, nargs=3, metavar=("P", "R", "BER_MALO"),
+                   help="ráfagas Gilbert-Elliott: bueno->malo P, malo->bueno R por bit")
+    p.add_argument("--perdida", type=float, help="probabilidad de perder la trama")
+    p.add_argument("--duplicado", type=float, help="probabilidad de duplicarla")
+    p.add_argument("--reorden", type=float, help="probabilidad de retenerla y que la adelanten")
+    p.add_argument("--reorden-retardo", dest="reorden_retardo", type=float, help="retención extra en s")
+    p.add_argument("--retardo", type=float, help="latencia en s")
+    p.add_argument("--jitter", type=float, help="desviación de la latencia en s")
+    p.add_argument("--transporte", default="tcp", choices=list(TRANSPORTS))
+    p.add_argument("--poly", required=True,
+                   help="modelo CRC de los peers, igual que su --poly (tamaño del CRC en v1)")
+    p.add_argument("--host", default="127.0.0.1", help="dirección donde escucha el proxy")
+    p.add_argument("--semilla", type=int)
+    p.add_argument("--duracion", type=float, default=0.0, help="segundos (0 = hasta Ctrl+C)")
+    p.add_argument("--registro", metavar="RUTA", help="una línea JSON por trama")
+    p.add_argument("--json", action="store_true", help="resumen en JSON")
+    a = p.parse_args(argv)
+    ge = dict(zip(("ge_p", "ge_r", "ge_ber"), a.ge)) if a.ge else {}
+    try:
+        imp = Impairment.from_profile(a.perfil, ber=a.ber, loss=a.perdida, dup=a.duplicado,
+                                      reorder=a.reorden, reorder_delay=a.reorden_retardo,
+                                      delay=a.retardo, jitter=a.jitter, **ge)
+    except ValueError as e:
+        p.error(str(e))
+    proxy = ImpairProxy(a.ruta, imp, a.poly, a.transporte, a.host, a.semilla, a.registro)
+    proxy.start()
+    print(f"proxy {a.perfil}: " + ", ".join(r[0] for r in proxy.routes), file=sys.stderr)
+    try:
+        if a.duracion > 0:
+            time.sleep(a.duracion)
+        else:
+            while True:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    proxy.stop()
+    s = proxy.summary()
+    if a.json:
+        print(json.dumps(s, indent=2, ensure_ascii=False))
+    else:
+        report(s)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
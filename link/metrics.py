@@ -0,0 +1,238 @@
+"""
+Métricas del enlace: contadores e histogramas de latencia en un registro
+global (METRICS) que alimentan los peers, link.proto y link.arq.
+
+- Counter: entero con lock (un incremento cuesta ~100 ns).
+- Histogram: buckets log-lineales al estilo HDR, 2^SUB_BITS sub-buckets por
+  potencia de 2 (error relativo < 1/2^SUB_BITS) sobre valores en µs, así que
+  la memoria no crece con el número de muestras; registrar una muestra no
+  toma ningún lock.
+
+serve_stats() publica /metrics (texto Prometheus) y /stats.json en
+localhost; start_json_dump() escribe el JSON cada `interval` segundos.
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter as _Tally, deque
+from itertools import islice
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+SUB_BITS = 4
+_NEVER = object()
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class Counter:
+    __slots__ = ("name", "help", "value", "_lock")
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n: int = 1):
+        with self._lock:
+            self.value += n
+
+
+class Histogram:
+    """
+    Valores en segundos, guardados como µs enteros en buckets log-lineales.
+    observe() solo hace deque.append (atómico, sin lock); las muestras se
+    pasan a los buckets al leer o cada FOLD_EVERY muestras.
+    """
+    FOLD_EVERY = 1024
+    __slots__ = ("name", "help", "count", "sum", "min", "max", "_buckets", "_pending", "_lock")
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self._buckets: Dict[int, int] = {}
+        self._pending: deque = deque()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _index(us: int) -> int:
+        # exactos por debajo de 2^SUB_BITS; arriba, SUB_BITS bits de mantisa
+        if us < (1 << SUB_BITS):
+            return us
+        shift = us.bit_length() - SUB_BITS - 1
+        return ((shift + 1) << SUB_BITS) + ((us >> shift) & ((1 << SUB_BITS) - 1))
+
+    @staticmethod
+    def _upper(idx: int) -> int:
+        # mayor valor (µs) que cae en el bucket idx
+        if idx < (1 << SUB_BITS):
+            return idx
+        shift = (idx >> SUB_BITS) - 1
+        mant = (1 << SUB_BITS) | (idx & ((1 << SUB_BITS) - 1))
+        return ((mant + 1) << shift) - 1
+
+    def observe(self, seconds: float):
+        self._pending.append(seconds)
+        if len(self._pending) >= self.FOLD_EVERY:
+            self.fold()
+
+    def fold(self):
+        with self._lock:
+            n = len(self._pending)
+            if not n:
+                return
+            # popleft x n a nivel C: solo otros hilos añaden, nunca se vacía antes
+            vals = list(islice(iter(self._pending.popleft, _NEVER), n))
+            self.count += n
+            self.sum += sum(vals)
+            self.max = max(self.max, max(vals))
+            self.min = min(self.min, min(vals))
+            b = self._buckets
+            # primero por µs exacto (Counter en C), luego a buckets por valor distinto
+            for us, c in _Tally(map(int, map(1e6.__mul__, vals))).items():
+                idx = self._index(max(0, us))
+                b[idx] = b.get(idx, 0) + c
+
+    def quantiles(self, qs=QUANTILES) -> List[Tuple[float, float]]:
+        """[(q, segundos)]: cota superior del bucket que contiene el cuantil q."""
+        self.fold()
+        with self._lock:
+            items = sorted(self._buckets.items())
+            total = self.count
+        out = []
+        for q in qs:
+            if not total:
+                out.append((q, 0.0))
+                continue
+            rank = max(1, int(q * total + 0.5))
+            seen = 0
+            for idx, c in items:
+                seen += c
+                if seen >= rank:
+                    out.append((q, self._upper(idx) / 1e6))
+                    break
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self.counters: Dict[str, Counter] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.started = time.time()
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        c = self.counters.get(name)
+        if c is None:
+            c = self.counters[name] = Counter(name, help)
+        return c
+
+    def histogram(self, name: str, help: str = "") -> Histogram:
+        h = self.histograms.get(name)
+        if h is None:
+            h = self.histograms[name] = Histogram(name, help)
+        return h
+
+    def snapshot(self) -> Dict:
+        return {
+            "time": time.time(),
+            "uptime": time.time() - self.started,
+            "counters": {n: c.value for n, c in self.counters.items()},
+            "histograms": {n: self._summary(h) for n, h in self.histograms.items()},
+        }
+
+    @staticmethod
+    def _summary(h: Histogram) -> Dict:
+        qs = h.quantiles()  # primero: pasa las muestras pendientes
+        return {"count": h.count, "sum": h.sum, "min": h.min if h.count else None,
+                "max": h.max if h.count else None, "quantiles": {str(q): v for q, v in qs}}
+
+    def prometheus(self) -> str:
+        lines = []
+        for n, c in self.counters.items():
+            lines += [f"# HELP {n} {c.help}", f"# TYPE {n} counter", f"{n} {c.value}"]
+        for n, h in self.histograms.items():
+            qs = h.quantiles()
+            lines += [f"# HELP {n} {h.help}", f"# TYPE {n} summary"]
+            lines += [f'{n}{{quantile="{q}"}} {v:.6f}' for q, v in qs]
+            lines += [f"{n}_sum {h.sum:.6f}", f"{n}_count {h.count}"]
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Registry()
+
+FRAMES_SENT = METRICS.counter("link_frames_sent_total", "tramas enviadas por el peer")
+FRAMES_RECEIVED = METRICS.counter("link_frames_received_total", "tramas recibidas por el peer")
+BYTES_SENT = METRICS.counter("link_bytes_sent_total", "bytes enviados por el peer")
+BYTES_RECEIVED = METRICS.counter("link_bytes_received_total", "bytes recibidos por el peer")
+CRC_FAILURES = METRICS.counter("link_crc_failures_total", "tramas con CRC incorrecto")
+NACKS_SENT = METRICS.counter("link_nacks_sent_total", "NACK enviados por el receptor ARQ")
+NACKS_RECEIVED = METRICS.counter("link_nacks_received_total", "NACK recibidos por el emisor ARQ")
+RETRANSMITS = METRICS.counter("link_retransmits_total", "retransmisiones ARQ")
+TIMEOUTS = METRICS.counter("link_timeouts_total", "vencimientos del temporizador ARQ")
+RECONNECTS = METRICS.counter("link_reconnects_total", "reconexiones del pool de envío tras un error")
+SEND_DROPPED = METRICS.counter("link_send_dropped_total", "tramas descartadas por el pool tras reintentar")
+DUPLICATES = METRICS.counter("link_duplicate_seqs_total", "tramas DATA con SEQ ya entregado")
+ACK_RTT = METRICS.histogram("link_ack_rtt_seconds", "RTT envío-ACK por SEQ (sin retransmitidas)")
+CRC_TIME = METRICS.histogram("link_crc_seconds", "tiempo de cálculo del CRC por trama")
+
+
+class _StatsHandler(BaseHTTPRequestHandler):
+    registry: Registry = METRICS
+
+    def do_GET(self):
+        if self.path in ("/", "/metrics"):
+            body = self.registry.prometheus().encode()
+            ctype = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path == "/stats.json":
+            body = json.dumps(self.registry.snapshot()).encode()
+            ctype = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_stats(port: int, registry: Registry = METRICS, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Endpoint HTTP en un hilo daemon; solo localhost por defecto."""
+    handler = type("StatsHandler", (_StatsHandler,), {"registry": registry})
+    srv = ThreadingHTTPServer((host, port), handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def dump_json(path: str, registry: Registry = METRICS):
+    # escritura atómica: quien lea el archivo nunca ve uno a medias
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(registry.snapshot(), f, indent=2)
+    os.replace(tmp, path)
+
+
+def start_json_dump(path: str, interval: float = 10.0, registry: Registry = METRICS,
+                    stop: Optional[threading.Event] = None) -> threading.Event:
+    """Vuelca el JSON cada interval segundos hasta que se active el Event devuelto."""
+    stop = stop or threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                dump_json(path, registry)
+            except OSError:
+                pass
+        dump_json(path, registry)
+
+    threading.Thread(target=run, daemon=True).start()
+    return stop
@@ -0,0 +1,192 @@
+"""
+Conexiones salientes persistentes para TcpPeer.send: una por (host, puerto),
+con TCP_NODELAY y keep-alive, en vez de conectar y cerrar por cada trama.
+
+send() deja la trama en la cola de la conexión y vuelve; un hilo por
+conexión la vacía y escribe todo lo pendiente con un solo sendmsg
+(writev): con tráfico, muchas tramas por syscall. La cola está acotada
+(QUEUE_FRAMES): si el receptor no da abasto send() espera hasta `timeout`
+y luego lanza TimeoutError. Si la escritura falla se reconecta una vez y se
+reintenta el lote; si vuelve a fallar el lote se descarta (el ARQ
+retransmite), el error se guarda en `last_error` y se avisa con
+on_error(host, puerto, error), que se llama desde el hilo de la conexión.
+
+El receptor (TcpPeer/AsyncTcpPeer con FrameDecoder) ya admite varias
+tramas seguidas por conexión; el modo raw no, y sigue sin pool.
+"""
+import atexit
+import socket
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from link.metrics import BYTES_SENT, FRAMES_SENT, RECONNECTS, SEND_DROPPED
+
+QUEUE_FRAMES = 256
+# buffers por sendmsg (IOV_MAX suele ser 1024)
+MAX_IOV = 512
+# sin tráfico durante este tiempo se cierra el socket (se reabre al enviar)
+IDLE_TIMEOUT = 30.0
+
+Buffers = Union[bytes, Sequence[bytes]]
+OnError = Callable[[str, int, OSError], None]
+
+
+def _sendmsg_all(sock: socket.socket, bufs: List[memoryview]):
+    """sendmsg hasta escribir todo, avanzando sobre escrituras parciales."""
+    while bufs:
+        n = sock.sendmsg(bufs[:MAX_IOV])
+        while n:
+            if n >= len(bufs[0]):
+                n -= len(bufs[0])
+                bufs.pop(0)
+            else:
+                bufs[0] = bufs[0][n:]
+                n = 0
+
+
+def _sendall(sock: socket.socket, bufs: List[memoryview]):
+    if hasattr(sock, "sendmsg"):
+        _sendmsg_all(sock, bufs)
+    else:  # pragma: no cover (Windows)
+        sock.sendall(b"".join(bufs))
+
+
+class PooledConnection:
+    def __init__(self, host: str, port: int, queue_frames: int = QUEUE_FRAMES,
+                 connect_timeout: float = 2.0, on_error: Optional[OnError] = None):
+        self.host = host
+        self.port = int(port)
+        self.queue_frames = queue_frames
+        self.connect_timeout = connect_timeout
+        self.on_error = on_error
+        self.last_error: Optional[OSError] = None
+        self._q: deque = deque()
+        self._busy = False
+        self._closed = False
+        self._cv = threading.Condition()
+        self._sock: Optional[socket.socket] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, parts: Tuple[bytes, ...], timeout: Optional[float] = None):
+        with self._cv:
+            if not self._cv.wait_for(lambda: len(self._q) < self.queue_frames or self._closed,
+                                     timeout):
+                raise TimeoutError(f"cola de envío a {self.host}:{self.port} llena")
+            if self._closed:
+                raise OSError(f"conexión a {self.host}:{self.port} cerrada")
+            self._q.append(parts)
+            self._cv.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que todo lo encolado se haya escrito (o descartado)."""
+        with self._cv:
+            return self._cv.wait_for(lambda: not self._q and not self._busy, timeout)
+
+    def close(self, timeout: float = 1.0):
+        self.flush(timeout)
+        with self._cv:
+            self._closed = True
+            self._cv.notify_all()
+        self._thread.join(timeout)
+        self._drop_socket()
+
+    def _connect(self) -> socket.socket:
+        s = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        s.settimeout(None)
+        return s
+
+    def _drop_socket(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def _run(self):
+        while True:
+            with self._cv:
+                if not self._cv.wait_for(lambda: self._q or self._closed, IDLE_TIMEOUT):
+                    self._drop_socket()
+                    continue
+                if not self._q:
+                    return
+                batch = list(self._q)
+                self._q.clear()
+                self._busy = True
+                self._cv.notify_all()
+            try:
+                self._write(batch)
+            finally:
+                with self._cv:
+                    self._busy = False
+                    self._cv.notify_all()
+
+    def _write(self, batch: List[Tuple[bytes, ...]]):
+        size = sum(len(p) for parts in batch for p in parts)
+        for attempt in range(2):
+            try:
+                if self._sock is None:
+                    if attempt or self.last_error is not None:
+                        RECONNECTS.inc()
+                    self._sock = self._connect()
+                _sendall(self._sock, [memoryview(p) for parts in batch for p in parts])
+                FRAMES_SENT.inc(len(batch))
+                BYTES_SENT.inc(size)
+                self.last_error = None
+                return
+            except OSError as e:
+                self.last_error = e
+                self._drop_socket()
+        # el receptor puede haber recibido parte del lote: el ARQ descarta duplicados
+        SEND_DROPPED.inc(len(batch))
+        if self.on_error:
+            self.on_error(self.host, self.port, self.last_error)
+
+
+class ConnectionPool:
+    def __init__(self, queue_frames: int = QUEUE_FRAMES, on_error: Optional[OnError] = None):
+        self.queue_frames = queue_frames
+        self.on_error = on_error
+        self._conns: Dict[Tuple[str, int], PooledConnection] = {}
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def connection(self, host: str, port: int, connect_timeout: float = 2.0) -> PooledConnection:
+        key = (host, int(port))
+        with self._lock:
+            c = self._conns.get(key)
+            if c is None:
+                c = self._conns[key] = PooledConnection(host, port, self.queue_frames, connect_timeout,
+                                                        self.on_error)
+            return c
+
+    def send(self, host: str, port: int, data: Buffers, timeout: Optional[float] = 2.0):
+        """
+        data es un buffer o una secuencia de buffers (p. ej. cabecera, payload
+        y CRC por separado) que se escriben seguidos sin juntarlos antes.
+        """
+        parts = (data,) if isinstance(data, (bytes, bytearray, memoryview)) else tuple(data)
+        # la escritura es diferida: se copia lo que el llamador podría reutilizar
+        parts = tuple(p if isinstance(p, bytes) else bytes(p) for p in parts)
+        self.connection(host, port, timeout or 2.0).put(parts, timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            conns = list(self._conns.values())
+        return all(c.flush(None if end is None else max(0.0, end - time.monotonic()))
+                   for c in conns)
+
+    def close(self, timeout: float = 1.0):
+        with self._lock:
+            conns = list(self._conns.values())
+            self._conns.clear()
+        for c in conns:
+            c.close(timeout)
+        atexit.unregister(self.close)
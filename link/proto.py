@@ -1,64 +1,324 @@
-from typing import Dict, Any, Tuple
-from crc.crc_core import bits_from_bytes, is_bitstring, parse_bitstring, crc_calc
+import lzma
+import zlib
+from time import perf_counter
+from typing import List, Optional, Sequence, Tuple
+from crc.crc_core import DictAccess, bits_str, is_bitstring, parse_bitstring
+from crc.models import CrcModel, ModelSpec, resolve_model
+from crc.stream import Crc
+from link.metrics import CRC_FAILURES, CRC_TIME
 
 VER = 1
 TYPE_DATA = 0
 TYPE_ACK  = 1
 TYPE_NACK = 2
+TYPE_SKIP = 3   # el emisor da SEQ por perdido: el receptor salta el hueco
 
-def _to_payload_bytes(text: str) -> bytes:
+# v2: VER=2, TYPE, FLAGS, ancho del CRC en bits, SEQ (4 bytes), LEN (varint
+# LEB128 de 1..4 bytes), payload y CRC. v1: VER=1, TYPE, SEQ, LEN (2 bytes).
+VER2 = 2
+VERSIONS = (VER, VER2)
+HEADER_LEN_V1 = 5
+V2_FIXED = 8            # bytes antes del LEN variable
+MAX_PAYLOAD_V1 = 0xFFFF
+MAX_PAYLOAD_V2 = 1 << 24  # tope práctico (el varint de 4 bytes llega a 2^28)
+SEQ_BITS_BY_VER = {VER: 8, VER2: 32}
+
+# FLAGS (solo v2): payload comprimido y/o varios mensajes en una trama
+FLAG_ZLIB  = 0x01
+FLAG_LZMA  = 0x02
+FLAG_BATCH = 0x04   # registros [LEN varint][datos] seguidos
+FLAGS_KNOWN = FLAG_ZLIB | FLAG_LZMA | FLAG_BATCH
+COMPRESSORS = ("no", "zlib", "lzma", "auto")
+# por debajo de esto comprimir no suele ganar nada
+MIN_COMPRESS = 32
+# LZMA2 crudo, sin la cabecera .xz: en mensajes cortos es lo que decide
+_LZMA_FILTERS = [{"id": lzma.FILTER_LZMA2, "preset": 6}]
+
+def encode_varint(n: int) -> bytes:
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+def decode_varint(buf, off: int, end: int) -> Optional[Tuple[int, int]]:
+    """(valor, offset siguiente) o None si faltan bytes; ValueError si pasa de 4 bytes."""
+    n = shift = 0
+    for i in range(off, min(end, off + 4)):
+        b = buf[i]
+        n |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return n, i + 1
+        shift += 7
+    if end - off >= 4:
+        raise ValueError("LEN varint de más de 4 bytes")
+    return None
+
+def frame_size(buf, off: int, end: int, crc_bytes: int) -> Optional[int]:
+    """
+    Tamaño total de la trama que empieza en buf[off] (v1 o v2), o None si aún
+    no está la cabecera completa. crc_bytes es resolve_model(poly).nbytes
+    del receptor en ambas versiones: una trama v2 con otro ancho de CRC no
+    es de este enlace y parse_frame la rechaza. ValueError si VER es
+    desconocido.
+    """
+    if end - off < 1:
+        return None
+    ver = buf[off]
+    if ver == VER:
+        if end - off < HEADER_LEN_V1:
+            return None
+        return HEADER_LEN_V1 + ((buf[off + 3] << 8) | buf[off + 4]) + crc_bytes
+    if ver == VER2:
+        if end - off < V2_FIXED + 1:
+            return None
+        r = decode_varint(buf, off + V2_FIXED, end)
+        if r is None:
+            return None
+        length, nxt = r
+        if length > MAX_PAYLOAD_V2:
+            raise ValueError(f"LEN={length} supera el máximo de v2")
+        return nxt - off + length + crc_bytes
+    raise ValueError(f"VER={ver} desconocido")
+
+def peek_header(buf) -> Tuple[int, int, int]:
+    """(tipo, seq, largo de cabecera) sin verificar el CRC; ValueError si no hay cabecera completa."""
+    n = len(buf)
+    if n >= HEADER_LEN_V1 and buf[0] == VER:
+        return buf[1], buf[2], HEADER_LEN_V1
+    if n > V2_FIXED and buf[0] == VER2:
+        r = decode_varint(buf, V2_FIXED, n)
+        if r is not None:
+            return buf[1], int.from_bytes(buf[4:8], "big"), r[1]
+    raise ValueError("cabecera incompleta o VER desconocido")
+
+def build_header(ftype: int, seq: int, length: int, model: CrcModel, ver: int = VER,
+                 flags: int = 0) -> bytes:
+    if ver == VER2:
+        if length > MAX_PAYLOAD_V2:
+            raise ValueError(f"payload de {length} bytes supera el máximo de v2")
+        return bytes([VER2, ftype, flags, model.width]) + (seq & 0xFFFFFFFF).to_bytes(4, "big") \
+            + encode_varint(length)
+    if ver != VER:
+        raise ValueError(f"VER={ver} desconocido")
+    if flags:
+        raise ValueError("FLAGS solo existe en v2")
+    if length > MAX_PAYLOAD_V1:
+        raise ValueError(f"payload de {length} bytes: v1 admite hasta {MAX_PAYLOAD_V1}")
+    return bytes([VER, ftype, seq & 0xFF]) + length.to_bytes(2, "big")
+
+def compress_payload(payload: bytes, flags: int = 0, method: str = "auto") -> Tuple[bytes, int]:
+    """
+    (payload, flags) comprimido con zlib o LZMA si sale más corto; "auto"
+    prueba los dos y se queda con el menor. Si no se gana nada, sin cambios.
+    """
+    if method not in COMPRESSORS:
+        raise ValueError(f"compresión desconocida: {method!r}")
+    if method == "no" or len(payload) < MIN_COMPRESS:
+        return payload, flags
+    best, best_flag = payload, 0
+    if method in ("zlib", "auto"):
+        c = zlib.compress(payload, 6)
+        if len(c) < len(best):
+            best, best_flag = c, FLAG_ZLIB
+    if method in ("lzma", "auto"):
+        c = lzma.compress(payload, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+        if len(c) < len(best):
+            best, best_flag = c, FLAG_LZMA
+    return best, flags | best_flag
+
+def pack_payload(msgs: Sequence[bytes], method: str = "no") -> Tuple[bytes, int]:
+    """Uno o varios mensajes -> (payload, flags) de una trama v2."""
+    if len(msgs) == 1:
+        return compress_payload(bytes(msgs[0]), 0, method)
+    payload = b"".join(encode_varint(len(m)) + bytes(m) for m in msgs)
+    return compress_payload(payload, FLAG_BATCH, method)
+
+def _decompress(payload, flags: int) -> bytes:
+    # límite de salida: un payload corrupto o malicioso no puede inflarse sin fin
+    if flags & FLAG_ZLIB:
+        d = zlib.decompressobj()
+        out = d.decompress(payload, MAX_PAYLOAD_V2)
+        if d.unconsumed_tail or not d.eof:
+            raise ValueError("payload zlib incompleto o demasiado grande")
+        return out
+    d = lzma.LZMADecompressor(format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+    try:
+        out = d.decompress(bytes(payload), MAX_PAYLOAD_V2)
+    except lzma.LZMAError as e:
+        raise ValueError(f"payload LZMA inválido: {e}") from None
+    if not d.eof:
+        raise ValueError("payload LZMA incompleto o demasiado grande")
+    return out
+
+def unpack_payload(payload, flags: int = 0) -> List[bytes]:
+    """Inversa de pack_payload: los mensajes de una trama DATA (ValueError si no encajan)."""
+    if flags & ~FLAGS_KNOWN or (flags & FLAG_ZLIB and flags & FLAG_LZMA):
+        raise ValueError(f"FLAGS=0x{flags:02x} no soportado")
+    data = _decompress(payload, flags) if flags & (FLAG_ZLIB | FLAG_LZMA) else bytes(payload)
+    if not flags & FLAG_BATCH:
+        return [data]
+    msgs, off, end = [], 0, len(data)
+    while off < end:
+        r = decode_varint(data, off, end)
+        if r is None or r[1] + r[0] > end:
+            raise ValueError("registro agrupado cortado")
+        n, off = r
+        msgs.append(data[off:off + n])
+        off += n
+    return msgs
+
+def payload_from_input(text: str) -> bytes:
+    """Texto de la GUI/CLI: cadena de bits o UTF-8."""
     if is_bitstring(text):
         return parse_bitstring(text)
     return text.encode("utf-8", "ignore")
 
-def build_data_frame_from_input(text: str, poly_bits: str, seq: int) -> Tuple[bytes, bytes]:
-    payload = _to_payload_bytes(text)
+def build_data_frame_from_input(text: str, poly_bits: ModelSpec, seq: int) -> Tuple[bytes, bytes]:
+    payload = payload_from_input(text)
     return build_data_frame(payload, poly_bits, seq), payload
 
-def build_data_frame(payload: bytes, poly_bits: str, seq: int) -> bytes:
-    seq = seq & 0xFF
-    length = len(payload)
-    header = bytes([VER, TYPE_DATA, seq]) + length.to_bytes(2, "big")
-    n = len(poly_bits)
-    crc = crc_calc(header + payload, poly_bits) & ((1 << n) - 1)
-    return header + payload + bytes([crc])
+def build_data_frame(payload: bytes, poly_bits: ModelSpec, seq: int, ver: int = VER,
+                     flags: int = 0) -> bytes:
+    model = resolve_model(poly_bits)
+    header = build_header(TYPE_DATA, seq, len(payload), model, ver, flags)
+    t0 = perf_counter()
+    c = Crc(model, header)
+    c.update(payload)
+    digest = c.digest()
+    CRC_TIME.observe(perf_counter() - t0)
+    return b"".join((header, payload, digest))
 
-def build_ack_frame(seq: int, ok: bool, poly_bits: str) -> bytes:
+def build_ack_frame(seq: int, ok: bool, poly_bits: ModelSpec, cum: Optional[int] = None,
+                    ver: int = VER) -> bytes:
+    """
+    ACK/NACK de seq. Con cum, el payload lleva el ACK acumulado (1 byte en
+    v1, 4 en v2): todo hasta cum inclusive llegó en orden. Sin cum, LEN=0.
+    """
+    model = resolve_model(poly_bits)
     t = TYPE_ACK if ok else TYPE_NACK
-    header = bytes([VER, t, seq & 0xFF]) + (0).to_bytes(2, "big")
-    n = len(poly_bits)
-    crc = crc_calc(header, poly_bits) & ((1 << n) - 1)
-    return header + bytes([crc])
-
-def _bits_str(b: bytes) -> str:
-    return "".join(str(x) for x in bits_from_bytes(b))
-
-def parse_frame(frame: bytes, poly_bits: str) -> Dict[str, Any]:
-    if len(frame) < 5 + 1:
-        raise ValueError("frame demasiado corto")
-    header = frame[:5]
-    ver, t, seq = header[0], header[1], header[2]
-    length = int.from_bytes(header[3:5], "big")
-    payload = frame[5:-1]
-    if len(payload) != length:
-        raise ValueError(f"LEN={length} pero payload={len(payload)}")
-    n = len(poly_bits)
-    crc_recv = frame[-1] & ((1 << n) - 1)
-    crc_calc_val = crc_calc(header + payload, poly_bits) & ((1 << n) - 1)
-    ok_crc = (crc_recv == crc_calc_val)
-    return {
-        "ver": ver,
-        "type": t,
-        "seq": seq,
-        "len": length,
-        "payload": payload,
-        "crc_ok": ok_crc,
-        "crc_recv": crc_recv,
-        "crc_calc": crc_calc_val,
-        "crc_recv_bits": format(crc_recv, f"0{n}b"),
-        "crc_calc_bits": format(crc_calc_val, f"0{n}b"),
-        "poly_bits": poly_bits,
-        "header_bits": _bits_str(header),
-        "payload_bits": _bits_str(payload),
-        "hp_bytes": header + payload,
-    }
\ No newline at end of file
+    if cum is None:
+        payload = b""
+    elif ver == VER2:
+        payload = (cum & 0xFFFFFFFF).to_bytes(4, "big")
+    else:
+        payload = bytes([cum & 0xFF])
+    header = build_header(t, seq, len(payload), model, ver)
+    c = Crc(model, header)
+    c.update(payload)
+    return header + payload + c.digest()
+
+def build_skip_frame(seq: int, poly_bits: ModelSpec, ver: int = VER) -> bytes:
+    """Trama SKIP de seq, sin payload: se confirma con ACK como una DATA."""
+    model = resolve_model(poly_bits)
+    header = build_header(TYPE_SKIP, seq, 0, model, ver)
+    return header + Crc(model, header).digest()
+
+def ack_cum(res: "FrameView") -> Optional[int]:
+    """ACK acumulado de un ACK/NACK ya parseado (None si no lo trae)."""
+    p = res.payload
+    if len(p) == 1:
+        return p[0]
+    if len(p) == 4:
+        return int.from_bytes(p, "big")
+    return None
+
+class FrameView(DictAccess):
+    """
+    Trama parseada sin copias: header y payload son memoryview sobre el
+    buffer recibido, así que solo valen mientras ese buffer no se reutilice
+    (en on_data, hasta que retorna; bytes(v.payload) para guardarlo).
+    Las cadenas de bits y hp_bytes se calculan en el primer acceso.
+    v["campo"] sigue funcionando como el dict que devolvía parse_frame.
+    """
+    __slots__ = ("header", "payload", "poly_bits", "n", "ver", "type", "flags", "seq", "len",
+                 "crc_recv", "crc_calc", "crc_ok", "_hp", "_hp_bytes", "_header_bits",
+                 "_payload_bits")
+    _FIELDS = ("ver", "type", "flags", "seq", "len", "payload", "crc_ok", "crc_recv", "crc_calc",
+               "crc_recv_bits", "crc_calc_bits", "poly_bits", "header_bits",
+               "payload_bits", "hp_bytes")
+
+    def __init__(self, frame, poly_bits: ModelSpec):
+        model = resolve_model(poly_bits)
+        nb = model.nbytes
+        mv = memoryview(frame).cast("B")
+        if len(mv) >= 1 and mv[0] == VER2:
+            hlen = self._parse_v2(mv, model)
+        else:
+            if len(mv) < HEADER_LEN_V1 + nb:
+                raise ValueError("frame demasiado corto")
+            hlen = HEADER_LEN_V1
+            self.ver, self.type, self.seq = mv[0], mv[1], mv[2]
+            self.flags = 0
+            self.len = (mv[3] << 8) | mv[4]
+        end = len(mv) - nb
+        self.header = mv[:hlen]
+        if end - hlen != self.len:
+            raise ValueError(f"LEN={self.len} pero payload={end - hlen}")
+        self.payload = mv[hlen:end]
+        self.poly_bits = poly_bits
+        self.n = model.width
+        self.crc_recv = int.from_bytes(mv[end:], "big") & model.mask
+        # header y payload son contiguos: un solo cálculo
+        self._hp = mv[:end]
+        t0 = perf_counter()
+        self.crc_calc = model.calc(self._hp)
+        CRC_TIME.observe(perf_counter() - t0)
+        self.crc_ok = self.crc_recv == self.crc_calc
+        self._header_bits = None
+        self._payload_bits = None
+        self._hp_bytes = None
+
+    def _parse_v2(self, mv: memoryview, model: CrcModel) -> int:
+        if len(mv) < V2_FIXED + 1 + model.nbytes:
+            raise ValueError("frame demasiado corto")
+        self.ver, self.type, self.flags = mv[0], mv[1], mv[2]
+        if mv[3] != model.width:
+            raise ValueError(f"CRC de {mv[3]} bits en la trama, el modelo es de {model.width}")
+        self.seq = int.from_bytes(mv[4:8], "big")
+        r = decode_varint(mv, V2_FIXED, len(mv))
+        if r is None:
+            raise ValueError("LEN varint incompleto")
+        self.len, hlen = r
+        return hlen
+
+    @property
+    def header_bits(self) -> str:
+        if self._header_bits is None:
+            self._header_bits = bits_str(self.header)
+        return self._header_bits
+
+    @property
+    def payload_bits(self) -> str:
+        if self._payload_bits is None:
+            self._payload_bits = bits_str(self.payload)
+        return self._payload_bits
+
+    @property
+    def crc_recv_bits(self) -> str:
+        return format(self.crc_recv, f"0{self.n}b")
+
+    @property
+    def crc_calc_bits(self) -> str:
+        return format(self.crc_calc, f"0{self.n}b")
+
+    @property
+    def hp_bytes(self) -> bytes:
+        """Cabecera + payload (copia), la entrada de los explicadores."""
+        if self._hp_bytes is None:
+            self._hp_bytes = bytes(self._hp)
+        return self._hp_bytes
+
+def parse_frame(frame, poly_bits: ModelSpec) -> FrameView:
+    return FrameView(frame, poly_bits)
+
+def parse_received(frame, poly_bits: ModelSpec) -> FrameView:
+    """
+    parse_frame de una trama que llega por la red: cuenta los CRC incorrectos
+    en link_crc_failures_total (verificar capturas o medir no los cuenta).
+    """
+    res = FrameView(frame, poly_bits)
+    if not res.crc_ok:
+        CRC_FAILURES.inc()
+    return res
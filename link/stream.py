@@ -0,0 +1,101 @@
+"""
+Decodificador incremental de tramas link.proto sobre un flujo TCP.
+
+Lee con recv_into() en un buffer fijo reutilizable y entrega cada trama en
+cuanto están la cabecera (v1 o v2, link.proto.frame_size), el payload y los
+bytes de CRC. Las tramas se
+entregan como memoryview sobre ese buffer: solo son válidas hasta la
+siguiente lectura (copiar con bytes() si hay que guardarlas).
+"""
+from typing import Iterator
+
+from link.proto import HEADER_LEN_V1, MAX_PAYLOAD_V1, MAX_PAYLOAD_V2, frame_size
+
+HEADER_LEN = HEADER_LEN_V1
+MAX_PAYLOAD = MAX_PAYLOAD_V1
+# cabecera v2 más larga (LEN de 4 bytes) y CRC de 8 bytes
+MAX_FRAME = 12 + MAX_PAYLOAD_V2 + 8
+# el buffer empieza pequeño y crece hasta la trama más larga que llegue
+DEFAULT_CAPACITY = 1 << 14
+
+
+class FrameError(ValueError):
+    pass
+
+
+class FrameDecoder:
+    def __init__(self, crc_bytes: int = 1, capacity: int = DEFAULT_CAPACITY):
+        self.crc_bytes = crc_bytes
+        self._buf = bytearray(max(capacity, HEADER_LEN + crc_bytes))
+        self._view = memoryview(self._buf)
+        self._start = 0  # primer byte sin consumir
+        self._end = 0    # fin de los datos válidos
+        self._need = 0   # tamaño de la trama incompleta en curso
+
+    @property
+    def pending(self) -> int:
+        """Bytes recibidos que aún no forman una trama completa."""
+        return self._end - self._start
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buf)
+
+    def _make_room(self):
+        # buffer circular con compactación: las tramas quedan siempre contiguas
+        n = self._end - self._start
+        if n == 0:
+            self._start = self._end = 0
+        need = max(self._need, n + 1)
+        if need > len(self._buf):
+            # se reemplaza (no se redimensiona): las vistas ya entregadas siguen válidas
+            buf = bytearray(max(need, min(2 * len(self._buf), MAX_FRAME)))
+            buf[:n] = self._view[self._start:self._end]
+            self._buf, self._view = buf, memoryview(buf)
+            self._start, self._end = 0, n
+        elif self._start + need > len(self._buf) or self._start > len(self._buf) // 2:
+            self._buf[:n] = self._view[self._start:self._end]
+            self._start, self._end = 0, n
+
+    def get_buffer(self) -> memoryview:
+        """Espacio libre donde escribir la próxima lectura (ver commit())."""
+        self._make_room()
+        return self._view[self._end:]
+
+    def commit(self, n: int) -> None:
+        self._end += n
+
+    def recv_into(self, sock) -> int:
+        """Una lectura del socket en el espacio libre. 0 = conexión cerrada."""
+        n = sock.recv_into(self.get_buffer())
+        self.commit(n)
+        return n
+
+    def feed(self, data) -> None:
+        """Copia data al buffer (para transportes que no son sockets)."""
+        mv = memoryview(data).cast("B")
+        while len(mv):
+            free = self.get_buffer()
+            n = min(len(mv), len(free))
+            free[:n] = mv[:n]
+            self.commit(n)
+            mv = mv[n:]
+
+    def frames(self) -> Iterator[memoryview]:
+        """Tramas completas disponibles, en orden de llegada."""
+        buf = self._buf
+        view = self._view
+        self._need = 0
+        while True:
+            s = self._start
+            try:
+                size = frame_size(buf, s, self._end, self.crc_bytes)
+            except ValueError as e:
+                raise FrameError(f"{e}; flujo desincronizado") from None
+            if size is None:
+                break
+            if self._end - s < size:
+                self._need = size
+                break
+            self._start = s + size
+            yield view[s:s + size]
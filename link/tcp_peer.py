@@ -1,11 +1,41 @@
 import socket
 import threading
 
+from link.capture import open_capture
+from link.metrics import BYTES_RECEIVED, BYTES_SENT, FRAMES_RECEIVED, FRAMES_SENT
+from link.pool import ConnectionPool
+from link.stream import FrameDecoder, FrameError
+
+# con listen(5) una ráfaga de conexiones desborda la cola y el SYN se
+# reintenta al cabo de 1 s
+BACKLOG = 128
+
 class TcpPeer:
-    def __init__(self, host="0.0.0.0", port=5000, on_data=None):
+    """
+    Por defecto cada conexión entrante queda abierta y se decodifican tramas
+    link.proto seguidas usando LEN; on_data recibe cada trama como memoryview
+    (válida solo durante la llamada). raw=True conserva el modo anterior:
+    un único bloque por conexión, entregado al cerrarse.
+    capture (ruta o link.capture.CaptureWriter) guarda cada trama recibida
+    con su hora y dirección de origen.
+    send() usa conexiones persistentes (link.pool) salvo con raw=True o
+    pool=False, que conectan y cierran por trama como antes.
+    on_send_error(host, port, error) avisa de las tramas que el pool
+    descarta tras fallar la escritura (send ya había vuelto).
+    """
+    def __init__(self, host="0.0.0.0", port=5000, on_data=None, crc_bytes=1, raw=False,
+                 capture=None, pool=None, on_send_error=None):
         self.host = host
         self.port = int(port)
         self.on_data = on_data
+        self.crc_bytes = crc_bytes
+        self.raw = raw
+        self.capture = open_capture(capture)
+        # solo se cierra al parar si la abrió este peer
+        self._own_capture = self.capture is not capture
+        if pool is None:
+            pool = not raw
+        self.pool = ConnectionPool(on_error=on_send_error) if pool is True else (pool or None)
         self._srv = None
         self._stop = threading.Event()
 
@@ -18,7 +48,7 @@ class TcpPeer:
         self._srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self._srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self._srv.bind((self.host, self.port))
-        self._srv.listen(5)
+        self._srv.listen(BACKLOG)
         while not self._stop.is_set():
             try:
                 self._srv.settimeout(1.0)
@@ -28,27 +58,68 @@ class TcpPeer:
             threading.Thread(target=self._handle, args=(conn, addr), daemon=True).start()
 
     def _handle(self, conn, addr):
+        if self.raw:
+            return self._handle_raw(conn, addr)
+        dec = FrameDecoder(self.crc_bytes)
+        with conn:
+            try:
+                while not self._stop.is_set():
+                    if not dec.recv_into(conn):
+                        break
+                    for frame in dec.frames():
+                        self._dispatch(frame, addr)
+            except (OSError, FrameError):
+                pass
+
+    def _handle_raw(self, conn, addr):
         with conn:
-            data = b""
+            chunks = []
             while True:
                 chunk = conn.recv(4096)
                 if not chunk:
                     break
-                data += chunk
-            if data and self.on_data:
-                try:
-                    self.on_data(data, addr)
-                except Exception:
-                    pass
+                chunks.append(chunk)
+            if chunks:
+                self._dispatch(b"".join(chunks), addr)
+
+    def _dispatch(self, data, addr):
+        FRAMES_RECEIVED.inc()
+        BYTES_RECEIVED.inc(len(data))
+        if self.capture is not None:
+            self.capture.write(data, addr)
+        if self.on_data:
+            try:
+                self.on_data(data, addr)
+            except Exception:
+                pass
 
     def send(self, host, port, data: bytes, timeout=2.0):
+        """
+        Con pool vuelve en cuanto la trama está en la cola de la conexión
+        (data puede ser una lista de buffers); sin pool, tras escribirla.
+        """
+        if self.pool is not None:
+            self.pool.send(host, port, data, timeout)
+            return
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = b"".join(data)
         with socket.create_connection((host, int(port)), timeout=timeout) as s:
             s.sendall(data)
+        FRAMES_SENT.inc()
+        BYTES_SENT.inc(len(data))
+
+    def flush(self, timeout=None) -> bool:
+        """Espera a que las tramas encoladas por send() se hayan escrito."""
+        return self.pool.flush(timeout) if self.pool is not None else True
 
     def stop(self):
         self._stop.set()
+        if self.pool is not None:
+            self.pool.close()
         if self._srv:
             try:
                 self._srv.close()
             except Exception:
-                pass
\ No newline at end of file
+                pass
+        if self._own_capture:
+            self.capture.close()
\ No newline at end of file
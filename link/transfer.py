@@ -0,0 +1,170 @@
+"""
+Transferencia de archivos sobre tramas DATA de link.proto (normalmente a
+través de link.arq para tener ventana y retransmisiones).
+
+Cada payload empieza con un byte de tipo:
+- START: 'S' + tamaño (8) + segmento (4) + modelo CRC del archivo (1 + n) + nombre
+- DATA:  'D' + offset (8) + bytes del archivo
+- END:   'E' + CRC del archivo completo (8)
+
+El emisor recorre el archivo con mmap y el receptor escribe cada segmento en
+su offset de un archivo ya dimensionado, así que el orden de llegada no
+importa y la memoria no depende del tamaño del archivo.
+"""
+import mmap
+import os
+import threading
+from typing import Callable, Optional
+
+from crc.models import ModelSpec, resolve_model
+from crc.parallel import crc_file
+from crc.stream import Crc
+from link.stream import MAX_PAYLOAD
+
+KIND_START = 0x53  # 'S'
+KIND_DATA = 0x44   # 'D'
+KIND_END = 0x45    # 'E'
+DATA_HEADER = 9
+# bytes de archivo por trama: lo que cabe en LEN tras 'D' + offset
+SEGMENT = MAX_PAYLOAD - DATA_HEADER
+# por defecto tramas cortas: con BER 1e-5 una de 64 KB casi nunca llega entera
+DEFAULT_SEGMENT = 4096
+FILE_MODEL = "CRC-32"
+
+
+class TransferError(ValueError):
+    pass
+
+
+def start_payload(size: int, segment: int, model_name: str, name: str) -> bytes:
+    m = model_name.encode("ascii")
+    return (bytes([KIND_START]) + size.to_bytes(8, "big") + segment.to_bytes(4, "big")
+            + bytes([len(m)]) + m + name.encode("utf-8"))
+
+
+def send_file(path: str, send: Callable[[bytes], object], model: ModelSpec = FILE_MODEL,
+              segment: int = DEFAULT_SEGMENT, progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """
+    Envía path con send(payload) (p. ej. ArqSender.send, que bloquea solo con
+    la ventana llena) y devuelve el CRC del archivo, calculado en la misma
+    pasada. progress(enviados, total) se llama tras cada segmento.
+    """
+    if not 1 <= segment <= SEGMENT:
+        raise ValueError(f"segmento fuera de rango (1..{SEGMENT})")
+    model = resolve_model(model)
+    crc = Crc(model)
+    size = os.path.getsize(path)
+    send(start_payload(size, segment, model.name, os.path.basename(path)))
+    if size:
+        with open(path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            with memoryview(m) as view:
+                for off in range(0, size, segment):
+                    # cada vista se libera enseguida: el mmap no se cierra con vistas vivas
+                    with view[off:off + segment] as chunk:
+                        crc.update(chunk)
+                        payload = b"".join((bytes([KIND_DATA]), off.to_bytes(8, "big"), chunk))
+                    send(payload)
+                    if progress:
+                        progress(min(off + segment, size), size)
+    send(bytes([KIND_END]) + crc.crc.to_bytes(8, "big"))
+    return crc.crc
+
+
+class FileReceiver:
+    """
+    on_payload(seq, payload) sirve como deliver de ArqReceiver. Los segmentos
+    se marcan en un bitmap (un bit por segmento) para saber cuándo está todo.
+    wait() verifica el CRC del archivo escrito (crc.parallel) fuera del lock
+    del receptor y devuelve True si coincide con el del emisor; si la
+    transferencia falló, relanza el error.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = None
+        self.size = None
+        self.segment = None
+        self.model = None
+        self.expected_crc = None
+        self.crc = None
+        self.received = 0
+        self.error = None
+        self._f = None
+        self._seen = None
+        self._missing = 0
+        self._done = threading.Event()
+
+    def on_payload(self, seq: int, payload) -> None:
+        # no lanza: un error dentro de deliver dejaría al ArqReceiver a medias
+        try:
+            self._dispatch(payload)
+        except (TransferError, OSError) as e:
+            self.error = e
+            self.close()
+            self._done.set()
+
+    def _dispatch(self, payload):
+        if self.error is not None:
+            return
+        kind = payload[0] if len(payload) else None
+        if kind == KIND_START:
+            self._start(payload)
+        elif kind == KIND_DATA:
+            self._data(payload)
+        elif kind == KIND_END:
+            self.expected_crc = int.from_bytes(payload[1:9], "big")
+        else:
+            raise TransferError(f"payload de transferencia desconocido: {kind!r}")
+        if self._f is not None and self._missing == 0 and self.expected_crc is not None:
+            self._f.close()
+            self._f = None
+            self._done.set()
+
+    def _start(self, p):
+        if self.size is not None:
+            return  # START repetido
+        self.size = int.from_bytes(p[1:9], "big")
+        self.segment = int.from_bytes(p[9:13], "big")
+        n = p[13]
+        self.model = resolve_model(bytes(p[14:14 + n]).decode("ascii"))
+        self.name = bytes(p[14 + n:]).decode("utf-8", "replace")
+        nseg = -(-self.size // self.segment) if self.segment else 0
+        self._seen = bytearray(-(-nseg // 8))
+        self._missing = nseg
+        self._f = open(self.path, "wb")
+        # tamaño final desde el principio: cada segmento va directo a su offset
+        self._f.truncate(self.size)
+
+    def _data(self, p):
+        if self._seen is None:
+            raise TransferError("DATA antes de START")
+        if self._f is None:
+            return  # ya completo: retransmisión tardía
+        off = int.from_bytes(p[1:9], "big")
+        idx, rem = divmod(off, self.segment)
+        if rem or off >= self.size:
+            raise TransferError(f"offset {off} inválido")
+        byte, bit = divmod(idx, 8)
+        if self._seen[byte] >> bit & 1:
+            return  # duplicado
+        self._seen[byte] |= 1 << bit
+        self._f.seek(off)
+        self._f.write(p[DATA_HEADER:])
+        self._missing -= 1
+        self.received += len(p) - DATA_HEADER
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if not self._done.wait(timeout):
+            total = "?" if self.size is None else self.size  # sin START todavía
+            raise TimeoutError(f"transferencia incompleta: {self.received}/{total} bytes")
+        if self.error is not None:
+            raise self.error
+        if self.crc is None:
+            self.crc = crc_file(self.path, self.model)
+        return self.crc == self.expected_crc
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
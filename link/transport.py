@@ -0,0 +1,44 @@
+"""
+Selección del transporte (TRANSPORT en .env, --transporte en app.main) y
+ayudas para levantar peers locales en pruebas de carga y benchmarks.
+"""
+import socket
+import time
+
+from link.async_peer import AsyncTcpPeer
+from link.tcp_peer import TcpPeer
+from link.udp_peer import UdpPeer
+
+TRANSPORTS = {
+    "tcp": TcpPeer,
+    "asyncio": AsyncTcpPeer,
+    "udp": UdpPeer,
+}
+
+
+def make_peer(transport: str = "tcp", **kwargs):
+    try:
+        cls = TRANSPORTS[transport.strip().lower()]
+    except KeyError:
+        raise ValueError(f"transporte desconocido: {transport!r} (opciones: {', '.join(TRANSPORTS)})") from None
+    return cls(**kwargs)
+
+
+def free_port(host: str = "127.0.0.1") -> int:
+    """Puerto libre en host en este momento (otro proceso podría tomarlo)."""
+    with socket.socket() as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
+def wait_listening(port: int, timeout: float = 5.0, host: str = "127.0.0.1"):
+    """Espera a que un peer TCP acepte conexiones en port; OSError si no llega."""
+    end = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            if time.monotonic() > end:
+                raise
+            time.sleep(0.01)
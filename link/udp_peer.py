@@ -0,0 +1,192 @@
+"""
+Peer UDP: cada trama de link.proto viaja en un datagrama, sin conexión ni
+handshake. Misma interfaz que TcpPeer (on_data(data, addr), send, start,
+stop); TRANSPORT=udp en .env o --transporte udp en app.main.
+
+- Recepción con recvfrom_into sobre RECV_BATCH buffers preasignados: en
+  cada despertar se vacían todos los datagramas pendientes (hasta
+  RECV_BATCH) y luego se entregan; on_data recibe un memoryview válido solo
+  durante la llamada, como en TcpPeer.
+- send_batch() agrupa varias tramas en un datagrama (hasta BATCH_DATAGRAM
+  bytes, sin fragmentar en Ethernet) con sendmsg, sin copiarlas; el
+  receptor las separa usando LEN.
+- Las respuestas salen del mismo socket, así que el otro extremo ve como
+  origen el puerto donde escucha este peer.
+- on_send_error(host, port, error) se llama, como en TcpPeer, cuando un
+  envío falla (además send lanza el error).
+
+Un datagrama UDP admite como mucho MAX_FRAME bytes; las tramas más largas
+(payload de casi 64 KB) no caben y send() lanza ValueError.
+"""
+import selectors
+import socket
+import threading
+from typing import Iterator, List, Optional, Sequence
+
+from link.capture import open_capture
+from link.metrics import BYTES_RECEIVED, BYTES_SENT, FRAMES_RECEIVED, FRAMES_SENT
+from link.proto import frame_size
+
+MAX_FRAME = 65507
+RECV_BATCH = 32
+BATCH_DATAGRAM = 1472
+# buffer del kernel: aguanta ráfagas mientras el hilo entrega (el SO puede limitarlo)
+RCVBUF = 4 << 20
+
+
+class UdpPeer:
+    # app.main ajusta el segmento de link.transfer a este tamaño de trama
+    max_frame = MAX_FRAME
+
+    def __init__(self, host="0.0.0.0", port=5000, on_data=None, crc_bytes=1, raw=False,
+                 capture=None, recv_batch=RECV_BATCH, on_send_error=None):
+        self.host = host
+        self.port = int(port)
+        self.on_data = on_data
+        self.crc_bytes = crc_bytes
+        self.raw = raw
+        self.capture = open_capture(capture)
+        self._own_capture = self.capture is not capture
+        self.recv_batch = recv_batch
+        self.on_send_error = on_send_error
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _socket(self) -> socket.socket:
+        with self._lock:
+            if self._sock is None:
+                s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                s.setblocking(False)
+                self._sock = s
+            return self._sock
+
+    def start(self):
+        s = self._socket()
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RCVBUF)
+        except OSError:
+            pass
+        # el bind es síncrono: al volver, el puerto ya recibe
+        s.bind((self.host, self.port))
+        t = threading.Thread(target=self._serve, args=(s,), daemon=True)
+        t.start()
+        return t
+
+    def _serve(self, sock: socket.socket):
+        bufs = [bytearray(MAX_FRAME) for _ in range(self.recv_batch)]
+        views = [memoryview(b) for b in bufs]
+        got = [(0, None)] * self.recv_batch
+        sel = selectors.DefaultSelector()
+        sel.register(sock, selectors.EVENT_READ)
+        with sel:
+            while not self._stop.is_set():
+                try:
+                    if not sel.select(timeout=0.5):
+                        continue
+                except (OSError, ValueError):
+                    return  # socket cerrado por stop()
+                k = 0
+                try:
+                    while k < self.recv_batch:
+                        got[k] = sock.recvfrom_into(bufs[k])
+                        k += 1
+                except (BlockingIOError, InterruptedError):
+                    pass
+                except OSError:
+                    if self._stop.is_set():
+                        return
+                for i in range(k):
+                    n, addr = got[i]
+                    dgram = views[i][:n]
+                    for frame in ([dgram] if self.raw else self._split(dgram)):
+                        self._dispatch(frame, addr)
+
+    def _split(self, dgram: memoryview) -> Iterator[memoryview]:
+        """Tramas de un datagrama; lo que no encaje con LEN se entrega tal cual."""
+        off, n = 0, len(dgram)
+        while off < n:
+            try:
+                size = frame_size(dgram, off, n, self.crc_bytes)
+            except ValueError:
+                break
+            if size is None or n - off < size:
+                break
+            yield dgram[off:off + size]
+            off += size
+        if off < n:
+            # LEN dañado o basura: parse_frame lo rechazará
+            yield dgram[off:]
+
+    def _dispatch(self, data, addr):
+        FRAMES_RECEIVED.inc()
+        BYTES_RECEIVED.inc(len(data))
+        if self.capture is not None:
+            self.capture.write(data, addr)
+        if self.on_data:
+            try:
+                self.on_data(data, addr)
+            except Exception:
+                pass
+
+    def _sendto(self, bufs: List, addr, timeout: float):
+        try:
+            self._sendmsg(bufs, addr, timeout)
+        except OSError as e:
+            if self.on_send_error:
+                self.on_send_error(addr[0], addr[1], e)
+            raise
+
+    def _sendmsg(self, bufs: List, addr, timeout: float):
+        s = self._socket()
+        try:
+            s.sendmsg(bufs, (), 0, addr)
+        except BlockingIOError:
+            # buffer de envío lleno: se espera a poder escribir
+            with selectors.DefaultSelector() as sel:
+                sel.register(s, selectors.EVENT_WRITE)
+                if not sel.select(timeout):
+                    raise TimeoutError(f"envío UDP a {addr[0]}:{addr[1]} bloqueado")
+            s.sendmsg(bufs, (), 0, addr)
+
+    def send(self, host, port, data: bytes, timeout=2.0):
+        """data es una trama o una lista de buffers que forman una trama."""
+        bufs = [data] if isinstance(data, (bytes, bytearray, memoryview)) else list(data)
+        size = sum(memoryview(b).nbytes for b in bufs)
+        if size > MAX_FRAME:
+            raise ValueError(f"trama de {size} bytes: no cabe en un datagrama UDP ({MAX_FRAME})")
+        self._sendto(bufs, (host, int(port)), timeout)
+        FRAMES_SENT.inc()
+        BYTES_SENT.inc(size)
+
+    def send_batch(self, host, port, frames: Sequence[bytes], timeout=2.0):
+        """Varias tramas en el menor número de datagramas de hasta BATCH_DATAGRAM bytes."""
+        addr = (host, int(port))
+        group: List = []
+        size = 0
+        for f in frames:
+            n = memoryview(f).nbytes
+            if n > MAX_FRAME:
+                raise ValueError(f"trama de {n} bytes: no cabe en un datagrama UDP ({MAX_FRAME})")
+            if group and size + n > BATCH_DATAGRAM:
+                self._sendto(group, addr, timeout)
+                group, size = [], 0
+            group.append(f)
+            size += n
+        if group:
+            self._sendto(group, addr, timeout)
+        FRAMES_SENT.inc(len(frames))
+        BYTES_SENT.inc(sum(memoryview(f).nbytes for f in frames))
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            if self._sock is not None:
+                try:
+                    self._sock.close()
+                except OSError:
+                    pass
+                self._sock = None
+        if self._own_capture:
+            self.capture.close()
@@ -0,0 +1,111 @@
+import threading
+import unittest
+
+from link.arq import GO_BACK_N, SELECTIVE_REPEAT, ArqReceiver, ArqSender, RtoEstimator
+from link.proto import TYPE_ACK, TYPE_DATA, TYPE_NACK, TYPE_SKIP, VER, VER2, ack_cum, parse_frame
+
+POLY = "CRC-16/CCITT-FALSE"
+
+
+class Link:
+    """Emisor y receptor en memoria; drop(tipo, seq) decide qué DATA se pierde."""
+
+    def __init__(self, mode=SELECTIVE_REPEAT, ver=VER, drop=lambda t, seq: False, max_tries=3):
+        self.drop = drop
+        self.delivered = []
+        self.failed = []
+        self._lock = threading.RLock()  # un NACK reenvía dentro de _to_rx
+        self.tx = ArqSender(self._to_rx, POLY, window=4, mode=mode, max_tries=max_tries,
+                            rto=RtoEstimator(initial=0.02, min_rto=0.01),
+                            on_failed=lambda seq, p: self.failed.append(p), ver=ver)
+        self.rx = ArqReceiver(self._to_tx, POLY, deliver=lambda seq, p: self.delivered.append(bytes(p)),
+                              window=4, mode=mode, ver=ver)
+
+    def _to_rx(self, frame):
+        res = parse_frame(frame, POLY)
+        if self.drop(res.type, res.seq):
+            return
+        with self._lock:
+            if res.type == TYPE_SKIP:
+                self.rx.on_skip(res.seq, res.crc_ok)
+            elif res.type == TYPE_DATA:
+                self.rx.on_data(res.seq, res.payload, res.crc_ok, res.flags)
+
+    def _to_tx(self, frame):
+        res = parse_frame(frame, POLY)
+        if res.type in (TYPE_ACK, TYPE_NACK):
+            self.tx.on_ack(res.seq, res.type == TYPE_ACK, ack_cum(res))
+
+    def send_all(self, msgs):
+        for m in msgs:
+            self.tx.send(m, timeout=5)
+        ok = self.tx.wait_idle(5)
+        self.tx.close()
+        return ok
+
+
+class SkipTest(unittest.TestCase):
+    msgs = [b"m%d" % i for i in range(10)]
+
+    def check_gap(self, mode, ver):
+        link = Link(mode, ver, drop=lambda t, seq: t == TYPE_DATA and seq == 2)
+        self.assertTrue(link.send_all(self.msgs))
+        self.assertEqual(link.failed, [b"m2"])
+        self.assertEqual(link.delivered, self.msgs[:2] + self.msgs[3:])
+        self.assertEqual(link.rx.stats["skipped"], 1)
+
+    def test_gap_sr(self):
+        self.check_gap(SELECTIVE_REPEAT, VER)
+
+    def test_gap_gbn(self):
+        self.check_gap(GO_BACK_N, VER)
+
+    def test_gap_v2(self):
+        self.check_gap(SELECTIVE_REPEAT, VER2)
+
+    def test_lost_skip_retried(self):
+        lost = {"skip": 2}
+
+        def drop(t, seq):
+            if t == TYPE_SKIP and lost["skip"]:
+                lost["skip"] -= 1
+                return True
+            return t == TYPE_DATA and seq == 0
+
+        link = Link(drop=drop)
+        self.assertTrue(link.send_all(self.msgs))
+        self.assertEqual(link.delivered, self.msgs[1:])
+
+    def test_resync_after_restart(self):
+        link = Link()
+        self.assertTrue(link.send_all(self.msgs))
+        # el emisor se reinicia en SEQ 0 con el receptor esperando 10
+        link.tx = ArqSender(link._to_rx, POLY, window=4, max_tries=3,
+                            rto=RtoEstimator(initial=0.02, min_rto=0.01),
+                            on_failed=lambda seq, p: link.failed.append(p))
+        link.tx.send(b"a", timeout=5)  # se pierde: el SKIP resincroniza
+        self.assertTrue(link.tx.wait_idle(5))
+        self.assertTrue(link.send_all([b"b", b"c"]))
+        self.assertEqual(link.rx.stats["resyncs"], 1)
+        self.assertEqual(link.failed, [b"a"])
+        self.assertEqual(link.delivered[-2:], [b"b", b"c"])
+
+
+class TransformTest(unittest.TestCase):
+    def test_only_first_transmission(self):
+        link = Link()
+
+        def flip(frame):
+            arr = bytearray(frame)
+            arr[-1] ^= 0x01
+            return bytes(arr)
+
+        link.tx.send(b"hola", transform=flip, timeout=5)
+        self.assertTrue(link.send_all([]))
+        self.assertEqual(link.delivered, [b"hola"])
+        self.assertEqual(link.rx.stats["crc_fail"], 1)
+        self.assertEqual(link.failed, [])
+
+
+if __name__ == "__main__":
+    unittest.main()